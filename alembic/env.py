@@ -0,0 +1,78 @@
+# alembic/env.py
+from logging.config import fileConfig
+
+from alembic import context
+
+from app.core.config import DATABASE_URL
+from app.core.compression import CompressedText
+from app.models.base import Base
+# Import every model so Base.metadata knows all tables (for --autogenerate)
+from app.models import (  # noqa: F401
+    user, workspace, chat, chat_file, chat_file_version, chat_conversation,
+    file, model, version_blob, content_diff
+)
+
+config = context.config
+
+# Only configure logging when run from the alembic CLI; init_db() calls us
+# programmatically and the app keeps its own logging setup
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def render_item(type_, obj, autogen_context):
+    # CompressedText columns are plain TEXT in the database
+    if type_ == "type" and isinstance(obj, CompressedText):
+        return "sa.Text()"
+    return False
+
+
+def run_migrations_offline() -> None:
+    """
+    Emits the migration SQL to stdout (alembic upgrade --sql) without a database.
+    """
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url") or DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        render_item=render_item,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """
+    Runs the migrations on the connection handed over by
+    app.core.migrations.run_migrations, or on a new engine for DATABASE_URL
+    when run from the alembic CLI.
+    """
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+
+    from app.core.database import create_db_engine
+    engine = create_db_engine(config.get_main_option("sqlalchemy.url") or DATABASE_URL)
+    with engine.connect() as connection:
+        _run(connection)
+    engine.dispose()
+
+
+def _run(connection) -> None:
+    # SQLite cannot ALTER most things in place; batch mode recreates the table
+    context.configure(
+        connection=connection, target_metadata=target_metadata, render_as_batch=True, render_item=render_item
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
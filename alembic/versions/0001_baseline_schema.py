@@ -0,0 +1,150 @@
+"""baseline schema
+
+The schema as it stood before migrations moved to Alembic (after the
+hand-rolled steps in app/core/migrations.py). Databases created before then
+are brought up to it by those steps and stamped with this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 22:43:52.989532
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('users',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('email')
+    )
+    op.create_index('ix_users_id', 'users', ['id'], unique=False)
+
+    op.create_table('workspaces',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('owner_id', sa.String(), nullable=False),
+    sa.Column('retention_days', sa.Integer(), nullable=True),
+    sa.Column('retention_hourly', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['owner_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_workspaces_id', 'workspaces', ['id'], unique=False)
+
+    op.create_table('models',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('ak', sa.String(), nullable=False),
+    sa.Column('base_url', sa.String(), nullable=False),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_models_id', 'models', ['id'], unique=False)
+
+    op.create_table('chats',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('name', sa.String(), nullable=False),
+    sa.Column('last_updated', sa.String(), nullable=True),
+    sa.Column('user_id', sa.String(), nullable=False),
+    sa.Column('workspace_id', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chats_id', 'chats', ['id'], unique=False)
+
+    op.create_table('files',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('workspace_id', sa.String(), nullable=False),
+    sa.Column('s3_url', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['workspace_id'], ['workspaces.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_files_id', 'files', ['id'], unique=False)
+
+    # The content and delta columns are CompressedText, whose DDL is TEXT
+    op.create_table('chat_conversations',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('chat_id', sa.String(), nullable=False),
+    sa.Column('role', sa.String(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chat_conversations_id', 'chat_conversations', ['id'], unique=False)
+    op.create_index('ix_chat_conversations_chat_id_seq', 'chat_conversations', ['chat_id', 'seq'], unique=True)
+
+    op.create_table('chat_files',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('filename', sa.String(), nullable=False),
+    sa.Column('path', sa.String(), nullable=False),
+    sa.Column('chat_id', sa.String(), nullable=False),
+    sa.Column('s3_url', sa.String(), nullable=True),
+    sa.ForeignKeyConstraint(['chat_id'], ['chats.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chat_files_id', 'chat_files', ['id'], unique=False)
+
+    op.create_table('version_blobs',
+    sa.Column('hash', sa.String(), nullable=False),
+    sa.Column('content', sa.Text(), nullable=True),
+    sa.Column('base_hash', sa.String(), nullable=True),
+    sa.Column('delta', sa.Text(), nullable=True),
+    sa.Column('line_count', sa.Integer(), nullable=False),
+    sa.Column('keyframe', sa.Boolean(), nullable=False),
+    sa.ForeignKeyConstraint(['base_hash'], ['version_blobs.hash'], ),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    op.create_index('ix_version_blobs_base_hash', 'version_blobs', ['base_hash'], unique=False)
+
+    op.create_table('chat_file_versions',
+    sa.Column('id', sa.String(), nullable=False),
+    sa.Column('chat_file_id', sa.String(), nullable=False),
+    sa.Column('timestamp', sa.String(), nullable=False),
+    sa.Column('seq', sa.Integer(), nullable=False),
+    sa.Column('content_hash', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['chat_file_id'], ['chat_files.id'], ),
+    sa.ForeignKeyConstraint(['content_hash'], ['version_blobs.hash'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_chat_file_versions_id', 'chat_file_versions', ['id'], unique=False)
+    op.create_index('ix_chat_file_versions_chat_file_id_seq', 'chat_file_versions', ['chat_file_id', 'seq'], unique=True)
+    op.create_index('ix_chat_file_versions_content_hash', 'chat_file_versions', ['content_hash'], unique=False)
+
+    op.create_table('content_diffs',
+    sa.Column('from_hash', sa.String(), nullable=False),
+    sa.Column('to_hash', sa.String(), nullable=False),
+    sa.Column('diff', sa.String(), nullable=False),
+    sa.PrimaryKeyConstraint('from_hash', 'to_hash')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('content_diffs')
+    op.drop_table('chat_file_versions')
+    op.drop_table('version_blobs')
+    op.drop_table('chat_files')
+    op.drop_table('chat_conversations')
+    op.drop_table('files')
+    op.drop_table('chats')
+    op.drop_table('models')
+    op.drop_table('workspaces')
+    op.drop_table('users')
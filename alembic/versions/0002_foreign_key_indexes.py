@@ -0,0 +1,43 @@
+"""index foreign key columns
+
+Every connect and login filters on these columns. chat_file_versions.chat_file_id
+and chat_conversations.chat_id are already the leading columns of their
+(parent id, seq) indexes, so they need no index of their own.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 23:05:11.402157
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, Sequence[str], None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+FOREIGN_KEY_INDEXES = [
+    ('ix_chat_files_chat_id', 'chat_files', 'chat_id'),
+    ('ix_files_workspace_id', 'files', 'workspace_id'),
+    ('ix_chats_workspace_id', 'chats', 'workspace_id'),
+    ('ix_chats_user_id', 'chats', 'user_id'),
+    ('ix_workspaces_owner_id', 'workspaces', 'owner_id'),
+    ('ix_models_user_id', 'models', 'user_id'),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for name, table, column in FOREIGN_KEY_INDEXES:
+        op.create_index(name, table, [column], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name, table, column in FOREIGN_KEY_INDEXES:
+        op.drop_index(name, table_name=table, if_exists=True)
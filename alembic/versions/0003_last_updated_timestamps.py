@@ -0,0 +1,84 @@
+"""store last_updated as timestamps and index it for keyset pagination
+
+chats.last_updated was an ISO 8601 string; it becomes a DateTime column
+(naive UTC). files gain a last_updated column, set to the migration time for
+existing rows. The single-column workspace_id indexes from 0002 are replaced
+by (workspace_id, last_updated, id), which serves both the plain lookups and
+the paginated workspace chat / file lists.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 23:41:27.118306
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, Sequence[str], None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _to_utc(value, default: datetime) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return default
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    conn = op.get_bind()
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+
+    # Values are rewritten in the format the DateTime type reads back, with
+    # the migration time for missing or unparseable ones. This happens on
+    # both sides of the table rebuild: NOT NULL needs it before, and the
+    # rebuild copies through CAST(... AS DATETIME), which SQLite turns into
+    # just the leading year.
+    chats = sa.table('chats', sa.column('id', sa.String()), sa.column('last_updated', sa.DateTime()))
+    values = {
+        chat_id: _to_utc(value, now)
+        for chat_id, value in conn.execute(sa.text("SELECT id, last_updated FROM chats")).all()
+    }
+
+    def write_values():
+        for chat_id, value in values.items():
+            conn.execute(chats.update().where(chats.c.id == chat_id).values(last_updated=value))
+
+    write_values()
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.alter_column('last_updated', existing_type=sa.String(), type_=sa.DateTime(), nullable=False)
+        batch_op.drop_index('ix_chats_workspace_id')
+        batch_op.create_index('ix_chats_workspace_id_last_updated', ['workspace_id', 'last_updated', 'id'], unique=False)
+    write_values()
+
+    op.add_column('files', sa.Column('last_updated', sa.DateTime(), nullable=True))
+    files = sa.table('files', sa.column('last_updated', sa.DateTime()))
+    conn.execute(files.update().values(last_updated=now))
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.alter_column('last_updated', existing_type=sa.DateTime(), nullable=False)
+        batch_op.drop_index('ix_files_workspace_id')
+        batch_op.create_index('ix_files_workspace_id_last_updated', ['workspace_id', 'last_updated', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('files', schema=None) as batch_op:
+        batch_op.drop_index('ix_files_workspace_id_last_updated')
+        batch_op.create_index('ix_files_workspace_id', ['workspace_id'], unique=False)
+        batch_op.drop_column('last_updated')
+
+    with op.batch_alter_table('chats', schema=None) as batch_op:
+        batch_op.drop_index('ix_chats_workspace_id_last_updated')
+        batch_op.create_index('ix_chats_workspace_id', ['workspace_id'], unique=False)
+        batch_op.alter_column('last_updated', existing_type=sa.DateTime(), type_=sa.String(), nullable=True)
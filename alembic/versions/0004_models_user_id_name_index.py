@@ -0,0 +1,33 @@
+"""index models by (user_id, name)
+
+Models are resolved by name within the chat's user. The (user_id, name)
+index replaces the single-column user_id index from 0002.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 23:58:40.215983
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, Sequence[str], None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_models_user_id_name', 'models', ['user_id', 'name'], unique=False)
+    op.drop_index('ix_models_user_id', table_name='models', if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_models_user_id', 'models', ['user_id'], unique=False)
+    op.drop_index('ix_models_user_id_name', table_name='models')
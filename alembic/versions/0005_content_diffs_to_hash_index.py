@@ -0,0 +1,32 @@
+"""index content_diffs by to_hash
+
+Cached diffs to a blob are dropped once it stops being a file's latest
+version, by create_version and by the compaction sweep; both filter on
+to_hash, which is not the leading column of the primary key.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19 00:20:12.504117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_content_diffs_to_hash', 'content_diffs', ['to_hash'], unique=False, if_not_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_content_diffs_to_hash', table_name='content_diffs', if_exists=True)
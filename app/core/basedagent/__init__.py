@@ -1,6 +1,7 @@
 from .validation import validate_based_code, validate_based_diff
 from .llm import prompt_llm_json_output
 from .triage import triageContext
+from .context import ConversationContext
 from .main import handle_new_message
 
 __all__ = [
@@ -8,5 +9,6 @@ __all__ = [
     "validate_based_diff",
     "prompt_llm_json_output",
     "triageContext",
+    "ConversationContext",
     "handle_new_message",
 ]
\ No newline at end of file
@@ -0,0 +1,160 @@
+from bisect import bisect_left
+from typing import List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # tiktoken is optional; we fall back to a rough estimate
+    tiktoken = None
+
+_encoding_cache = {}
+
+
+def _get_encoding(model: Optional[str]):
+    """
+    Returns a tiktoken encoding for the given model name (e.g. "openai/gpt-4o"),
+    or None if tiktoken / the encoding files are unavailable.
+    """
+    key = model or ""
+    if key in _encoding_cache:
+        return _encoding_cache[key]
+
+    encoding = None
+    if tiktoken is not None:
+        try:
+            encoding = tiktoken.encoding_for_model(key.split("/")[-1])
+        except Exception:
+            try:
+                encoding = tiktoken.get_encoding("o200k_base")
+            except Exception:
+                encoding = None
+    _encoding_cache[key] = encoding
+    return encoding
+
+
+def count_text_tokens(text: str, model: Optional[str] = None) -> int:
+    """
+    Counts the tokens in a piece of text for the given model.
+    Falls back to ~4 characters per token if no tokenizer can be loaded.
+    """
+    encoding = _get_encoding(model)
+    if encoding is None:
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def format_conversation_line(index: int, msg: dict) -> str:
+    """
+    Formats one conversation message the way the agent prompts expect it:
+      "<index>: <role> - <content>"
+    Newlines inside the content are flattened so that one message is exactly one line.
+    """
+    content = str(msg.get("content", "")).replace("\r\n", "\n").replace("\n", "\\n")
+    return f"{index}: {msg.get('role')} - {content}"
+
+
+class ConversationContext:
+    """
+    Per-session view of the conversation used by every agent stage
+    (triage, tool context agent, plain response).
+
+    Messages are formatted into numbered lines once, as they are appended.
+    Token counts are computed lazily the first time they are needed and cached
+    as a running prefix sum, so token totals and extraction ranges can be
+    resolved without re-formatting or re-splitting the whole history every turn.
+    """
+
+    def __init__(self, model: Optional[str] = None):
+        self.model = model
+        self._lines: List[str] = []
+        self._token_prefix: List[int] = [0]
+        self._formatted: Optional[str] = None
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
+    def append(self, msg) -> str:
+        """
+        Formats and appends a single message (a dict or ChatMessage).
+        Returns the formatted line.
+        """
+        if hasattr(msg, "dict"):
+            msg = msg.dict()
+        line = format_conversation_line(len(self._lines) + 1, msg)
+        self._lines.append(line)
+        self._formatted = None
+        return line
+
+    def sync(self, conversation: list) -> "ConversationContext":
+        """
+        Brings the context up to date with the session's conversation list.
+        Only messages appended since the last sync are formatted; if the list
+        shrank (e.g. it was replaced), the context is rebuilt from scratch.
+        """
+        if len(conversation) < len(self._lines):
+            self.reset()
+        for msg in conversation[len(self._lines):]:
+            self.append(msg)
+        return self
+
+    def reset(self) -> None:
+        self._lines = []
+        self._token_prefix = [0]
+        self._formatted = None
+
+    def _count_pending_tokens(self) -> None:
+        # Only lines appended since the last count are tokenized
+        for line in self._lines[len(self._token_prefix) - 1:]:
+            self._token_prefix.append(self._token_prefix[-1] + count_text_tokens(line, self.model) + 1)
+
+    def formatted(self, max_tokens: Optional[int] = None) -> str:
+        """
+        The numbered conversation, one message per line. With `max_tokens`,
+        only the most recent messages that fit in that many tokens are kept
+        (their numbers are unchanged, so extraction indices still resolve),
+        after a note saying how many earlier ones were left out.
+        """
+        if self._formatted is None:
+            self._formatted = "\n".join(self._lines)
+        if max_tokens is None or self.token_count() <= max_tokens:
+            return self._formatted
+        # First line whose suffix fits: prefix[start - 1] >= total - max_tokens
+        start = bisect_left(self._token_prefix, self._token_prefix[-1] - max_tokens) + 1
+        omitted = start - 1
+        return "\n".join([f"({omitted} earlier messages omitted)"] + self._lines[start - 1:])
+
+    def line_range(self, start: int, end: int) -> List[str]:
+        """
+        Returns the formatted lines for the 1-based inclusive range [start, end].
+        Out-of-range bounds are clamped.
+        """
+        start = max(int(start), 1)
+        end = min(int(end), len(self._lines))
+        if start > end:
+            return []
+        return self._lines[start - 1:end]
+
+    def extract(self, extraction_indices: list) -> str:
+        """
+        Resolves triage extraction indices (a list of [start, end] pairs)
+        into the corresponding conversation lines.
+        """
+        extracted_lines = []
+        for pair in extraction_indices or []:
+            if isinstance(pair, (list, tuple)) and len(pair) == 2:
+                try:
+                    extracted_lines.extend(self.line_range(pair[0], pair[1]))
+                except (TypeError, ValueError):
+                    continue
+        return "\n".join(extracted_lines)
+
+    def token_count(self, start: int = 1, end: Optional[int] = None) -> int:
+        """
+        Cached token count of the formatted lines in [start, end] (1-based, inclusive).
+        Defaults to the whole conversation.
+        """
+        end = len(self._lines) if end is None else min(int(end), len(self._lines))
+        start = max(int(start), 1)
+        if start > end:
+            return 0
+        self._count_pending_tokens()
+        return self._token_prefix[end] - self._token_prefix[start - 1]
@@ -0,0 +1,76 @@
+from typing import List
+from pydantic import ValidationError
+
+from app.schemas.basedagent import EditOp, EditOpsOutput
+
+
+def parse_edit_ops(payload, line_count: int) -> List[EditOp]:
+    """
+    Validates a generated {"type": "ops", "ops": [...]} payload (any decoded
+    JSON value) against the EditOpsOutput schema and the current file's line
+    count.
+    Raises ValueError with a model-readable message on any problem.
+    """
+    try:
+        ops = EditOpsOutput.model_validate(payload).ops
+    except ValidationError as e:
+        raise ValueError(f"Edit ops do not match the schema: {e}")
+    if not ops:
+        raise ValueError("No edit ops were returned.")
+
+    for n, op in enumerate(ops, start=1):
+        if op.op == "insert_after":
+            if op.line is None or not 0 <= op.line <= line_count:
+                raise ValueError(f"Op {n} (insert_after) needs a line between 0 and {line_count}.")
+            if op.text is None:
+                raise ValueError(f"Op {n} (insert_after) needs text.")
+        else:
+            if op.range is None:
+                raise ValueError(f"Op {n} ({op.op}) needs a [start, end] range.")
+            start, end = op.range
+            if not 1 <= start <= end <= line_count:
+                raise ValueError(
+                    f"Op {n} ({op.op}) range {list(op.range)} must satisfy 1 <= start <= end <= {line_count}."
+                )
+            if op.op == "replace" and op.text is None:
+                raise ValueError(f"Op {n} (replace) needs text.")
+    return ops
+
+
+def _text_lines(text: str) -> List[str]:
+    if not text:
+        return []
+    if not text.endswith("\n"):
+        text += "\n"
+    return text.splitlines(True)
+
+
+def apply_edit_ops(content: str, ops: List[EditOp]) -> str:
+    """
+    Applies edit ops to content. All line numbers refer to the original
+    content, so ops are independent of each other's order; overlapping
+    replace/delete ranges are rejected.
+    """
+    lines = content.splitlines(True)
+    edits = []  # (start, end, new_lines, order) over 0-based [start, end)
+    for order, op in enumerate(ops):
+        if op.op == "insert_after":
+            edits.append((op.line, op.line, _text_lines(op.text), order))
+        elif op.op == "replace":
+            edits.append((op.range[0] - 1, op.range[1], _text_lines(op.text), order))
+        else:
+            edits.append((op.range[0] - 1, op.range[1], [], order))
+    edits.sort(key=lambda e: (e[0], e[1], e[3]))
+
+    out = []
+    pos = 0
+    for start, end, new_lines, _ in edits:
+        if start < pos:
+            raise ValueError(f"Edit ops overlap at line {start + 1}.")
+        out.extend(lines[pos:start])
+        if new_lines and out and not out[-1].endswith("\n"):
+            out[-1] += "\n"
+        out.extend(new_lines)
+        pos = end
+    out.extend(lines[pos:])
+    return "".join(out)
@@ -12,18 +12,11 @@ def prompt_llm_json_output(
     """
     Calls a chat completions API (compatible with OpenRouter/OpenAI) to generate a JSON-based response.
     
-    Before sending the conversation, it counts the tokens using tokencost. If the total exceeds 128000 tokens,
-    it removes the oldest messages (starting from the fourth message onward) until the count is below the limit.
+    The conversation history embedded in the prompts is already trimmed to
+    CONVERSATION_TOKEN_BUDGET by ConversationContext.formatted.
     
     Returns a dictionary representing the parsed JSON response message from the LLM.
     """
-    # token_limit = 128000
-    # token_count = count_message_tokens(conversation, model=model)
-    # # Remove oldest messages after the first three until under limit.
-    # while token_count > token_limit and len(conversation) > 3:
-    #     conversation.pop(3)
-    #     token_count = count_message_tokens(conversation, model=model)
-
     # Initialize the OpenAI client.
     client = OpenAI(
         base_url=base_url,
@@ -1,12 +1,16 @@
 import uuid
 from datetime import datetime
-from app.core.config import BASED_GUIDE, UNIFIED_DIFF, VALIDATION_FUNCTION, USER_MESSAGE_BASED_GUIDELINES, TOOLS_DOCUMENTATION
+from app.core.config import BASED_GUIDE, UNIFIED_DIFF, VALIDATION_FUNCTION, USER_MESSAGE_BASED_GUIDELINES, TOOLS_DOCUMENTATION, DIFF_PROMPT_LINE_NUMBERS, CONVERSATION_TOKEN_BUDGET
 import app.core.unifieddiff as unifieddiff
 import json
 # Import from our local package modules
-from .validation import validate_based_code, validate_based_diff
+from .validation import validate_based_code, validate_based_diff, check_diff_hunks
 from .llm import prompt_llm_json_output
-from .triage import triageContext
+from .triage import triageContext, collect_referenced_based_files
+from .context import ConversationContext
+from .slicing import build_based_slice, number_lines
+from .metrics import record_diff_attempt
+from .edit_ops import parse_edit_ops, apply_edit_ops
 
 def handle_new_message(
     model: str, 
@@ -19,15 +23,25 @@ def handle_new_message(
     is_chat_or_composer: bool, 
     conversation: list, 
     chat_files_text: list, 
-    other_based_files: list
+    other_based_files: list,
+    conversation_context: ConversationContext = None,
+    edit_format: str = "diff"
 ) -> dict:
     """
     Process a new message using the Based agent logic.
+
+    conversation_context is the session's ConversationContext; it is synced
+    with `conversation` and shared by every stage so the history is only
+    formatted once per message. A fresh one is built if none is passed.
     
+    edit_format selects how edits to an existing file are generated:
+    "diff" (unified diff) or "ops" (structured edit ops, converted to a diff).
+
     Returns a dict with keys like:
       - "output": The generated text (complete .based content, a diff, or a plain message)
-      - "type": "based", "diff", or "response"
-      - Optionally "based_filename" if type is "based" or "diff"
+      - "type": "based", "diff", "ops", or "response"
+      - Optionally "based_filename" if type is "based", "diff" or "ops"
+      - Optionally "ops" (the applied edit ops) if type is "ops"
       - Optionally "message" if type is "response"
     """
 
@@ -46,6 +60,10 @@ def handle_new_message(
         "other_based_files": other_based_files
     })
 
+    if conversation_context is None:
+        conversation_context = ConversationContext(model=model)
+    conversation_context.sync(conversation)
+
     # 1) Triage the context
     max_attempts = 5
     attempt = 0
@@ -61,11 +79,18 @@ def handle_new_message(
                 other_based_files=other_based_files,
                 model=model,
                 model_ak=model_ak,
-                model_base_url=model_base_url
+                model_base_url=model_base_url,
+                conversation_context=conversation_context
             )
             
             content = triage_response["content"]
             triage_result = json.loads(content)
+            triage_result["extracted_context"] = conversation_context.extract(
+                triage_result.get("extraction_indices", [])
+            )
+            triage_result["referenced_based_files"] = collect_referenced_based_files(
+                other_based_files, triage_result.get("files_list", [])
+            )
             # Successfully parsed the JSON
             break
         except json.JSONDecodeError as e:
@@ -88,6 +113,7 @@ def handle_new_message(
         triage_result=triage_result,
         conversation=conversation,
         tools_documentation=TOOLS_DOCUMENTATION,   # reference wherever you store this
+        conversation_context=conversation_context,
         model=model,
         model_ak=model_ak,
         model_base_url=model_base_url
@@ -118,8 +144,9 @@ def handle_new_message(
             f"Context summary:\n{triage_result.get('summary', '')}\n\n"
             f"Extracted context:\n{triage_result.get('extracted_context', '')}\n\n"
             f"Files list:\n{', '.join(triage_result.get('files_list', []))}\n\n"
+            f"Referenced .based files:\n{triage_result.get('referenced_based_files', 'None')}\n\n"
             f"User prompt:\n{prompt}\n\n"
-            f"Past conversation:\n{conversation}\n\n"
+            f"Past conversation:\n{conversation_context.formatted(CONVERSATION_TOKEN_BUDGET)}\n\n"
             f"Selected .based file tostring:\n{str(selected_based_file)}\n\n"
             f"{json_format_instructions}\n"
             "Generate a plain text response summarizing addressing the prompt."
@@ -170,6 +197,15 @@ def handle_new_message(
             "message": generated_text
         }
     
+    elif edit_format == "ops":
+        # Generate structured edit ops to update an existing Based file
+        print("=== _generate_based_ops ===")
+        return _generate_based_ops(
+            model, model_ak, model_base_url,
+            selected_filename, prompt, selected_based_file, triage_result,
+            relevant_tools
+        )
+
     else:
         # Generate a diff to update an existing Based file
         print("=== _generate_based_diff ===")
@@ -181,6 +217,67 @@ def handle_new_message(
         )
 
 
+def _combine_tool_docs(relevant_tools: list) -> str:
+    """
+    Aggregates the full documentation text for each relevant tool.
+    """
+    relevant_docs = []
+    for tool_name in relevant_tools:
+        for t in TOOLS_DOCUMENTATION:
+            if t["name"] == tool_name:
+                # Use short description or the full 'docs' to pass along
+                relevant_docs.append(f"Tool Name: {t['name']}\nFunction: {t['function']}\nDocs:\n{t['docs']}")
+                break
+    return "\n\n".join(relevant_docs)
+
+
+def _render_current_content(
+    current_based_content: str,
+    prompt: str,
+    triage_result: dict,
+    selected_filename: str,
+    numbered: bool = DIFF_PROMPT_LINE_NUMBERS
+):
+    """
+    Builds the "current file" section of an edit prompt.
+
+    Large files are sliced: only the blocks most relevant to the prompt are sent
+    (with excerpt-local line numbers) plus an outline of the rest. Otherwise the
+    whole file is sent, with line-number gutters if `numbered` is set.
+
+    Returns (section_text, rendered_content, based_slice) where rendered_content
+    is the exact text the model's line numbers refer to, and based_slice is None
+    unless the file was sliced.
+    """
+    based_slice = build_based_slice(
+        current_based_content,
+        query=f"{prompt}\n{triage_result.get('summary', '')}"
+    )
+    if based_slice is not None:
+        print(f"Slicing {selected_filename}: sending file lines {based_slice.ranges}")
+        current_content_section = (
+            "Current Based file excerpt (only the blocks relevant to the request are shown; "
+            "the numbers before ' | ' are excerpt line numbers and are NOT part of the code):\n"
+            f"{based_slice.render()}\n\n"
+            f"Outline of the rest of the file (file line numbers):\n{based_slice.outline_of_rest()}\n\n"
+            "Edit the excerpt: refer to excerpt line numbers in your edits "
+            "and keep each edit inside a single excerpt block.\n\n"
+        )
+        rendered_content = based_slice.excerpt()
+    elif numbered:
+        current_content_section = (
+            "Current Based file content (the numbers before ' | ' are line numbers and are NOT part of the code; "
+            "use them to refer to lines in your edits):\n"
+            f"{number_lines(current_based_content)}\n\n"
+        )
+        rendered_content = current_based_content
+    else:
+        current_content_section = f"Current Based file content:\n{current_based_content}\n\n"
+        rendered_content = current_based_content
+
+    return current_content_section, rendered_content, based_slice
+
+
 def _generate_whole_based_file(
     model: str,
     model_ak: str,
@@ -194,16 +291,7 @@ def _generate_whole_based_file(
     Helper for handle_new_message: create a brand new .based file.
     """
 
-    # This step aggregates the full documentation text for each relevant tool.
-    relevant_docs = []
-    for tool_name in relevant_tools:
-        for t in TOOLS_DOCUMENTATION:
-            if t["name"] == tool_name:
-                # Use short description or the full 'docs' to pass along
-                relevant_docs.append(f"Tool Name: {t['name']}\nFunction: {t['function']}\nDocs:\n{t['docs']}")
-                break
-
-    combined_tool_docs = "\n\n".join(relevant_docs)
+    combined_tool_docs = _combine_tool_docs(relevant_tools)
 
     # Build the system prompt
      # Build the system prompt
@@ -218,6 +306,7 @@ def _generate_whole_based_file(
         f"Extracted context:\n{triage_result.get('extracted_context', '')}\n\n"
         f"Relevant Tools Docs:\n{combined_tool_docs}\n\n"
         f"Files list:\n{', '.join([json.dumps(item) if isinstance(item, dict) else str(item) for item in triage_result.get('files_list', [])])}\n\n"
+        f"Referenced .based files:\n{triage_result.get('referenced_based_files', 'None')}\n\n"
         f"User prompt:\n{prompt}\n\n"
         f"{json_format_instructions}\n"
         "Please generate the complete .based file content."
@@ -319,21 +408,19 @@ def _generate_based_diff(
     """
     Helper for handle_new_message: generate a diff to update an existing .based file.
     Uses a more flexible approach to diff validation.
+
+    For large, sliced files the returned diff is mapped back to absolute
+    line numbers before it is applied.
     """
     print("\n\n\n\n\n\nSelected based file")
     print(selected_based_file)
     current_based_content = selected_based_file.get("latest_content", "")
 
-    # This step aggregates the full documentation text for each relevant tool.
-    relevant_docs = []
-    for tool_name in relevant_tools:
-        for t in TOOLS_DOCUMENTATION:
-            if t["name"] == tool_name:
-                # Use short description or the full 'docs' to pass along
-                relevant_docs.append(f"Tool Name: {t['name']}\nFunction: {t['function']}\nDocs:\n{t['docs']}")
-                break
+    current_content_section, rendered_content, based_slice = _render_current_content(
+        current_based_content, prompt, triage_result, selected_filename
+    )
 
-    combined_tool_docs = "\n\n".join(relevant_docs)
+    combined_tool_docs = _combine_tool_docs(relevant_tools)
 
     # Build a clearer system prompt with examples
     json_format_instructions = (
@@ -390,8 +477,9 @@ def _generate_based_diff(
         f"Extracted context:\n{triage_result.get('extracted_context', '')}\n\n"
         f"Relevant Tools:\n{combined_tool_docs}\n\n"
         f"Files list:\n{', '.join(triage_result.get('files_list', []))}\n\n"
+        f"Referenced .based files:\n{triage_result.get('referenced_based_files', 'None')}\n\n"
         f"Current Based file name:\n{selected_filename}\n\n"
-        f"Current Based file content:\n{current_based_content}\n\n"
+        f"{current_content_section}"
         f"User prompt:\n{prompt}\n\n"
         f"IMPORTANT: Generate a proper unified diff format. Here are valid examples:\n\n"
         f"Example 1 - Adding new lines:\n{example_diff_basic}\n\n"
@@ -441,9 +529,16 @@ def _generate_based_diff(
             
             print("\n\n\n\n\n\n\nSuccessfully parsed diff\n\n\n\n\n\n\n")
             
-            # Skip the strict local check, just make sure the diff can be applied
+            # Check the hunks against the numbered source the model was shown,
+            # then make sure the diff can be applied, before calling the remote validator
             try:
+                hunk_check = check_diff_hunks(generated_diff, rendered_content)
+                if hunk_check.get("status") != "success":
+                    raise ValueError(hunk_check.get("error"))
+                if based_slice is not None:
+                    generated_diff = based_slice.to_absolute_patch(generated_diff)
                 new_content = unifieddiff.apply_patch(current_based_content, generated_diff)
+                record_diff_attempt(model, attempt, applied=True)
                 print("\n\n\n\n\n\n\nSuccessfully applied local diff patch\n\n\n\n\n\n\n")
                 print("new_content:", new_content)
                 
@@ -465,14 +560,16 @@ def _generate_based_diff(
                     
             except Exception as e:
                 # If the diff can't be applied at all, try again
+                record_diff_attempt(model, attempt, applied=False)
                 llm_conversation[0]["content"] += f"\nFailed to apply diff: {str(e)}\n"
                 llm_conversation[0]["content"] += "Please generate a simpler, cleaner diff that follows unified diff format."
                 attempt += 1
                 continue
                 
-        except json.JSONDecodeError as e:
+        except (json.JSONDecodeError, ValueError) as e:
             # Handle JSON parsing error
             print(f"JSON parsing error (attempt {attempt+1}): {str(e)}")
+            record_diff_attempt(model, attempt, applied=False)
             llm_conversation[0]["content"] += (
                 f"\n\nYour previous response could not be parsed as JSON. "
                 f"Please ensure you return a valid JSON object exactly in this format: "
@@ -487,6 +584,115 @@ def _generate_based_diff(
     }
 
 
+def _generate_based_ops(
+    model: str,
+    model_ak: str,
+    model_base_url: str,
+    selected_filename: str,
+    prompt: str,
+    selected_based_file: dict,
+    triage_result: dict,
+    relevant_tools: list
+) -> dict:
+    """
+    Helper for handle_new_message: generate structured edit ops
+    (insert_after / replace / delete) for an existing .based file.
+    The ops are validated against the EditOpsOutput schema, applied server-side
+    and converted with make_patch, so callers receive a regular diff.
+    """
+    current_based_content = selected_based_file.get("latest_content", "")
+    current_content_section, rendered_content, based_slice = _render_current_content(
+        current_based_content, prompt, triage_result, selected_filename, numbered=True
+    )
+    combined_tool_docs = _combine_tool_docs(relevant_tools)
+
+    json_format_instructions = (
+        "Return a JSON object in the following format, where ops is the list of edits to apply to the current Based file: "
+        "{ \"type\": \"ops\", \"filename\": <string>, \"ops\": [ ... ] }.\n"
+        "Each op is one of:\n"
+        " - { \"op\": \"insert_after\", \"line\": <int, 0 for the top of the file>, \"text\": <string> }\n"
+        " - { \"op\": \"replace\", \"range\": [<start>, <end>], \"text\": <string> }\n"
+        " - { \"op\": \"delete\", \"range\": [<start>, <end>] }\n"
+        "Ranges are inclusive and all line numbers refer to the numbered content shown above, "
+        "before any op is applied. Ops must not overlap. text must keep the file's indentation."
+    )
+
+    generation_prompt = (
+        f"Based on the following context, generate edit operations to update the existing Based file.\n\n"
+        f"BASED_GUIDE:\n{BASED_GUIDE}\n\n"
+        f"Context summary:\n{triage_result.get('summary', '')}\n\n"
+        f"Extracted context:\n{triage_result.get('extracted_context', '')}\n\n"
+        f"Relevant Tools:\n{combined_tool_docs}\n\n"
+        f"Files list:\n{', '.join(triage_result.get('files_list', []))}\n\n"
+        f"Referenced .based files:\n{triage_result.get('referenced_based_files', 'None')}\n\n"
+        f"Current Based file name:\n{selected_filename}\n\n"
+        f"{current_content_section}"
+        f"User prompt:\n{prompt}\n\n"
+        f"{json_format_instructions}\n"
+        "Use as few and as small ops as possible. Do NOT modify existing code unless necessary."
+    )
+
+    llm_conversation = [
+        {"role": "system", "content": generation_prompt},
+        {"role": "user", "content": "Generate the edit ops for updating the Based file."}
+    ]
+
+    max_attempts = 5
+    attempt = 0
+
+    while attempt < max_attempts:
+        try:
+            generation_response = prompt_llm_json_output(
+                conversation=llm_conversation,
+                model=model,
+                base_url=model_base_url,
+                api_key=model_ak
+            )
+            content = generation_response.get("content")
+            generated_ops_obj = json.loads(content)
+            print("\n\n\n\n\n\n\n\n")
+            print(generated_ops_obj)
+            print("\n\n\n\n\n\n\n")
+
+            ops = parse_edit_ops(generated_ops_obj, len(rendered_content.splitlines()))
+            new_rendered = apply_edit_ops(rendered_content, ops)
+            generated_diff = unifieddiff.make_patch(rendered_content, new_rendered)
+            if not generated_diff:
+                raise ValueError("The edit ops do not change the file.")
+            if based_slice is not None:
+                generated_diff = based_slice.to_absolute_patch(generated_diff)
+            unifieddiff.apply_patch(current_based_content, generated_diff)
+            record_diff_attempt(model, attempt, applied=True)
+        except (json.JSONDecodeError, ValueError) as e:
+            print(f"Edit ops error (attempt {attempt+1}): {str(e)}")
+            record_diff_attempt(model, attempt, applied=False)
+            llm_conversation[0]["content"] += (
+                f"\n\nYour previous response could not be applied: {str(e)}\n"
+                "Please return a valid JSON object exactly in the format described above."
+            )
+            attempt += 1
+            continue
+
+        # External validation of the resulting content
+        validation_result = validate_based_diff(generated_diff, current_based_content)
+        if validation_result.get("status") == "success":
+            return {
+                "output": validation_result.get("converted_diff", generated_diff),
+                "ops": [op.dict() for op in ops],
+                "type": "ops",
+                "based_filename": selected_filename if selected_filename else "existing_based_file.based"
+            }
+        error_msg = validation_result.get("error", "Unknown validation error")
+        llm_conversation[0]["content"] += f"\nValidation error after applying your ops: {error_msg}\n"
+        attempt += 1
+
+    return {
+        "output": "Error: Unable to generate valid Based edit ops after multiple attempts.",
+        "type": "response",
+        "message": "Edit ops validation failed repeatedly."
+    }
+
+
 def tool_context_agent(
     prompt: str,
     triage_result: dict,
@@ -494,7 +700,8 @@ def tool_context_agent(
     tools_documentation: list,
     model: str,
     model_ak: str,
-    model_base_url: str
+    model_base_url: str,
+    conversation_context: ConversationContext = None
 ) -> dict:
     """
     Decides which tools might be relevant to the user's request.
@@ -508,6 +715,10 @@ def tool_context_agent(
     or an empty "tools" list if none are relevant.
     """
 
+    if conversation_context is None:
+        conversation_context = ConversationContext(model=model)
+    conversation_context.sync(conversation)
+
     # Summarize the tool docs in a concise manner to the LLM
     # Or you can pass them in more detail if you prefer
     tools_summary = []
@@ -526,7 +737,7 @@ Here is the triage result:
 {triage_result}
 
 Here is the conversation so far:
-{conversation}
+{conversation_context.formatted(CONVERSATION_TOKEN_BUDGET)}
 
 Below is a list of available tools:
 
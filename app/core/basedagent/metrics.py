@@ -0,0 +1,40 @@
+from collections import defaultdict
+from threading import Lock
+
+_lock = Lock()
+_diff_metrics = defaultdict(lambda: {
+    "diff_requests": 0,
+    "first_attempt_applied": 0,
+    "attempts": 0,
+    "applied_attempts": 0,
+})
+
+
+def record_diff_attempt(model: str, attempt: int, applied: bool) -> None:
+    """
+    Records one diff generation attempt for a model. `applied` means the
+    returned hunks matched the numbered source and applied locally.
+    Attempt 0 is the first attempt of a request.
+    """
+    with _lock:
+        stats = _diff_metrics[model]
+        stats["attempts"] += 1
+        stats["applied_attempts"] += int(applied)
+        if attempt == 0:
+            stats["diff_requests"] += 1
+            stats["first_attempt_applied"] += int(applied)
+
+
+def get_diff_metrics() -> dict:
+    """
+    Returns per-model diff metrics, including the first-attempt apply success rate.
+    """
+    with _lock:
+        result = {}
+        for model, stats in _diff_metrics.items():
+            requests = stats["diff_requests"]
+            result[model] = {
+                **stats,
+                "first_attempt_apply_rate": (stats["first_attempt_applied"] / requests) if requests else None,
+            }
+        return result
@@ -0,0 +1,132 @@
+import re
+import hashlib
+from collections import OrderedDict
+
+# Talk prompts longer than this are truncated in outlines
+OUTLINE_TALK_PROMPT_CHARS = 80
+# Number of outlines kept in the per-process cache
+OUTLINE_CACHE_SIZE = 256
+
+_loop_pat = re.compile(r"^loop\s*:")
+_until_pat = re.compile(r"^until\s+(.+?)\s*:\s*$")
+_def_pat = re.compile(r"^def\s+([A-Za-z_]\w*)\s*\(")
+_call_pat = re.compile(r"([A-Za-z_][\w\.]*)\s*\(")
+_string_pat = re.compile(r"""[rfbRFB]{0,2}("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')""")
+
+_ignored_calls = {
+    "talk", "print", "str", "int", "float", "bool", "len", "dict", "list",
+    "set", "tuple", "range", "isinstance", "enumerate", "zip", "min", "max",
+    "if", "elif", "while", "for", "return", "not", "and", "or", "in",
+}
+
+_outline_cache = OrderedDict()
+
+
+def _truncate(text: str, limit: int = OUTLINE_TALK_PROMPT_CHARS) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "..."
+
+
+def _talk_prompt(lines: list, start: int) -> str:
+    """
+    Returns the (truncated) first string argument of the talk(...) call
+    starting on lines[start]. The call may span a few lines.
+    """
+    snippet = " ".join(l.strip() for l in lines[start:start + 6])
+    after_talk = snippet[snippet.find("talk(") + len("talk("):]
+    m = _string_pat.search(after_talk)
+    if not m:
+        return "talk(...)"
+    literal = m.group(1)
+    quote = literal[0]
+    return f"talk({quote}{_truncate(literal[1:-1])}{quote})"
+
+
+def extract_based_outline(content: str) -> str:
+    """
+    Builds a compact outline of a Based file:
+      - top-level and nested loop blocks with their (truncated) talk prompts
+      - until conditions
+      - def blocks
+      - the functions/tools called inside each block
+    Each outline line is prefixed with the 1-based source line number.
+    """
+    lines = content.splitlines()
+    entries = []        # [line_no, depth, header, calls]
+    stack = []          # [(indent, entry)]
+    top_level_calls = []
+
+    for i, raw in enumerate(lines):
+        stripped = raw.strip()
+        if not stripped or stripped.startswith("#"):
+            continue
+        indent = len(raw) - len(raw.lstrip())
+
+        while stack and stack[-1][0] >= indent:
+            stack.pop()
+        # A loop's body is its talk line, so attribute it to the loop header
+        parent = stack[-1][1] if stack else None
+
+        header = None
+        if _loop_pat.match(stripped):
+            header = "loop:"
+        elif _until_pat.match(stripped):
+            header = f"until {_truncate(_until_pat.match(stripped).group(1))}:"
+        elif _def_pat.match(stripped):
+            header = f"def {_def_pat.match(stripped).group(1)}(...)"
+
+        if header is not None:
+            entry = [i + 1, len(stack), header, []]
+            entries.append(entry)
+            stack.append((indent, entry))
+            continue
+
+        if "talk(" in stripped and parent is not None and parent[2] == "loop:":
+            parent[2] = f"loop: {_talk_prompt(lines, i)}"
+
+        calls = parent[3] if parent is not None else top_level_calls
+        for name in _call_pat.findall(_string_pat.sub('""', stripped)):
+            if name in _ignored_calls or name.endswith(".format"):
+                continue
+            if name not in calls:
+                calls.append(name)
+
+    outline_lines = []
+    if top_level_calls:
+        outline_lines.append(f"(top level) calls: {', '.join(top_level_calls)}")
+    for line_no, depth, header, calls in entries:
+        text = f"L{line_no}: {'  ' * depth}{header}"
+        if calls:
+            text += f" -> calls: {', '.join(calls)}"
+        outline_lines.append(text)
+    return "\n".join(outline_lines) if outline_lines else "(empty)"
+
+
+def get_based_outline(content: str, version_id: str = None) -> str:
+    """
+    Cached wrapper around extract_based_outline. Outlines are keyed by the
+    version id when one is known (versions are immutable), otherwise by a
+    hash of the content.
+    """
+    key = version_id or hashlib.sha256(content.encode("utf-8")).hexdigest()
+    if key in _outline_cache:
+        _outline_cache.move_to_end(key)
+        return _outline_cache[key]
+
+    outline = extract_based_outline(content)
+    _outline_cache[key] = outline
+    if len(_outline_cache) > OUTLINE_CACHE_SIZE:
+        _outline_cache.popitem(last=False)
+    return outline
+
+
+def latest_version_id(based_file: dict):
+    """
+    Returns the id of the latest version of a .based file dict
+    (as found in chat_files_based), or None if it has no versions.
+    """
+    versions = based_file.get("versions") or []
+    if not versions:
+        return None
+    latest = versions[-1]
+    return latest.get("version_id") if isinstance(latest, dict) else getattr(latest, "version_id", None)
@@ -0,0 +1,201 @@
+import re
+import app.core.unifieddiff as unifieddiff
+from .outline import extract_based_outline
+
+# Files with at most this many lines are always sent whole
+DIFF_SLICE_MIN_LINES = 300
+# Rough upper bound on the number of source lines sent in an excerpt
+DIFF_SLICE_MAX_LINES = 150
+
+_word_pat = re.compile(r"[A-Za-z_][A-Za-z0-9_]{2,}")
+_block_start_pat = re.compile(r"^(loop\s*:|until\s|def\s)")
+_stopwords = {
+    "the", "and", "for", "that", "this", "with", "from", "into", "when", "then",
+    "should", "would", "could", "please", "make", "add", "change", "update",
+    "file", "based", "agent", "user", "can", "you", "your", "want", "need",
+}
+
+
+def number_lines(content: str, start: int = 1) -> str:
+    """
+    Renders content with stable right-aligned line-number gutters: "  12 | code".
+    """
+    lines = content.splitlines()
+    width = len(str(start + len(lines) - 1)) if lines else 1
+    return "\n".join(f"{n:>{width}} | {line}" for n, line in enumerate(lines, start=start))
+
+
+def parse_based_blocks(content: str) -> list:
+    """
+    Splits a Based file into top-level blocks. Each top-level `loop:`,
+    `until ...:` or `def` line starts a new block that runs until the next
+    top-level statement; any other top-level code is grouped into its own block.
+
+    Returns a list of dicts {"start", "end", "kind", "header"} with 1-based,
+    inclusive line numbers covering the whole file.
+    """
+    lines = content.splitlines()
+    blocks = []
+    current = None
+    for i, raw in enumerate(lines, start=1):
+        stripped = raw.strip()
+        is_top_level = bool(stripped) and raw[0] not in (" ", "\t") and not stripped.startswith("#")
+        if is_top_level:
+            m = _block_start_pat.match(stripped)
+            kind = m.group(1).split()[0].rstrip(":") if m else "code"
+            if current is None or m or current["kind"] != "code":
+                current = {"start": i, "end": i, "kind": kind, "header": stripped}
+                blocks.append(current)
+                continue
+        if current is None:
+            current = {"start": i, "end": i, "kind": "code", "header": stripped}
+            blocks.append(current)
+        current["end"] = i
+    return blocks
+
+
+def _query_terms(query: str) -> set:
+    return {w.lower() for w in _word_pat.findall(query)} - _stopwords
+
+
+def rank_based_blocks(blocks: list, lines: list, query: str) -> list:
+    """
+    Scores each block against the query (distinct query terms present,
+    plus a small bonus for repeated hits). Returns (score, block) pairs,
+    best first.
+    """
+    terms = _query_terms(query)
+    ranked = []
+    for block in blocks:
+        text = "\n".join(lines[block["start"] - 1:block["end"]]).lower()
+        words = _word_pat.findall(text)
+        hits = sum(1 for w in words if w in terms)
+        distinct = len(terms.intersection(words))
+        ranked.append((distinct + 0.1 * hits, block))
+    ranked.sort(key=lambda pair: -pair[0])
+    return ranked
+
+
+class BasedSlice:
+    """
+    An excerpt of a Based file made of a few line ranges ("segments").
+    The model sees the excerpt with its own local line numbers and writes a
+    unified diff against it; to_absolute_patch maps that diff back onto the
+    full file.
+    """
+
+    def __init__(self, content: str, ranges: list):
+        self.lines = content.splitlines(True)
+        self.segments = []  # (local_start, abs_start, length), 0-based
+        local = 0
+        for start, end in ranges:
+            length = end - start + 1
+            self.segments.append((local, start - 1, length))
+            local += length
+        self.ranges = ranges
+
+    def excerpt(self) -> str:
+        return "".join(
+            "".join(self.lines[abs_start:abs_start + length])
+            for _, abs_start, length in self.segments
+        )
+
+    def render(self) -> str:
+        """
+        The excerpt with excerpt-local line-number gutters, one header per segment.
+        """
+        out = []
+        for local_start, abs_start, length in self.segments:
+            out.append(
+                f"[excerpt lines {local_start + 1}-{local_start + length} "
+                f"= file lines {abs_start + 1}-{abs_start + length}]"
+            )
+            segment = "".join(self.lines[abs_start:abs_start + length])
+            out.append(number_lines(segment, start=local_start + 1))
+        return "\n".join(out)
+
+    def outline_of_rest(self) -> str:
+        """
+        Outline (with absolute line numbers) of everything not in the excerpt.
+        """
+        selected = set()
+        for _, abs_start, length in self.segments:
+            selected.update(range(abs_start + 1, abs_start + length + 1))
+        outline_lines = extract_based_outline("".join(self.lines)).split("\n")
+        rest = [
+            line for line in outline_lines
+            if not (line.startswith("L") and int(line[1:line.index(":")]) in selected)
+        ]
+        return "\n".join(rest) if rest else "(nothing else)"
+
+    def _to_absolute(self, local_pos: int, old_len: int) -> int:
+        """
+        Maps an excerpt-local 0-based insertion point to the full file,
+        checking that the old side of the hunk stays inside one segment.
+        """
+        for local_start, abs_start, length in self.segments:
+            if local_start <= local_pos <= local_start + length:
+                if local_pos + old_len > local_start + length:
+                    raise ValueError(
+                        f"Hunk at excerpt line {local_pos + 1} spans a gap between excerpt blocks; "
+                        "keep each hunk inside one excerpt block."
+                    )
+                return abs_start + (local_pos - local_start)
+        raise ValueError(f"Hunk at excerpt line {local_pos + 1} is outside the excerpt.")
+
+    def to_absolute_patch(self, patch: str) -> str:
+        """
+        Rewrites a diff written against the excerpt so that its @@ headers refer
+        to absolute line numbers in the full file. Line counts are recomputed
+        from the hunk bodies.
+        """
+        out = []
+        delta = 0
+        for old_start, old_len, _, _, body in unifieddiff.parse_hunks(patch):
+            old_count = sum(1 for l in body if l[:1] in (" ", "-"))
+            new_count = sum(1 for l in body if l[:1] in (" ", "+"))
+            local_pos = old_start - 1 + (old_len == 0)
+            abs_pos = self._to_absolute(local_pos, old_count)
+            out.append(unifieddiff.hunk_header(abs_pos, old_count, abs_pos + delta, new_count))
+            out.extend(body)
+            delta += new_count - old_count
+        return "".join(out)
+
+
+def build_based_slice(content: str, query: str, max_lines: int = DIFF_SLICE_MAX_LINES):
+    """
+    Picks the top-level blocks most relevant to the query, up to roughly
+    max_lines source lines. Returns a BasedSlice, or None when the file is
+    small enough to send whole or nothing in it matches the query.
+    """
+    lines = content.splitlines()
+    if len(lines) <= DIFF_SLICE_MIN_LINES:
+        return None
+
+    blocks = parse_based_blocks(content)
+    ranked = rank_based_blocks(blocks, lines, query)
+    if not ranked or ranked[0][0] <= 0:
+        return None
+
+    chosen = []
+    total = 0
+    for score, block in ranked:
+        if score <= 0:
+            break
+        size = block["end"] - block["start"] + 1
+        if chosen and total + size > max_lines:
+            continue
+        chosen.append(block)
+        total += size
+
+    # Merge adjacent blocks into contiguous ranges
+    ranges = []
+    for block in sorted(chosen, key=lambda b: b["start"]):
+        if ranges and ranges[-1][1] + 1 == block["start"]:
+            ranges[-1] = (ranges[-1][0], block["end"])
+        else:
+            ranges.append((block["start"], block["end"]))
+
+    if sum(end - start + 1 for start, end in ranges) >= len(lines):
+        return None
+    return BasedSlice(content, ranges)
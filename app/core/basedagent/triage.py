@@ -1,5 +1,7 @@
-from app.core.config import BASED_GUIDE
+from app.core.config import BASED_GUIDE, CONVERSATION_TOKEN_BUDGET
 from .llm import prompt_llm_json_output
+from .context import ConversationContext
+from .outline import get_based_outline, latest_version_id
 
 def triageContext(
     selected_based_file: dict,
@@ -9,7 +11,8 @@ def triageContext(
     other_based_files: list,
     model: str,
     model_ak: str,
-    model_base_url: str
+    model_base_url: str,
+    conversation_context: ConversationContext = None
 ) -> dict:
     """
     Builds a detailed system prompt that instructs the LLM to filter and
@@ -22,7 +25,9 @@ def triageContext(
        - genNewFile
        - files_list
        - plain_response
-       - extracted_context (populated after we parse extraction_indices)
+
+    If a ConversationContext is passed, its cached numbered lines are reused
+    instead of re-formatting the whole conversation.
     """
     system_prompt = (
         "You are the context filter for an agent in charge of generating Based code. "
@@ -32,10 +37,11 @@ def triageContext(
         "You are provided with the following context:\n"
     )
 
-    # 1) Format conversation with line numbers
-    formatted_conversation = "\n".join(
-        [f"{i+1}: {msg['role']} - {msg['content']}" for i, msg in enumerate(conversation)]
-    )
+    # 1) Format conversation with line numbers (one line per message)
+    if conversation_context is None:
+        conversation_context = ConversationContext(model=model)
+    conversation_context.sync(conversation)
+    formatted_conversation = conversation_context.formatted(CONVERSATION_TOKEN_BUDGET)
 
     # 2) Format non-based chat files
     formatted_chat_files = (
@@ -45,14 +51,15 @@ def triageContext(
         if chat_files_text else "None"
     )
 
-    # 3) Format other .based files
+    # 3) Outline other .based files (full content is only pulled in later
+    #    for the files triage names in files_list)
     formatted_other_based = "None"
     if other_based_files:
         lines = []
         for i, bf in enumerate(other_based_files, start=1):
-            latest_content = bf.get("latest_content", "")
+            outline = get_based_outline(bf.get("latest_content", ""), latest_version_id(bf))
             lines.append(
-                f"{i}: Name: {bf['name']}\nLatest content:\n{latest_content}\n"
+                f"{i}: Name: {bf['name']}\nOutline:\n{outline}\n"
             )
         formatted_other_based = "\n".join(lines)
 
@@ -76,6 +83,7 @@ def triageContext(
         "Based on this context, produce a JSON output with the following keys:\n"
         "genNewFile should only be true if generating a new file from SCRATCH, if editing a file, a diff needs to be made, so genNewFile must be FALSE\n"
         "Extraction indices should be a list of tuples, where each tuple is a range of lines that need to be extracted from the conversation history.\n"
+        "files_list must name every other based file whose full content is needed for the next step; only outlines of them are shown above\n"
         "plain_response must be a boolean representing whether a simple chat response is to be made, or a Based file or diff needs to be generated. if the latter two, plain_response MUST be false\n"
         " - summary\n - extraction_indices\n - genNewFile\n - files_list (string array of the file names)\n - plain_response\n\n"
         "Return only valid JSON."
@@ -93,17 +101,16 @@ def triageContext(
         api_key=model_ak
     )
 
-    # Post-process extraction_indices
-    extraction_indices = response.get("extraction_indices", [])
-    extracted_context = ""
-    if extraction_indices:
-        lines = formatted_conversation.split("\n")
-        extracted_lines = []
-        for pair in extraction_indices:
-            if isinstance(pair, list) and len(pair) == 2:
-                start, end = pair
-                extracted_lines.extend(lines[start-1:end])
-        extracted_context = "\n".join(extracted_lines)
+    return response
 
-    response["extracted_context"] = extracted_context
-    return response
\ No newline at end of file
+def collect_referenced_based_files(other_based_files: list, files_list: list) -> str:
+    """
+    Returns the full content of the other .based files that triage named
+    in files_list, formatted for the generation prompts.
+    """
+    names = {str(name) for name in files_list or []}
+    blocks = []
+    for bf in other_based_files or []:
+        if bf.get("name") in names:
+            blocks.append(f"Name: {bf['name']}\nFull content:\n{bf.get('latest_content', '')}\n")
+    return "\n".join(blocks) if blocks else "None"
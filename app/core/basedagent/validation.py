@@ -1,13 +1,45 @@
+import hashlib
 import requests
+from collections import OrderedDict
 from app.core.config import VALIDATION_ENDPOINT
 import app.core.unifieddiff as unifieddiff
 
+# Number of successful validation results kept, keyed by the SHA-256 of the code
+VALIDATION_CACHE_SIZE = 128
+
+_validation_cache = OrderedDict()
+
+
+def _cached_validation(code: str):
+    """
+    Returns a copy of the cached successful validation result for this exact
+    code (the same content hash used for version blobs), or None.
+    """
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    if key not in _validation_cache:
+        return None
+    _validation_cache.move_to_end(key)
+    return dict(_validation_cache[key])
+
+
+def _store_validation(code: str, result: dict) -> None:
+    # Only successes are cached; errors may be transient (timeouts, endpoint down)
+    if result.get("status") != "success":
+        return
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+    _validation_cache[key] = dict(result)
+    if len(_validation_cache) > VALIDATION_CACHE_SIZE:
+        _validation_cache.popitem(last=False)
+
 
 def validate_based_code(code: str) -> dict:
     """
     Calls the external validation endpoint to validate a full Based file.
     Expects a JSON response with "status" and, on success, "converted_code".
     """
+    cached = _cached_validation(code)
+    if cached is not None:
+        return cached
     payload = {"code": code}
     print("=== validate_based_code ===")
     print(payload)
@@ -16,11 +48,58 @@ def validate_based_code(code: str) -> dict:
         result = r.json()
         print("=== validate_based_code ===")
         print(result)
+        _store_validation(code, result)
         return result
     except Exception as e:
         return {"status": "error", "error": str(e)}
 
 
+def check_diff_hunks(diff: str, current_content: str) -> dict:
+    """
+    Local pre-check for a generated diff, run before the external validator.
+    Verifies that every hunk's line numbers point inside the file and that its
+    context ('  ') and removed ('-') lines match the current content at those
+    line numbers. Returns {"status": "success"} or {"status": "error", "error": ...}
+    with one message per mismatching hunk.
+    """
+    source = current_content.splitlines()
+    try:
+        hunks = unifieddiff.parse_hunks(diff)
+    except Exception as e:
+        return {"status": "error", "error": f"Malformed diff: {str(e)}"}
+    if not hunks:
+        return {"status": "error", "error": "The diff contains no @@ hunks."}
+
+    errors = []
+    previous_end = 0
+    for n, (old_start, old_len, new_start, new_len, body) in enumerate(hunks, start=1):
+        header = f"@@ -{old_start},{old_len} +{new_start},{new_len} @@"
+        position = old_start - 1 + (old_len == 0)
+        old_lines = [l[1:].rstrip("\r\n") for l in body if l[:1] in (" ", "-")]
+        if position < previous_end:
+            errors.append(f"Hunk {n} ({header}) overlaps or precedes the previous hunk.")
+            continue
+        if position + len(old_lines) > len(source):
+            errors.append(
+                f"Hunk {n} ({header}) refers to lines {position + 1}-{position + len(old_lines)} "
+                f"but the file only has {len(source)} lines."
+            )
+            continue
+        for offset, expected in enumerate(old_lines):
+            actual = source[position + offset]
+            if actual.rstrip() != expected.rstrip():
+                errors.append(
+                    f"Hunk {n} ({header}): line {position + offset + 1} is {actual!r} "
+                    f"but the diff expects {expected!r}."
+                )
+                break
+        previous_end = position + len(old_lines)
+
+    if errors:
+        return {"status": "error", "error": " ".join(errors)}
+    return {"status": "success"}
+
+
 def validate_based_diff(diff: str, current_content: str) -> dict:
     """
     Validate a generated Based diff with a more flexible approach that focuses on 
@@ -35,6 +114,13 @@ def validate_based_diff(diff: str, current_content: str) -> dict:
         
         # Skip the exact diff comparison - focus on whether the resulting content is valid
         
+        # Identical content was already validated
+        cached = _cached_validation(new_content)
+        if cached is not None:
+            cached["updated_content"] = new_content
+            cached["converted_diff"] = diff
+            return cached
+
         # Validate the updated content via external endpoint
         payload = {"code": new_content}
         print("\n\n\n\n\n\n\n\n\n=== validate_based_diff payload ===")
@@ -52,6 +138,7 @@ def validate_based_diff(diff: str, current_content: str) -> dict:
             print(result)
             # On success, attach updated content and original diff to the return object
             if result.get("status") == "success":
+                _store_validation(new_content, result)
                 result["updated_content"] = new_content
                 result["converted_diff"] = diff  # Keep the original diff
                 return result
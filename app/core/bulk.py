@@ -0,0 +1,41 @@
+# app/core/bulk.py
+"""
+Bulk data-layer helpers: one executemany INSERT for many rows, and one
+IN (...) lookup for many ids, instead of an ORM object or a query per row.
+"""
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.models.file import File as FileModel
+
+# Ids per IN (...) lookup; stays well under SQLite's bound-parameter limit
+IN_CHUNK_SIZE = 500
+
+
+def bulk_insert(db: Session, model, rows: list) -> int:
+    """
+    Inserts `rows` (dicts of column values) into the table of `model` with a
+    single executemany INSERT. Column defaults apply; no ORM objects are
+    created, so the rows are not in the session's identity map.
+    Returns the number of rows. Does not commit.
+    """
+    if rows:
+        db.execute(insert(model.__table__), rows)
+    return len(rows)
+
+
+def workspace_files_by_id(db: Session, workspace_id: str, file_ids: list) -> dict:
+    """
+    Returns {file id: (id, filename, path, s3_url)} for the ids that are files
+    of the workspace, in one IN (...) query per IN_CHUNK_SIZE ids.
+    """
+    found = {}
+    unique_ids = list(dict.fromkeys(file_ids))
+    for start in range(0, len(unique_ids), IN_CHUNK_SIZE):
+        chunk = unique_ids[start:start + IN_CHUNK_SIZE]
+        rows = db.execute(
+            select(FileModel.id, FileModel.filename, FileModel.path, FileModel.s3_url)
+            .where(FileModel.workspace_id == workspace_id, FileModel.id.in_(chunk))
+        ).all()
+        found.update((row.id, row) for row in rows)
+    return found
@@ -0,0 +1,267 @@
+# app/core/compaction.py
+import asyncio
+import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.config import COMPACTION_INTERVAL_SECONDS, COMPACTION_BATCH_SIZE
+from app.core.database import SessionLocal
+from app.models.workspace import Workspace
+from app.models.chat import Chat
+from app.models.chat_file import ChatFile
+from app.models.chat_conversation import ChatConversation
+from app.models.version_blob import VersionBlob
+from app.models.content_diff import ContentDiff
+from app.core.versions import get_file_versions, get_blob_content, content_hash
+import app.core.unifieddiff as unifieddiff
+
+# Report of the most recent compaction run, for logging/inspection
+last_compaction_report = None
+
+_garbage_blobs_sql = text(
+    "SELECT hash FROM version_blobs WHERE NOT EXISTS "
+    "(SELECT 1 FROM chat_file_versions v WHERE v.content_hash = version_blobs.hash) LIMIT :limit"
+)
+
+# Re-checked in the deleting statement itself: a version may have been
+# pointed at the blob since it was selected as garbage
+_delete_garbage_blob_sql = text(
+    "DELETE FROM version_blobs WHERE hash = :hash AND NOT EXISTS "
+    "(SELECT 1 FROM chat_file_versions v WHERE v.content_hash = :hash)"
+)
+
+# Cached diffs whose target blob is no longer any file's latest version
+_stale_diffs_sql = text("""
+    DELETE FROM content_diffs WHERE rowid IN (
+        SELECT d.rowid FROM content_diffs d WHERE NOT EXISTS (
+            SELECT 1 FROM chat_file_versions v
+            WHERE v.content_hash = d.to_hash
+            AND v.seq = (SELECT MAX(l.seq) FROM chat_file_versions l WHERE l.chat_file_id = v.chat_file_id)
+        )
+        LIMIT :limit
+    )
+    RETURNING length(CAST(diff AS BLOB))
+""")
+
+
+def _parse_timestamp(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    # Legacy timestamps may be naive; they were always written in UTC
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def referenced_versions(messages: list, versions: list):
+    """
+    Returns (version_ids, content_hashes) referenced by a chat's conversation:
+    version ids mentioned in a message (e.g. revert notices), the versions
+    file messages record having produced (version_id), and the hashes of file
+    contents embedded in file messages (diff messages embed the diff instead,
+    so those written before version_id was recorded match no version).
+    """
+    ids = set()
+    hashes = set()
+    for content in messages:
+        for ver in versions:
+            if ver.id in content:
+                ids.add(ver.id)
+        try:
+            data = json.loads(content)
+        except (json.JSONDecodeError, TypeError):
+            continue
+        if not isinstance(data, dict):
+            continue
+        if isinstance(data.get("version_id"), str):
+            ids.add(data["version_id"])
+        if isinstance(data.get("based_content"), str):
+            hashes.add(content_hash(data["based_content"]))
+    return ids, hashes
+
+
+def versions_to_keep(versions: list, retention_days: int, retention_hourly: bool,
+                     referenced_ids: set, referenced_hashes: set, now: datetime) -> set:
+    """
+    Applies a retention policy to a file's history (oldest first) and returns
+    the ids of the versions to keep:
+      - every version from the last `retention_days` days
+      - before that, the last version of each hour if `retention_hourly`
+      - versions referenced by conversation messages
+      - always the latest version
+    """
+    cutoff = now - timedelta(days=retention_days)
+    keep = {versions[-1].id} if versions else set()
+    hourly = {}
+    for ver in versions:
+        if ver.id in referenced_ids or ver.content_hash in referenced_hashes:
+            keep.add(ver.id)
+            continue
+        created = _parse_timestamp(ver.timestamp)
+        if created >= cutoff:
+            keep.add(ver.id)
+        elif retention_hourly:
+            # Later versions overwrite earlier ones in the same hour
+            hourly[created.replace(minute=0, second=0, microsecond=0)] = ver.id
+    keep.update(hourly.values())
+    return keep
+
+
+def prune_file_history(db: Session, chat_file: ChatFile, workspace: Workspace,
+                       messages: list, now: datetime) -> int:
+    """
+    Deletes the versions of one file that its workspace's retention policy
+    does not keep. Returns the number of versions deleted. Does not commit.
+    """
+    versions = get_file_versions(db, chat_file.id)
+    if len(versions) < 2:
+        return 0
+    referenced_ids, referenced_hashes = referenced_versions(messages, versions)
+    keep = versions_to_keep(
+        versions, workspace.retention_days, workspace.retention_hourly,
+        referenced_ids, referenced_hashes, now
+    )
+    pruned = [ver for ver in versions if ver.id not in keep]
+    for ver in pruned:
+        db.delete(ver)
+    return len(pruned)
+
+
+def _stored_bytes(db: Session, hashes: list) -> int:
+    if not hashes:
+        return 0
+    return db.execute(
+        text(
+            "SELECT COALESCE(SUM(COALESCE(length(CAST(content AS BLOB)), 0) "
+            "+ COALESCE(length(CAST(delta AS BLOB)), 0)), 0) FROM version_blobs "
+            f"WHERE hash IN ({', '.join(':h%d' % i for i in range(len(hashes)))})"
+        ),
+        {f"h{i}": h for i, h in enumerate(hashes)}
+    ).scalar()
+
+
+def collect_garbage_blobs(db: Session, limit: int = COMPACTION_BATCH_SIZE) -> dict:
+    """
+    Deletes up to `limit` blobs no version points at, together with their
+    cached diffs. Delta blobs based on a deleted blob are rebased onto its
+    base (or stored in full if it had none) in the same transaction. A blob
+    that a version points at again by the time it is deleted is skipped.
+    Returns {"blobs": n, "bytes": reclaimed}. Commits after each blob so the
+    SQLite write lock is only held briefly.
+    """
+    garbage = [row[0] for row in db.execute(_garbage_blobs_sql, {"limit": limit}).all()]
+    deleted = 0
+    reclaimed = 0
+    for blob_hash in garbage:
+        blob = db.get(VersionBlob, blob_hash)
+        if blob is None:
+            continue
+        dependents = db.query(VersionBlob).filter(VersionBlob.base_hash == blob_hash).all()
+        before = _stored_bytes(db, [blob_hash] + [dep.hash for dep in dependents])
+
+        base_content = get_blob_content(db, blob.base_hash) if blob.base_hash else None
+        for dep in dependents:
+            dep_content = get_blob_content(db, dep.hash)
+            if base_content is None:
+                dep.content = dep_content
+                dep.delta = None
+                dep.base_hash = None
+            else:
+                dep.delta = unifieddiff.make_patch(dep_content, base_content)
+                dep.base_hash = blob.base_hash
+
+        # Holds the write lock from here until the commit, so no version can
+        # be pointed at the blob in between; the rebase is undone if one was
+        if db.execute(_delete_garbage_blob_sql, {"hash": blob_hash}).rowcount == 0:
+            db.rollback()
+            continue
+        db.expunge(blob)
+
+        diffs = db.query(ContentDiff).filter(
+            (ContentDiff.from_hash == blob_hash) | (ContentDiff.to_hash == blob_hash)
+        )
+        diff_bytes = sum(len(row.diff.encode("utf-8")) for row in diffs)
+        diffs.delete(synchronize_session=False)
+        db.flush()
+        after = _stored_bytes(db, [dep.hash for dep in dependents])
+        db.commit()
+
+        deleted += 1
+        reclaimed += before - after + diff_bytes
+    return {"blobs": deleted, "bytes": reclaimed}
+
+
+def collect_stale_diffs(db: Session, limit: int = COMPACTION_BATCH_SIZE) -> dict:
+    """
+    Deletes up to `limit` cached diffs whose target blob is no longer the
+    latest version of any file. Diffs are cached when read, mostly against a
+    file's latest version, so this keeps content_diffs proportional to the
+    files rather than their histories. Returns {"diffs": n, "bytes": reclaimed}.
+    Commits.
+    """
+    sizes = [row[0] or 0 for row in db.execute(_stale_diffs_sql, {"limit": limit}).all()]
+    db.commit()
+    return {"diffs": len(sizes), "bytes": sum(sizes)}
+
+
+def run_compaction(batch_size: int = COMPACTION_BATCH_SIZE, now: datetime = None) -> dict:
+    """
+    One compaction pass: prunes the history of every file in workspaces with
+    a retention policy (one short transaction per file), then drops stale
+    cached diffs and garbage-collects unreferenced blobs in batches. Returns a
+    report of what was reclaimed.
+    """
+    global last_compaction_report
+    now = now or datetime.now(timezone.utc)
+    db = SessionLocal()
+    report = {"files": 0, "versions": 0, "diffs": 0, "blobs": 0, "bytes": 0, "finished_at": None}
+    try:
+        workspaces = db.query(Workspace).filter(Workspace.retention_days.isnot(None)).all()
+        for workspace in workspaces:
+            for chat in db.query(Chat).filter(Chat.workspace_id == workspace.id).all():
+                messages = [
+                    row[0] for row in
+                    db.query(ChatConversation.content).filter(ChatConversation.chat_id == chat.id).all()
+                ]
+                for chat_file in db.query(ChatFile).filter(ChatFile.chat_id == chat.id).all():
+                    if not chat_file.filename.lower().endswith(".based"):
+                        continue
+                    pruned = prune_file_history(db, chat_file, workspace, messages, now)
+                    db.commit()
+                    report["files"] += 1
+                    report["versions"] += pruned
+
+        while True:
+            collected = collect_stale_diffs(db, batch_size)
+            report["diffs"] += collected["diffs"]
+            report["bytes"] += collected["bytes"]
+            if collected["diffs"] < batch_size:
+                break
+
+        while True:
+            collected = collect_garbage_blobs(db, batch_size)
+            report["blobs"] += collected["blobs"]
+            report["bytes"] += collected["bytes"]
+            if collected["blobs"] < batch_size:
+                break
+    finally:
+        db.close()
+
+    report["finished_at"] = datetime.now(timezone.utc).isoformat()
+    last_compaction_report = report
+    return report
+
+
+async def compaction_loop(interval: int = COMPACTION_INTERVAL_SECONDS) -> None:
+    """
+    Background task: runs a compaction pass in a worker thread every
+    `interval` seconds and logs the bytes reclaimed.
+    """
+    while True:
+        try:
+            report = await asyncio.to_thread(run_compaction)
+            print(
+                f"=== Compaction: pruned {report['versions']} versions in {report['files']} files, "
+                f"deleted {report['diffs']} cached diffs and {report['blobs']} blobs, reclaimed {report['bytes']} bytes ==="
+            )
+        except Exception as e:
+            print(f"=== Compaction failed: {str(e)} ===")
+        await asyncio.sleep(interval)
@@ -0,0 +1,82 @@
+# app/core/compression.py
+import os
+import zlib
+from sqlalchemy.types import TypeDecorator, Text
+
+from app.core.config import COMPRESSION_MIN_BYTES
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; we fall back to zlib
+    zstandard = None
+
+# Compressed values are stored as BLOBs that start with a NUL byte (never found
+# at the start of stored text), a codec byte and a dictionary version byte.
+# Values below COMPRESSION_MIN_BYTES, and legacy rows, stay plain TEXT.
+_ZSTD_HEADER = b"\x00s1"
+_ZLIB_HEADER = b"\x00z1"
+_HEADER_LEN = 3
+
+# Raw-content dictionary (v1): Based example code and conversation JSON
+# fragments. Shared by zstd and zlib. Never edit it in place: old rows
+# depend on it; add a new file and header version instead.
+with open(os.path.join(os.path.dirname(__file__), "compression_dict.txt"), "rb") as _f:
+    _DICT_V1 = _f.read()
+
+_zstd_dict = None
+if zstandard is not None:
+    _zstd_dict = zstandard.ZstdCompressionDict(_DICT_V1, dict_type=zstandard.DICT_TYPE_RAWCONTENT)
+
+
+def compress_text(text, min_bytes: int = None):
+    """
+    Returns the value to store for a text column: the text itself when it is
+    short (or does not compress), otherwise header + compressed UTF-8 bytes.
+    """
+    if text is None:
+        return None
+    raw = text.encode("utf-8")
+    if len(raw) < (COMPRESSION_MIN_BYTES if min_bytes is None else min_bytes):
+        return text
+    if _zstd_dict is not None:
+        packed = _ZSTD_HEADER + zstandard.ZstdCompressor(level=9, dict_data=_zstd_dict).compress(raw)
+    else:
+        compressor = zlib.compressobj(level=9, zdict=_DICT_V1)
+        packed = _ZLIB_HEADER + compressor.compress(raw) + compressor.flush()
+    return packed if len(packed) < len(raw) else text
+
+
+def decompress_text(value):
+    """
+    Inverse of compress_text. Plain TEXT values are returned unchanged.
+    """
+    if value is None or isinstance(value, str):
+        return value
+    value = bytes(value)
+    header, payload = value[:_HEADER_LEN], value[_HEADER_LEN:]
+    if header == _ZSTD_HEADER:
+        if zstandard is None:
+            raise RuntimeError("Value was compressed with zstd but the zstandard package is not installed")
+        raw = zstandard.ZstdDecompressor(dict_data=_zstd_dict).decompress(payload)
+    elif header == _ZLIB_HEADER:
+        decompressor = zlib.decompressobj(zdict=_DICT_V1)
+        raw = decompressor.decompress(payload) + decompressor.flush()
+    else:
+        raw = value
+    return raw.decode("utf-8")
+
+
+class CompressedText(TypeDecorator):
+    """
+    TEXT column that transparently compresses large values.
+    The column DDL stays TEXT, so existing tables need no schema change;
+    SQLite keeps compressed values as BLOBs alongside plain text rows.
+    """
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return compress_text(value)
+
+    def process_result_value(self, value, dialect):
+        return decompress_text(value)
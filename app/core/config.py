@@ -3,10 +3,50 @@ import PyPDF2
 from io import BytesIO
 import os
 
-DATABASE_URL = "sqlite:///./my_database.db" 
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./my_database.db")
+# URL for the async engine (AsyncSession); derived from DATABASE_URL when unset,
+# e.g. sqlite:///./my_database.db -> sqlite+aiosqlite:///./my_database.db
+DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL")
+DATABASE_ECHO = os.getenv("DATABASE_ECHO", "false").lower() in ("1", "true", "yes")
+
+# Connection pool (see app/core/database.py). SQLite allows one writer at a
+# time, so a large pool only adds connections waiting on the write lock.
+DATABASE_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "5"))
+DATABASE_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "5"))
+DATABASE_POOL_TIMEOUT = int(os.getenv("DATABASE_POOL_TIMEOUT", "30"))  # seconds
+
+# PRAGMAs applied to every new SQLite connection
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))  # bytes, 0 disables
+
+# Write-behind queue (see app/core/write_queue.py): WebSocket writes are
+# committed together every WRITE_BEHIND_INTERVAL_MS or WRITE_BEHIND_MAX_OPS writes
+WRITE_BEHIND_INTERVAL_MS = int(os.getenv("WRITE_BEHIND_INTERVAL_MS", "5"))
+WRITE_BEHIND_MAX_OPS = int(os.getenv("WRITE_BEHIND_MAX_OPS", "100"))
 
 VALIDATION_ENDPOINT = "https://brainbase-engine-python.onrender.com/validate"
 
+# How long a user's model credentials stay cached in-process (see app/core/model_cache.py)
+MODEL_CACHE_TTL_SECONDS = 300
+
+# Show the current .based file with line-number gutters in the diff prompt
+DIFF_PROMPT_LINE_NUMBERS = True
+
+# Past conversation sent to the agent prompts is trimmed to the most recent
+# messages that fit in this many tokens (see ConversationContext.formatted)
+CONVERSATION_TOKEN_BUDGET = 64000
+
+# Version and conversation content at least this many bytes is stored compressed
+COMPRESSION_MIN_BYTES = 512
+
+# Background version-history compaction (see app/core/compaction.py)
+COMPACTION_ENABLED = True
+COMPACTION_INTERVAL_SECONDS = 3600
+COMPACTION_BATCH_SIZE = 50  # Blobs garbage-collected (or stale cached diffs dropped) per batch
+
 BASED_GUIDE = """
 
 ```markdown
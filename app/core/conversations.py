@@ -0,0 +1,70 @@
+# app/core/conversations.py
+import json
+import uuid
+from datetime import datetime, timezone
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import Session
+
+from app.models.chat import Chat
+from app.models.chat_conversation import ChatConversation
+from app.core.write_queue import write_queue
+from app.core.bulk import bulk_insert
+
+
+def touch_chat(db: Session, chat_id: str) -> None:
+    """
+    Sets a chat's last_updated to now. Does not commit.
+    """
+    db.execute(update(Chat).where(Chat.id == chat_id).values(last_updated=datetime.now(timezone.utc)))
+
+
+def _message_fields(msg):
+    """
+    (role, type, content) of an in-memory message, which is either a
+    ChatMessage or a plain dict. Dict contents are stored as JSON.
+    """
+    if hasattr(msg, "role"):
+        role, content_type, content = msg.role, msg.type, msg.content
+    else:
+        role, content_type, content = msg.get("role"), msg.get("type"), msg.get("content")
+    if isinstance(content, dict):
+        content = json.dumps(content)
+    return role, content_type, content
+
+
+def insert_conversation(db: Session, chat_id: str, messages: list) -> None:
+    """
+    Appends messages to the chat's conversation in one executemany INSERT, with seqs
+    following the last stored message. Does not commit.
+    """
+    # Read in the writing transaction (from the (chat_id, seq) index) rather
+    # than cached, so two connections to the same chat interleave instead of colliding
+    last = db.scalar(select(func.max(ChatConversation.seq)).where(ChatConversation.chat_id == chat_id))
+    seq = 0 if last is None else last + 1
+
+    rows = []
+    for offset, msg in enumerate(messages):
+        role, content_type, content = _message_fields(msg)
+        rows.append({
+            "id": str(uuid.uuid4()),
+            "chat_id": chat_id,
+            "role": role,
+            "type": content_type,
+            "content": content,
+            "seq": seq + offset,
+        })
+    bulk_insert(db, ChatConversation, rows)
+
+
+async def append_conversation(chat_id: str, conversation_objs: list, persisted: int) -> int:
+    """
+    Stores the messages of `conversation_objs` past the first `persisted`
+    (the ones not stored yet) through the write-behind queue and waits for
+    the commit. Returns the new number of persisted messages. Stored rows are
+    never rewritten.
+    """
+    pending = list(conversation_objs[persisted:])
+    if not pending:
+        return persisted
+    await write_queue.write(lambda db: insert_conversation(db, chat_id, pending))
+    return persisted + len(pending)
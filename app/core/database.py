@@ -1,18 +1,112 @@
 # app/core/database.py
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from app.models.base import Base
-from app.core.config import DATABASE_URL
-
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False}  # only needed for SQLite
+from sqlalchemy.pool import StaticPool
+from app.core.config import (
+    DATABASE_URL, DATABASE_ASYNC_URL, DATABASE_ECHO, DATABASE_POOL_SIZE, DATABASE_MAX_OVERFLOW, DATABASE_POOL_TIMEOUT,
+    SQLITE_JOURNAL_MODE, SQLITE_SYNCHRONOUS, SQLITE_BUSY_TIMEOUT_MS, SQLITE_CACHE_SIZE_KB, SQLITE_MMAP_SIZE
 )
+from app.core.migrations import run_migrations
+
+
+def sqlite_pragmas() -> dict:
+    """
+    PRAGMAs applied to every new SQLite connection. WAL lets readers run
+    alongside the single writer, and busy_timeout makes a writer wait for the
+    lock instead of failing at once with "database is locked".
+    """
+    return {
+        "journal_mode": SQLITE_JOURNAL_MODE,
+        "synchronous": SQLITE_SYNCHRONOUS,  # NORMAL is durable enough with WAL
+        "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+        "cache_size": -SQLITE_CACHE_SIZE_KB,  # negative = KiB rather than pages
+        "mmap_size": SQLITE_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+
+def _engine_kwargs(url: str) -> dict:
+    kwargs = {"echo": DATABASE_ECHO, "pool_pre_ping": True}
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        kwargs.update(pool_size=DATABASE_POOL_SIZE, max_overflow=DATABASE_MAX_OVERFLOW, pool_timeout=DATABASE_POOL_TIMEOUT)
+        return kwargs
+
+    kwargs["connect_args"] = {
+        # Sessions are used from worker threads (e.g. the compactor)
+        "check_same_thread": False,
+        "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+    }
+    if parsed.database in (None, "", ":memory:"):
+        # In-memory databases share a single connection so every session sees the same data
+        kwargs["poolclass"] = StaticPool
+    else:
+        kwargs.update(pool_size=DATABASE_POOL_SIZE, max_overflow=DATABASE_MAX_OVERFLOW, pool_timeout=DATABASE_POOL_TIMEOUT)
+    return kwargs
+
+
+def _set_sqlite_pragmas(engine: Engine, pragmas: dict = None) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+    pragmas = sqlite_pragmas() if pragmas is None else pragmas
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+
+def create_db_engine(url: str = DATABASE_URL, pragmas: dict = None) -> Engine:
+    """
+    Creates the SQLAlchemy engine for `url`. For SQLite, every new connection
+    gets the PRAGMAs from sqlite_pragmas() (or `pragmas`).
+    """
+    engine = create_engine(url, **_engine_kwargs(url))
+    _set_sqlite_pragmas(engine, pragmas)
+    return engine
+
+
+def async_database_url(url: str = DATABASE_URL) -> str:
+    """
+    Returns DATABASE_ASYNC_URL, or the aiosqlite equivalent of a SQLite `url`.
+    """
+    if DATABASE_ASYNC_URL:
+        return DATABASE_ASYNC_URL
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return parsed.set(drivername="sqlite+aiosqlite").render_as_string(hide_password=False)
+    raise ValueError(f"Set DATABASE_ASYNC_URL: no async driver known for {parsed.drivername}")
+
+
+def create_async_db_engine(url: str = None, pragmas: dict = None) -> AsyncEngine:
+    """
+    Async counterpart of create_db_engine, used by AsyncSession. The PRAGMAs
+    are set on the underlying sync engine's connections.
+    """
+    url = url or async_database_url()
+    engine = create_async_engine(url, **_engine_kwargs(url))
+    _set_sqlite_pragmas(engine.sync_engine, pragmas)
+    return engine
+
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+async_engine = create_async_db_engine()
+# expire_on_commit=False: objects stay usable after a commit without an
+# implicit (and, under asyncio, illegal) lazy refresh
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 def init_db() -> None:
-    Base.metadata.create_all(bind=engine)
+    """
+    Creates or upgrades the schema through the Alembic migrations.
+    """
+    run_migrations(engine)
 
 # ADD THIS:
 def get_db():
@@ -23,4 +117,14 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db():
+    """
+    Yields an AsyncSession for FastAPI dependencies (HTTP and WebSocket routes).
+    Shared helpers written against a sync Session (app/core/versions.py, ...)
+    are called through `await db.run_sync(helper, ...)`.
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,269 @@
+# app/core/migrations.py
+"""
+Schema migrations. Schema changes are Alembic revisions under alembic/versions
+(create one with `alembic revision --autogenerate -m "..."`); run_migrations
+applies them on startup.
+
+The migrate_* steps below predate Alembic. They only run for a database that
+has no alembic_version table yet, to bring it up to the baseline revision.
+"""
+import os
+from itertools import groupby
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+import app.core.unifieddiff as unifieddiff
+
+ALEMBIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "alembic")
+# Revision matching the schema the legacy steps produce
+BASELINE_REVISION = "0001"
+
+# DDL of the tables and indexes the legacy steps create, as revision 0001
+# creates them. Pinned rather than taken from the models: the database is
+# stamped BASELINE_REVISION afterwards, so anything a later revision adds
+# to a model must not exist yet.
+BASELINE_DDL = {
+    "version_blobs": [
+        "CREATE TABLE IF NOT EXISTS version_blobs ("
+        "hash VARCHAR NOT NULL, content TEXT, base_hash VARCHAR, delta TEXT, "
+        "line_count INTEGER NOT NULL, keyframe BOOLEAN NOT NULL, PRIMARY KEY (hash), "
+        "FOREIGN KEY(base_hash) REFERENCES version_blobs (hash))",
+        "CREATE INDEX IF NOT EXISTS ix_version_blobs_base_hash ON version_blobs (base_hash)",
+    ],
+    "content_diffs": [
+        "CREATE TABLE IF NOT EXISTS content_diffs ("
+        "from_hash VARCHAR NOT NULL, to_hash VARCHAR NOT NULL, diff VARCHAR NOT NULL, "
+        "PRIMARY KEY (from_hash, to_hash))",
+    ],
+    "chat_file_versions": [
+        "CREATE TABLE chat_file_versions ("
+        "id VARCHAR NOT NULL, chat_file_id VARCHAR NOT NULL, timestamp VARCHAR NOT NULL, "
+        "seq INTEGER NOT NULL, content_hash VARCHAR NOT NULL, PRIMARY KEY (id), "
+        "FOREIGN KEY(chat_file_id) REFERENCES chat_files (id), "
+        "FOREIGN KEY(content_hash) REFERENCES version_blobs (hash))",
+        "CREATE INDEX IF NOT EXISTS ix_chat_file_versions_id ON chat_file_versions (id)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_chat_file_versions_chat_file_id_seq "
+        "ON chat_file_versions (chat_file_id, seq)",
+        "CREATE INDEX IF NOT EXISTS ix_chat_file_versions_content_hash ON chat_file_versions (content_hash)",
+    ],
+    "chat_conversations": [
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_chat_conversations_chat_id_seq ON chat_conversations (chat_id, seq)",
+    ],
+}
+
+
+def _create_baseline(conn, table: str, indexes_only: bool = False) -> None:
+    for statement in BASELINE_DDL[table]:
+        if indexes_only and statement.startswith("CREATE TABLE"):
+            continue
+        conn.execute(text(statement))
+
+
+def _columns(conn, table: str) -> set:
+    return {col["name"] for col in inspect(conn).get_columns(table)}
+
+
+def _legacy_contents(rows: list) -> list:
+    """
+    Rebuilds the full content of one file's legacy version rows
+    (id, timestamp, content, delta), oldest first. Rows written by the
+    reverse-delta layout have no content and a delta against the next row.
+    """
+    contents = [None] * len(rows)
+    current = None
+    for i in range(len(rows) - 1, -1, -1):
+        content, delta = rows[i][2], rows[i][3]
+        current = content if content is not None else unifieddiff.apply_patch(current, delta, revert=True)
+        contents[i] = current
+    return contents
+
+
+def migrate_version_blobs(engine) -> None:
+    """
+    Moves chat_file_versions content into content-addressed version_blobs.
+    Handles both earlier layouts: every version stored in full, and the
+    keyframe + reverse-delta layout (content/delta columns on the version row).
+    The old chat_file_version_diffs cache is dropped; content_diffs refills lazily.
+    Does nothing if chat_file_versions already has content_hash.
+    """
+    from app.core.versions import store_version_content
+
+    with engine.begin() as conn:
+        columns = _columns(conn, "chat_file_versions")
+        if "content_hash" in columns:
+            return
+        print("Migrating chat_file_versions to content-addressed blobs...")
+        delta_column = "delta" if "delta" in columns else "NULL"
+        rows = conn.execute(text(
+            f"SELECT chat_file_id, id, timestamp, content, {delta_column} FROM chat_file_versions "
+            "ORDER BY chat_file_id, timestamp"
+        )).all()
+
+        conn.execute(text("ALTER TABLE chat_file_versions RENAME TO chat_file_versions_old"))
+        # Index names are global in SQLite, so drop the old ones before recreating them
+        conn.execute(text("DROP INDEX IF EXISTS ix_chat_file_versions_id"))
+        _create_baseline(conn, "chat_file_versions")
+        conn.execute(text("DROP TABLE chat_file_versions_old"))
+        conn.execute(text("DROP TABLE IF EXISTS chat_file_version_diffs"))
+
+        db = Session(bind=conn)
+        blobs = set()
+        version_rows = []
+        for chat_file_id, group in groupby(rows, key=lambda row: row[0]):
+            file_rows = [row[1:] for row in group]
+            previous_hash = previous_content = None
+            for position, (row, content) in enumerate(zip(file_rows, _legacy_contents(file_rows))):
+                blob = store_version_content(db, content, position, previous_hash, previous_content)
+                version_rows.append({
+                    "id": row[0],
+                    "chat_file_id": chat_file_id,
+                    "timestamp": row[1],
+                    "seq": position,
+                    "content_hash": blob.hash
+                })
+                blobs.add(blob.hash)
+                previous_hash, previous_content = blob.hash, content
+        db.flush()
+        db.close()
+        if version_rows:
+            conn.execute(text(
+                "INSERT INTO chat_file_versions (id, chat_file_id, timestamp, seq, content_hash) "
+                "VALUES (:id, :chat_file_id, :timestamp, :seq, :content_hash)"
+            ), version_rows)
+        print(f"Migrated {len(rows)} versions into {len(blobs)} blobs.")
+
+
+# (table, column) pairs stored through CompressedText
+COMPRESSED_COLUMNS = [
+    ("version_blobs", "content"),
+    ("version_blobs", "delta"),
+    ("chat_conversations", "content"),
+]
+
+
+def migrate_compress_content(engine, batch_size: int = 500) -> None:
+    """
+    Compresses existing plain-text values of the CompressedText columns that
+    are at least COMPRESSION_MIN_BYTES long. Compressed values are BLOBs, so
+    re-running (e.g. after lowering the threshold) only touches what is left.
+    """
+    from app.core.compression import compress_text
+    from app.core.config import COMPRESSION_MIN_BYTES
+
+    for table, column in COMPRESSED_COLUMNS:
+        select_sql = text(
+            f"SELECT rowid, {column} FROM {table} "
+            f"WHERE typeof({column}) = 'text' AND length(CAST({column} AS BLOB)) >= :min_bytes "
+            "AND rowid > :after ORDER BY rowid LIMIT :limit"
+        )
+        update_sql = text(f"UPDATE {table} SET {column} = :value WHERE rowid = :rowid")
+        after = 0
+        compressed = 0
+        while True:
+            with engine.begin() as conn:
+                rows = conn.execute(
+                    select_sql, {"min_bytes": COMPRESSION_MIN_BYTES, "after": after, "limit": batch_size}
+                ).all()
+                if not rows:
+                    break
+                for rowid, value in rows:
+                    packed = compress_text(value)
+                    if not isinstance(packed, str):
+                        conn.execute(update_sql, {"value": packed, "rowid": rowid})
+                        compressed += 1
+                after = rows[-1][0]
+        if compressed:
+            print(f"Compressed {compressed} values in {table}.{column}.")
+
+
+# (table, partition column, legacy ordering) for the seq columns
+SEQ_COLUMNS = [
+    ("chat_file_versions", "chat_file_id", "timestamp, rowid"),
+    ("chat_conversations", "chat_id", "rowid"),
+]
+
+
+def migrate_seq_columns(engine) -> None:
+    """
+    Adds the integer seq ordering columns, backfills them from the legacy
+    ordering (version timestamps; conversation insertion order) and creates
+    the composite (parent id, seq) indexes.
+    """
+    with engine.begin() as conn:
+        for table, parent, legacy_order in SEQ_COLUMNS:
+            if "seq" in _columns(conn, table):
+                continue
+            print(f"Adding {table}.seq...")
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN seq INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text(
+                f"UPDATE {table} SET seq = numbered.n FROM ("
+                f"SELECT rowid AS row_id, ROW_NUMBER() OVER (PARTITION BY {parent} ORDER BY {legacy_order}) - 1 AS n "
+                f"FROM {table}) AS numbered WHERE {table}.rowid = numbered.row_id"
+            ))
+        for table, _, _ in SEQ_COLUMNS:
+            _create_baseline(conn, table, indexes_only=True)
+
+
+def migrate_retention(engine) -> None:
+    """
+    Adds the workspace retention policy columns and the version_blobs.base_hash
+    index used by the compactor.
+    """
+    with engine.begin() as conn:
+        columns = _columns(conn, "workspaces")
+        if "retention_days" not in columns:
+            conn.execute(text("ALTER TABLE workspaces ADD COLUMN retention_days INTEGER"))
+        if "retention_hourly" not in columns:
+            conn.execute(text("ALTER TABLE workspaces ADD COLUMN retention_hourly BOOLEAN NOT NULL DEFAULT 1"))
+        _create_baseline(conn, "version_blobs", indexes_only=True)
+
+
+LEGACY_MIGRATIONS = [
+    migrate_version_blobs,
+    migrate_compress_content,
+    migrate_seq_columns,
+    migrate_retention,
+]
+
+
+def alembic_config(connection=None) -> Config:
+    """
+    Alembic config for running commands from code on `connection`
+    (alembic/env.py uses it instead of opening its own engine).
+    """
+    config = Config()
+    config.set_main_option("script_location", ALEMBIC_DIR)
+    config.attributes["connection"] = connection
+    return config
+
+
+def upgrade_legacy_database(engine) -> None:
+    """
+    Brings a database created before Alembic up to the baseline schema with
+    the legacy steps and stamps it with BASELINE_REVISION.
+    """
+    print("Upgrading a pre-Alembic database to the baseline schema...")
+    with engine.begin() as conn:
+        # The only baseline tables an older database can be missing
+        _create_baseline(conn, "version_blobs")
+        _create_baseline(conn, "content_diffs")
+    for migration in LEGACY_MIGRATIONS:
+        migration(engine)
+    with engine.begin() as conn:
+        command.stamp(alembic_config(conn), BASELINE_REVISION)
+
+
+def run_migrations(engine) -> None:
+    """
+    Brings the database up to the latest Alembic revision. A database created
+    before Alembic (tables but no alembic_version) is first brought up to the
+    baseline by upgrade_legacy_database.
+    """
+    tables = set(inspect(engine).get_table_names())
+    if tables and "alembic_version" not in tables:
+        upgrade_legacy_database(engine)
+
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), "head")
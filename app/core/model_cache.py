@@ -0,0 +1,42 @@
+# app/core/model_cache.py
+import time
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import MODEL_CACHE_TTL_SECONDS
+from app.models.model import Model
+
+# user_id -> (expires_at, {model name: (ak, base_url)})
+_user_models = {}
+
+
+def get_user_models(db: Session, user_id: str) -> dict:
+    """
+    Returns {model name: (ak, base_url)} for a user's models. Loaded with one
+    query on the (user_id, name) index and cached for MODEL_CACHE_TTL_SECONDS;
+    /models/new and /models/delete invalidate it. If a user has two models
+    with the same name, the first one (by name index order) wins.
+    """
+    cached = _user_models.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        return cached[1]
+
+    models = {}
+    rows = db.execute(
+        select(Model.name, Model.ak, Model.base_url).where(Model.user_id == user_id).order_by(Model.name)
+    ).all()
+    for row in rows:
+        models.setdefault(row.name, (row.ak, row.base_url))
+    _user_models[user_id] = (time.monotonic() + MODEL_CACHE_TTL_SECONDS, models)
+    return models
+
+
+def get_model_credentials(db: Session, user_id: str, name: str):
+    """
+    Returns (ak, base_url) of the user's model called `name`, or None.
+    """
+    return get_user_models(db, user_id).get(name)
+
+
+def invalidate_user_models(user_id: str) -> None:
+    _user_models.pop(user_id, None)
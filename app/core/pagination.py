@@ -0,0 +1,96 @@
+# app/core/pagination.py
+import base64
+from datetime import datetime, timezone
+from sqlalchemy import func, select, tuple_
+
+# Default and maximum page sizes for the workspace chat / file lists
+LIST_PAGE_SIZE = 50
+LIST_PAGE_SIZE_MAX = 500
+
+
+def utc_isoformat(value):
+    """
+    ISO 8601 string for a stored timestamp. DateTime columns come back from
+    SQLite as naive datetimes that are in UTC.
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.isoformat()
+
+
+def encode_cursor(last_updated: datetime, row_id: str) -> str:
+    raw = f"{utc_isoformat(last_updated)}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str):
+    """
+    Returns the (last_updated, id) key a cursor points after.
+    Raises ValueError on a malformed cursor.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        timestamp, row_id = raw.split("|", 1)
+        last_updated = datetime.fromisoformat(timestamp)
+    except Exception:
+        raise ValueError("malformed cursor")
+    # Compare in the stored form: naive UTC
+    if last_updated.tzinfo is not None:
+        last_updated = last_updated.astimezone(timezone.utc).replace(tzinfo=None)
+    return last_updated, row_id
+
+
+def check_limit(limit) -> int:
+    limit = int(limit)
+    if limit <= 0 or limit > LIST_PAGE_SIZE_MAX:
+        raise ValueError(f"limit must be between 1 and {LIST_PAGE_SIZE_MAX}")
+    return limit
+
+
+def keyset_page(query, model, cursor=None, limit: int = LIST_PAGE_SIZE):
+    """
+    Returns (rows, next_cursor) for one page of `query` over `model` (a table
+    with last_updated and id columns), most recently updated first. The
+    cursor is the next_cursor of the previous page; next_cursor is None on
+    the last page. With (parent id, last_updated, id) indexed, each page is a
+    single index range scan however deep it is.
+    Raises ValueError on a malformed cursor or limit.
+    """
+    limit = check_limit(limit)
+    if cursor:
+        last_updated, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.last_updated, model.id) < tuple_(last_updated, row_id))
+    rows = query.order_by(model.last_updated.desc(), model.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].last_updated, rows[-1].id)
+    return rows, next_cursor
+
+
+def first_pages(db, columns: list, model, parent_column, parent_filter, limit: int):
+    """
+    Returns {parent id: (rows, next_cursor)} with the first keyset page of
+    `model` rows for every parent matching `parent_filter`, in one query
+    (ROW_NUMBER() per parent). `columns` must include last_updated and id.
+    """
+    limit = check_limit(limit)
+    position = func.row_number().over(
+        partition_by=parent_column,
+        order_by=(model.last_updated.desc(), model.id.desc())
+    ).label("position")
+    ranked = select(*columns, parent_column.label("parent_id"), position).where(parent_filter).subquery()
+    rows = db.execute(
+        select(ranked).where(ranked.c.position <= limit + 1).order_by(ranked.c.parent_id, ranked.c.position)
+    ).all()
+
+    pages = {}
+    for row in rows:
+        page, _ = pages.setdefault(row.parent_id, ([], None))
+        if row.position > limit:
+            pages[row.parent_id] = (page, encode_cursor(page[-1].last_updated, page[-1].id))
+        else:
+            page.append(row)
+    return pages
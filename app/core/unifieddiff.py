@@ -5,31 +5,258 @@
 
 from __future__ import print_function
 
+import bisect
 import difflib
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 
 _no_eol = "\ No newline at end of file"
 _hdr_pat = re.compile("^@@ -(\d+),?(\d+)? \+(\d+),?(\d+)? @@$")
 
-def make_patch(a,b):
+# Diff algorithm used by make_patch: "myers", "patience" or "difflib"
+DEFAULT_ALGORITHM = "myers"
+# make_patches batches with at least this many versions use a process pool
+BATCH_POOL_MIN_VERSIONS = 200
+# Past this many edit steps in one bisection, Myers settles for a good
+# (not necessarily minimal) split point so dense edits stay fast
+MYERS_MAX_COST = 256
+
+def _intern(lines,table):
+  """ Map each line to a small integer id, shared through `table` """
+  return [table.setdefault(l,len(table)) for l in lines]
+
+def _myers(a,b,aoff,boff,matches):
+  """
+  Linear-space Myers diff (middle-snake bisection) over two id lists.
+  Appends matching (i,j) pairs, in order, with absolute offsets.
+  """
+  n = 0
+  while n < len(a) and n < len(b) and a[n] == b[n]: n += 1
+  matches.extend((aoff+k,boff+k) for k in range(n))
+  a,b,aoff,boff = a[n:],b[n:],aoff+n,boff+n
+  m = 0
+  while m < len(a) and m < len(b) and a[-1-m] == b[-1-m]: m += 1
+  tail = [(aoff+len(a)-m+k,boff+len(b)-m+k) for k in range(m)]
+  if m: a,b = a[:-m],b[:-m]
+  if a and b:
+    x,y = _bisect(a,b)
+    if (x,y) not in ((0,0),(len(a),len(b))):
+      _myers(a[:x],b[:y],aoff,boff,matches)
+      _myers(a[x:],b[y:],aoff+x,boff+y,matches)
+  matches.extend(tail)
+
+def _bisect(a,b):
+  """
+  Find the middle snake of an edit path between a and b.
+  Returns the split point (x,y); (0,0) if the inputs share nothing.
+  If no snake is found within MYERS_MAX_COST steps, the furthest-reaching
+  forward point is used instead.
+  """
+  la,lb = len(a),len(b)
+  max_d = (la+lb+1)//2
+  off = max_d
+  vlen = 2*max_d+2
+  v1 = [-1]*vlen; v1[off+1] = 0
+  v2 = [-1]*vlen; v2[off+1] = 0
+  delta = la-lb
+  front = delta % 2 != 0
+  k1start = k1end = k2start = k2end = 0
+  for d in range(max_d):
+    if d > MYERS_MAX_COST:
+      best = max(((2*v1[off+k]-k,k) for k in range(-d+1+k1start,d-k1end,2)
+                  if 0 <= v1[off+k] <= la and 0 <= v1[off+k]-k <= lb), default=None)
+      if best is None: return 0,0
+      x = v1[off+best[1]]
+      return x,x-best[1]
+    for k1 in range(-d+k1start,d+1-k1end,2):
+      k1o = off+k1
+      if k1 == -d or (k1 != d and v1[k1o-1] < v1[k1o+1]): x1 = v1[k1o+1]
+      else: x1 = v1[k1o-1]+1
+      y1 = x1-k1
+      while x1 < la and y1 < lb and a[x1] == b[y1]: x1 += 1; y1 += 1
+      v1[k1o] = x1
+      if x1 > la: k1end += 2
+      elif y1 > lb: k1start += 2
+      elif front:
+        k2o = off+delta-k1
+        if 0 <= k2o < vlen and v2[k2o] != -1 and x1 >= la-v2[k2o]:
+          return x1,y1
+    for k2 in range(-d+k2start,d+1-k2end,2):
+      k2o = off+k2
+      if k2 == -d or (k2 != d and v2[k2o-1] < v2[k2o+1]): x2 = v2[k2o+1]
+      else: x2 = v2[k2o-1]+1
+      y2 = x2-k2
+      while x2 < la and y2 < lb and a[-x2-1] == b[-y2-1]: x2 += 1; y2 += 1
+      v2[k2o] = x2
+      if x2 > la: k2end += 2
+      elif y2 > lb: k2start += 2
+      elif not front:
+        k1o = off+delta-k2
+        if 0 <= k1o < vlen and v1[k1o] != -1:
+          x1 = v1[k1o]
+          if x1 >= la-x2:
+            return x1,off+x1-k1o
+  return 0,0
+
+def _patience(a,b,aoff,boff,matches):
+  """
+  Patience diff: anchor on lines that are unique in both inputs (longest
+  increasing run), recurse between anchors, fall back to Myers otherwise.
+  """
+  n = 0
+  while n < len(a) and n < len(b) and a[n] == b[n]: n += 1
+  matches.extend((aoff+k,boff+k) for k in range(n))
+  a,b,aoff,boff = a[n:],b[n:],aoff+n,boff+n
+  m = 0
+  while m < len(a) and m < len(b) and a[-1-m] == b[-1-m]: m += 1
+  tail = [(aoff+len(a)-m+k,boff+len(b)-m+k) for k in range(m)]
+  if m: a,b = a[:-m],b[:-m]
+  if a and b:
+    anchors = _unique_lcs(a,b)
+    if not anchors:
+      _myers(a,b,aoff,boff,matches)
+    else:
+      pi = pj = 0
+      for i,j in anchors:
+        _patience(a[pi:i],b[pj:j],aoff+pi,boff+pj,matches)
+        matches.append((aoff+i,boff+j))
+        pi,pj = i+1,j+1
+      _patience(a[pi:],b[pj:],aoff+pi,boff+pj,matches)
+  matches.extend(tail)
+
+def _unique_lcs(a,b):
+  """ Longest increasing sequence of (i,j) pairs of lines unique in a and b """
+  count_a,count_b,pos_b = {},{},{}
+  for x in a: count_a[x] = count_a.get(x,0)+1
+  for j,x in enumerate(b):
+    count_b[x] = count_b.get(x,0)+1
+    pos_b[x] = j
+  pairs = [(i,pos_b[x]) for i,x in enumerate(a) if count_a[x] == 1 and count_b.get(x) == 1]
+  if not pairs: return []
+  # patience sorting on j
+  tails,tail_idx,prev = [],[],[-1]*len(pairs)
+  for k,(_,j) in enumerate(pairs):
+    t = bisect.bisect_left(tails,j)
+    if t: prev[k] = tail_idx[t-1]
+    if t == len(tails): tails.append(j); tail_idx.append(k)
+    else: tails[t] = j; tail_idx[t] = k
+  out,k = [],tail_idx[-1]
+  while k != -1: out.append(pairs[k]); k = prev[k]
+  return out[::-1]
+
+def _change_blocks(matches,la,lb):
+  """ Convert ordered matching pairs into (i1,i2,j1,j2) change regions """
+  blocks = []
+  pi = pj = 0
+  for i,j in matches + [(la,lb)]:
+    if i != pi or j != pj: blocks.append((pi,i,pj,j))
+    pi,pj = i+1,j+1
+  return blocks
+
+def _format_hunks(al,bl,blocks):
+  out = []
+  for i1,i2,j1,j2 in blocks:
+    out.append(hunk_header(i1,i2-i1,j1,j2-j1))
+    out.extend('-'+l for l in al[i1:i2])
+    out.extend('+'+l for l in bl[j1:j2])
+  return ''.join([d if d[-1] == '\n' else d+'\n'+_no_eol+'\n' for d in out])
+
+def diff_blocks(al,bl,algorithm=None,table=None,a_ids=None,b_ids=None):
+  """
+  Change regions (i1,i2,j1,j2) between two lists of lines.
+  `table` and pre-interned id lists can be passed in to reuse interning
+  across calls.
   """
-  Get unified string diff between two strings. Trims top two lines.
-  Returns empty string if strings are identical.
+  algorithm = algorithm or DEFAULT_ALGORITHM
+  if algorithm == "difflib":
+    sm = difflib.SequenceMatcher(None,al,bl)
+    return [(i1,i2,j1,j2) for tag,i1,i2,j1,j2 in sm.get_opcodes() if tag != 'equal']
+  if table is None: table = {}
+  if a_ids is None: a_ids = _intern(al,table)
+  if b_ids is None: b_ids = _intern(bl,table)
+  matches = []
+  if algorithm == "myers": _myers(a_ids,b_ids,0,0,matches)
+  elif algorithm == "patience": _patience(a_ids,b_ids,0,0,matches)
+  else: raise ValueError("Unknown diff algorithm: "+str(algorithm))
+  return _change_blocks(matches,len(al),len(bl))
+
+def make_patch(a,b,algorithm=None):
+  """
+  Get unified string diff between two strings, with no context lines and no
+  ---/+++ header lines. Returns empty string if strings are identical.
+  algorithm is "myers" (default), "patience" or "difflib".
   """
-  diffs = difflib.unified_diff(a.splitlines(True),b.splitlines(True),n=0)
-  try: _,_ = next(diffs),next(diffs)
-  except StopIteration: pass
-  # diffs = list(diffs); print(diffs)
-  return ''.join([d if d[-1] == '\n' else d+'\n'+_no_eol+'\n' for d in diffs])
+  if a == b: return ''
+  al,bl = a.splitlines(True),b.splitlines(True)
+  if (algorithm or DEFAULT_ALGORITHM) == "difflib":
+    diffs = difflib.unified_diff(al,bl,n=0)
+    try: _,_ = next(diffs),next(diffs)
+    except StopIteration: pass
+    return ''.join([d if d[-1] == '\n' else d+'\n'+_no_eol+'\n' for d in diffs])
+  return _format_hunks(al,bl,diff_blocks(al,bl,algorithm))
+
+_pool = None
+
+def make_patches(olds,new,algorithm=None,processes=None):
+  """
+  Diff many older strings against one newer string; same result as
+  [make_patch(a,new,algorithm) for a in olds]. The newer string is split and
+  interned once and its ids are reused for every comparison; duplicate older
+  strings are only diffed once. Batches of at least BATCH_POOL_MIN_VERSIONS
+  are spread over a process pool (processes=0 disables it, None uses one
+  worker per CPU).
+  """
+  olds = list(olds)
+  workers = (os.cpu_count() or 1) if processes is None else processes
+  if workers > 1 and len(olds) >= BATCH_POOL_MIN_VERSIONS:
+    return _pooled_patches(olds,new,algorithm,workers)
+  return _batch_patches(olds,new,algorithm)
+
+def _batch_patches(olds,new,algorithm=None):
+  if (algorithm or DEFAULT_ALGORITHM) == "difflib":
+    return [make_patch(a,new,algorithm) for a in olds]
+  bl = new.splitlines(True)
+  table = {}
+  b_ids = _intern(bl,table)
+  done = {new: ''}
+  out = []
+  for a in olds:
+    if a not in done:
+      al = a.splitlines(True)
+      done[a] = _format_hunks(al,bl,diff_blocks(al,bl,algorithm,table,b_ids=b_ids))
+    out.append(done[a])
+  return out
+
+def _pooled_patches(olds,new,algorithm,workers):
+  global _pool
+  if _pool is None: _pool = ProcessPoolExecutor(max_workers=workers)
+  size = -(-len(olds)//workers)
+  chunks = [olds[k:k+size] for k in range(0,len(olds),size)]
+  out = []
+  for part in _pool.map(_batch_patches,chunks,[new]*len(chunks),[algorithm]*len(chunks)):
+    out.extend(part)
+  return out
+
+def shutdown_pool():
+  """
+  Shuts down the process pool used by make_patches, if it was started.
+  A later batch starts a new one.
+  """
+  global _pool
+  if _pool is not None:
+    _pool.shutdown()
+    _pool = None
 
 def apply_patch(s,patch,revert=False):
   """
   Apply patch to string s to recover newer string.
   If revert is True, treat s as the newer string, recover older string.
+  s may also be given already split with splitlines(True).
   """
-  s = s.splitlines(True)
+  s = s.splitlines(True) if isinstance(s,str) else s
   p = patch.splitlines(True)
-  t = ''
+  t = []
   i = sl = 0
   (midx,sign) = (1,'+') if not revert else (3,'-')
   while i < len(p) and p[i].startswith(("---","+++")): i += 1 # skip header lines
@@ -39,17 +266,51 @@ def apply_patch(s,patch,revert=False):
     l = int(m.group(midx))-1 + (m.group(midx+1) == '0')
     if sl > l or l > len(s):
       raise Exception("Bad patch -- bad line num [line "+str(i)+"]")
-    t += ''.join(s[sl:l])
+    t.extend(s[sl:l])
     sl = l
     i += 1
     while i < len(p) and p[i][0] != '@':
       if i+1 < len(p) and p[i+1][0] == '\\': line = p[i][:-1]; i += 2
       else: line = p[i]; i += 1
       if len(line) > 0:
-        if line[0] == sign or line[0] == ' ': t += line[1:]
+        if line[0] == sign or line[0] == ' ': t.append(line[1:])
         sl += (line[0] != sign)
-  t += ''.join(s[sl:])
-  return t
+  t.extend(s[sl:])
+  return ''.join(t)
+
+def parse_hunks(patch):
+  """
+  Split a unified diff into hunks. Header lines ('---'/'+++') are skipped.
+  Returns a list of (old_start, old_len, new_start, new_len, lines) where the
+  numbers are as written in the @@ header and lines are the raw body lines.
+  """
+  p = patch.splitlines(True)
+  i = 0
+  hunks = []
+  while i < len(p) and p[i].startswith(("---","+++")): i += 1
+  while i < len(p):
+    m = _hdr_pat.match(p[i].rstrip('\r\n'))
+    if not m: raise Exception("Bad patch -- regex mismatch [line "+str(i)+"]")
+    ol = 1 if m.group(2) is None else int(m.group(2))
+    nl = 1 if m.group(4) is None else int(m.group(4))
+    i += 1
+    body = []
+    while i < len(p) and p[i][0] != '@':
+      body.append(p[i]); i += 1
+    hunks.append((int(m.group(1)),ol,int(m.group(3)),nl,body))
+  return hunks
+
+def _format_range(start,length):
+  """ Header range for a hunk starting at 0-based line `start` (as difflib) """
+  if length == 1: return str(start+1)
+  if length == 0: return str(start)+',0'
+  return str(start+1)+','+str(length)
+
+def hunk_header(old_start,old_len,new_start,new_len):
+  """
+  Build an @@ header from 0-based start positions and line counts.
+  """
+  return "@@ -"+_format_range(old_start,old_len)+" +"+_format_range(new_start,new_len)+" @@\n"
 
 #
 # Testing
@@ -61,8 +322,10 @@ import traceback
 import sys
 import codecs
 
-def test_diff(a,b):
-  mp = make_patch(a,b)
+ALGORITHMS = ("myers","patience","difflib")
+
+def test_diff(a,b,algorithm=None):
+  mp = make_patch(a,b,algorithm)
   try:
     assert apply_patch(a,mp) == b
     assert apply_patch(b,mp,True) == a
@@ -100,7 +363,7 @@ def rand_unicode():
   # return a.decode('utf-8')
   return str(codecs.encode(a, 'utf-8'))
 
-def generate_test(nlines=10,linelen=10,randchar=rand_ascii):
+def generate_test(nlines=10,linelen=10,randchar=rand_ascii,algorithm=None):
   """
   Generate two strings with approx `nlines` lines, which share approx half their
   lines. Then run the diff/patch test unit with the two strings.
@@ -112,30 +375,31 @@ def generate_test(nlines=10,linelen=10,randchar=rand_ascii):
   ab = [ ''.join([randchar() for _ in range(linelen)]) for _ in range(nshared)]
   a = randomly_interleave(a,ab)
   b = randomly_interleave(b,ab)
-  test_diff(''.join(a),''.join(b))
+  test_diff(''.join(a),''.join(b),algorithm)
 
-def std_tests():
+def std_tests(algorithm=None):
   test_diff("asdf\nhamster\nmole\nwolf\ndog\ngiraffe",
-            "asdf\nhampster\nmole\nwolf\ndooog\ngiraffe\n")
+            "asdf\nhampster\nmole\nwolf\ndooog\ngiraffe\n",algorithm)
   test_diff("asdf\nhamster\nmole\nwolf\ndog\ngiraffe",
-            "hampster\nmole\nwolf\ndooog\ngiraffe\n")
+            "hampster\nmole\nwolf\ndooog\ngiraffe\n",algorithm)
   test_diff("hamster\nmole\nwolf\ndog",
-            "asdf\nhampster\nmole\nwolf\ndooog\ngiraffe\n")
-  test_diff("", "")
-  test_diff("", "asdf\nasf")
-  test_diff("asdf\nasf","xxx")
+            "asdf\nhampster\nmole\nwolf\ndooog\ngiraffe\n",algorithm)
+  test_diff("", "",algorithm)
+  test_diff("", "asdf\nasf",algorithm)
+  test_diff("asdf\nasf","xxx",algorithm)
   # Things can get nasty, we need to be able to handle any input
   # see https://docs.python.org/3/library/stdtypes.html
-  test_diff("\x0c", "\n\r\n")
-  test_diff("\x1c\v", "\f\r\n")
+  test_diff("\x0c", "\n\r\n",algorithm)
+  test_diff("\x1c\v", "\f\r\n",algorithm)
 
 def main():
-  print("Testing...")
-  std_tests()
-  print("Testing random ASCII...")
-  for _ in range(50): generate_test(50,50,rand_ascii)
-  print("Testing random unicode...")
-  for _ in range(50): generate_test(50,50,rand_unicode)
+  for algorithm in ALGORITHMS:
+    print("Testing "+algorithm+"...")
+    std_tests(algorithm)
+    print("Testing random ASCII...")
+    for _ in range(50): generate_test(50,50,rand_ascii,algorithm)
+    print("Testing random unicode...")
+    for _ in range(50): generate_test(50,50,rand_unicode,algorithm)
   print("Passed ✓")
 
 if __name__ == '__main__': main()
\ No newline at end of file
@@ -0,0 +1,508 @@
+# app/core/versions.py
+import asyncio
+import hashlib
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from sqlalchemy import text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.chat_file_version import ChatFileVersion
+from app.models.version_blob import VersionBlob
+from app.models.content_diff import ContentDiff
+from app.schemas.ws import ChatFileBasedVersion
+from app.core.compression import decompress_text
+import app.core.unifieddiff as unifieddiff
+
+# Default number of lines per page for get_version_diff / get_version_content
+VERSION_PAGE_LINES = 500
+# Default number of versions per page for get_history_diffs
+VERSION_HISTORY_PAGE_SIZE = 50
+# Every Nth version of a file (0, N, 2N, ...) marks its blob as a keyframe,
+# which is always stored in full. 1 stores every blob in full.
+VERSION_KEYFRAME_INTERVAL = 20
+# Number of reconstructed blob contents kept in the per-process cache
+VERSION_CONTENT_CACHE_SIZE = 512
+
+_content_cache = OrderedDict()
+
+_blob_chain_sql = text("""
+    WITH RECURSIVE chain(hash, base_hash, content, delta, depth) AS (
+        SELECT hash, base_hash, content, delta, 0 FROM version_blobs WHERE hash = :hash
+        UNION ALL
+        SELECT b.hash, b.base_hash, b.content, b.delta, chain.depth + 1
+        FROM version_blobs b JOIN chain ON b.hash = chain.base_hash
+    )
+    SELECT hash, content, delta FROM chain ORDER BY depth
+""")
+
+_latest_elsewhere_sql = text("""
+    SELECT 1 FROM chat_file_versions v
+    WHERE v.content_hash = :hash AND v.chat_file_id != :chat_file_id
+    AND v.seq = (SELECT MAX(l.seq) FROM chat_file_versions l WHERE l.chat_file_id = v.chat_file_id)
+    LIMIT 1
+""")
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+def _cache_get(blob_hash: str):
+    content = _content_cache.get(blob_hash)
+    if content is not None:
+        _content_cache.move_to_end(blob_hash)
+    return content
+
+
+def _cache_put(blob_hash: str, content: str) -> None:
+    # Blobs are content-addressed, so entries never need invalidating
+    _content_cache[blob_hash] = content
+    _content_cache.move_to_end(blob_hash)
+    if len(_content_cache) > VERSION_CONTENT_CACHE_SIZE:
+        _content_cache.popitem(last=False)
+
+
+def get_file_versions(db: Session, chat_file_id: str) -> list:
+    """
+    Returns every ChatFileVersion of a chat file, oldest first.
+    """
+    return (
+        db.query(ChatFileVersion)
+        .filter(ChatFileVersion.chat_file_id == chat_file_id)
+        .order_by(ChatFileVersion.seq)
+        .all()
+    )
+
+
+def get_latest_version(db: Session, chat_file_id: str):
+    """
+    Returns the latest ChatFileVersion of a chat file, or None. Served from the
+    (chat_file_id, seq) index.
+    """
+    return (
+        db.query(ChatFileVersion)
+        .filter(ChatFileVersion.chat_file_id == chat_file_id)
+        .order_by(ChatFileVersion.seq.desc())
+        .first()
+    )
+
+
+def is_keyframe(position: int) -> bool:
+    """
+    Whether the version at this 0-based position in its file's history is a
+    keyframe (its blob is never turned into a delta).
+    """
+    return position % max(VERSION_KEYFRAME_INTERVAL, 1) == 0
+
+
+def _read_blob_chain(db: Session, blob_hash: str):
+    """
+    Returns (content, chain) for rebuilding a blob: the full (or cached)
+    content at the end of its base_hash chain, and the delta rows to undo on
+    the way back, nearest first. Only reads; _rebuild_blob does the patching.
+    """
+    cached = _cache_get(blob_hash)
+    if cached is not None:
+        return cached, []
+
+    # Fetch the whole base_hash chain in one query rather than one per hop
+    # (raw rows, so compressed columns are decoded by hand)
+    db.flush()
+    rows = db.execute(_blob_chain_sql, {"hash": blob_hash}).all()
+    if not rows:
+        raise ValueError(f"Missing version blob {blob_hash}")
+
+    chain = []
+    for row in rows:
+        cached = _cache_get(row.hash)
+        if cached is not None:
+            return cached, chain
+        if row.content is not None:
+            return decompress_text(row.content), chain
+        chain.append(row)
+    raise ValueError(f"Version blob {blob_hash} has no full content to rebuild from")
+
+
+def _rebuild_blob(blob_hash: str, current: str, chain: list) -> str:
+    for blob in reversed(chain):
+        current = unifieddiff.apply_patch(current, decompress_text(blob.delta), revert=True)
+        _cache_put(blob.hash, current)
+    if not chain:
+        _cache_put(blob_hash, current)
+    return current
+
+
+def get_blob_content(db: Session, blob_hash: str) -> str:
+    """
+    Returns the full content of a blob. Delta blobs are rebuilt by walking
+    base_hash to the nearest full (or cached) blob and undoing each reverse
+    delta on the way back.
+    """
+    return _rebuild_blob(blob_hash, *_read_blob_chain(db, blob_hash))
+
+
+def get_version_content(db: Session, version: ChatFileVersion) -> str:
+    return get_blob_content(db, version.content_hash)
+
+
+def get_version_contents(db: Session, versions: list) -> list:
+    return [get_blob_content(db, ver.content_hash) for ver in versions]
+
+
+def count_lines(content: str) -> int:
+    return len(content.splitlines())
+
+
+def version_metadata(db: Session, versions: list) -> list:
+    """
+    Builds the ChatFileBasedVersion list sent in the initial payload:
+    ids, timestamps and line counts only (no diffs).
+    """
+    hashes = {ver.content_hash for ver in versions}
+    line_counts = dict(
+        db.query(VersionBlob.hash, VersionBlob.line_count)
+        .filter(VersionBlob.hash.in_(hashes))
+        .all()
+    ) if hashes else {}
+
+    metadata = []
+    previous = None
+    for ver in versions:
+        lines = line_counts.get(ver.content_hash, 0)
+        metadata.append(ChatFileBasedVersion(
+            version_id=ver.id,
+            timestamp=str(ver.timestamp),
+            line_count=lines,
+            line_delta=0 if previous is None else lines - previous
+        ))
+        previous = lines
+    return metadata
+
+
+def paginate_lines(text: str, cursor=None, limit: int = VERSION_PAGE_LINES):
+    """
+    Returns (page, next_cursor) for a page of at most `limit` lines of text.
+    The cursor is the line offset to start from, as handed back in
+    next_cursor; next_cursor is None on the last page.
+    Raises ValueError on a malformed cursor or limit.
+    """
+    start = int(cursor or 0)
+    limit = int(limit)
+    if start < 0 or limit <= 0:
+        raise ValueError("cursor must be >= 0 and limit must be > 0")
+    lines = text.splitlines(True)
+    end = start + limit
+    next_cursor = str(end) if end < len(lines) else None
+    return "".join(lines[start:end]), next_cursor
+
+
+def store_blob(db: Session, content: str, blob_hash: str = None, line_count: int = None) -> VersionBlob:
+    """
+    Returns the blob for this content, creating it if needed. A blob that was
+    stored as a delta is materialized back to full content, since it is about
+    to become a file's latest version. `blob_hash` and `line_count` may be
+    passed when already computed. Flushes but does not commit.
+    """
+    blob_hash = blob_hash or content_hash(content)
+    blob = db.get(VersionBlob, blob_hash)
+    if blob is None:
+        if line_count is None:
+            line_count = count_lines(content)
+        blob = VersionBlob(hash=blob_hash, content=content, line_count=line_count, keyframe=False)
+        db.add(blob)
+    elif blob.content is None:
+        blob.content = content
+        blob.delta = None
+        blob.base_hash = None
+    db.flush()
+    return blob
+
+
+def _to_delta(db: Session, blob_hash: str, content: str, base: VersionBlob, base_content: str,
+              delta: str = None) -> None:
+    """
+    Turns a full blob into a reverse delta against `base`, which must be full
+    (so a delta chain can never loop back on itself). Keyframes stay full.
+    `delta` may be passed when already computed.
+    """
+    blob = db.get(VersionBlob, blob_hash)
+    if blob is None or blob.content is None or blob.keyframe or blob.hash == base.hash:
+        return
+    _cache_put(blob.hash, content)
+    blob.delta = delta if delta is not None else unifieddiff.make_patch(content, base_content)
+    blob.base_hash = base.hash
+    blob.content = None
+
+
+def store_version_content(db: Session, content: str, position: int,
+                          previous_hash: str = None, previous_content: str = None,
+                          plan: dict = None) -> VersionBlob:
+    """
+    Stores the content of a file's new latest version (at 0-based `position`
+    in its history) and turns the previous latest blob into a reverse delta
+    against it. Values precomputed by prepare_version are taken from `plan`.
+    Returns the new blob. Does not commit.
+    """
+    plan = plan or {}
+    blob = store_blob(db, content, plan.get("hash"), plan.get("line_count"))
+    if is_keyframe(position):
+        blob.keyframe = True
+    if previous_hash is not None:
+        _to_delta(db, previous_hash, previous_content, blob, content, plan.get("delta"))
+    return blob
+
+
+def plan_version(db: Session, chat_file_id: str) -> dict:
+    """
+    Reads what adding a new latest version of a chat file needs: the current
+    latest version, and its content if its blob will be turned into a delta.
+    Does not write.
+    """
+    latest = get_latest_version(db, chat_file_id)
+    plan = {"previous_id": latest.id if latest else None, "previous_content": None}
+    if latest is not None:
+        previous = db.get(VersionBlob, latest.content_hash)
+        if previous is not None and previous.content is not None and not previous.keyframe:
+            plan["previous_content"] = get_blob_content(db, latest.content_hash)
+    return plan
+
+
+def _compute_plan(plan: dict, content: str) -> dict:
+    plan["hash"] = content_hash(content)
+    plan["line_count"] = count_lines(content)
+    if plan["previous_content"] is not None:
+        plan["delta"] = unifieddiff.make_patch(plan["previous_content"], content)
+    return plan
+
+
+async def prepare_version(db: AsyncSession, chat_file_id: str, content: str) -> dict:
+    """
+    Precomputes the new blob's hash and line count and the reverse delta of
+    the previous latest blob in a worker thread, so that create_version,
+    passed the returned plan inside a write-behind batch, only writes rows.
+    """
+    plan = await db.run_sync(plan_version, chat_file_id)
+    return await asyncio.to_thread(_compute_plan, plan, content)
+
+
+def plan_content_diffs(db: Session, pairs: list) -> dict:
+    """
+    Reads what getting the diff of each (from_hash, to_hash) pair needs: the
+    cached diffs from content_diffs (one query), and for the missing pairs,
+    grouped by target blob, the chains to rebuild both blobs from. Only
+    reads; compute_content_diffs does the rebuilding and diffing.
+    """
+    diffs = {pair: "" for pair in pairs if pair[0] == pair[1]}
+    missing = {}
+    chains = {}
+    wanted = [pair for pair in dict.fromkeys(pairs) if pair[0] != pair[1]]
+    if wanted:
+        db.flush()
+        rows = (
+            db.query(ContentDiff.from_hash, ContentDiff.to_hash, ContentDiff.diff)
+            .filter(tuple_(ContentDiff.from_hash, ContentDiff.to_hash).in_(wanted))
+            .all()
+        )
+        diffs.update({(row.from_hash, row.to_hash): row.diff for row in rows})
+    for from_hash, to_hash in wanted:
+        if (from_hash, to_hash) not in diffs:
+            missing.setdefault(to_hash, []).append(from_hash)
+            for blob_hash in (from_hash, to_hash):
+                if blob_hash not in chains:
+                    chains[blob_hash] = _read_blob_chain(db, blob_hash)
+    return {"diffs": diffs, "missing": missing, "chains": chains}
+
+
+def compute_content_diffs(plan: dict) -> dict:
+    """
+    Rebuilds the blobs and computes the diffs plan_content_diffs found
+    missing, with one make_patches batch per target blob. Returns
+    {(from_hash, to_hash): diff} for those pairs only. Touches no database,
+    so it can run in a worker thread.
+    """
+    contents = {blob_hash: _rebuild_blob(blob_hash, *chain) for blob_hash, chain in plan["chains"].items()}
+    computed = {}
+    for to_hash, from_hashes in plan["missing"].items():
+        patches = unifieddiff.make_patches([contents[h] for h in from_hashes], contents[to_hash])
+        computed.update(((from_hash, to_hash), patch) for from_hash, patch in zip(from_hashes, patches))
+    return computed
+
+
+def store_content_diffs(db: Session, diffs: dict) -> None:
+    """
+    Adds {(from_hash, to_hash): diff} to the content_diffs cache. Pairs that
+    are already cached (e.g. filled by another connection meanwhile) are
+    left alone. Does not commit.
+    """
+    if diffs:
+        db.execute(
+            sqlite_insert(ContentDiff).on_conflict_do_nothing(),
+            [{"from_hash": from_hash, "to_hash": to_hash, "diff": diff} for (from_hash, to_hash), diff in diffs.items()]
+        )
+
+
+def get_content_diffs(db: Session, pairs: list) -> dict:
+    """
+    Returns {(from_hash, to_hash): diff} for each pair of blobs, through the
+    content_diffs cache; the missing diffs are computed and added to it.
+    Does not commit.
+    """
+    plan = plan_content_diffs(db, pairs)
+    computed = compute_content_diffs(plan)
+    store_content_diffs(db, computed)
+    return {**plan["diffs"], **computed}
+
+
+async def load_content_diffs(db: AsyncSession, pairs: list):
+    """
+    get_content_diffs for the WebSocket actions: the reads run on `db`, the
+    rebuilding and diffing in a worker thread. Returns (diffs, computed),
+    where computed are the new diffs for store_content_diffs, which the
+    caller hands to the write queue.
+    """
+    plan = await db.run_sync(plan_content_diffs, pairs)
+    computed = await asyncio.to_thread(compute_content_diffs, plan)
+    return {**plan["diffs"], **computed}, computed
+
+
+def get_content_diff(db: Session, from_hash: str, to_hash: str) -> str:
+    """
+    Returns the diff between two blobs, through the content_diffs cache.
+    Does not commit.
+    """
+    return get_content_diffs(db, [(from_hash, to_hash)])[(from_hash, to_hash)]
+
+
+def drop_diffs_to(db: Session, blob_hash: str, chat_file_id: str) -> None:
+    """
+    Drops the cached diffs to a blob that just stopped being the latest
+    version of `chat_file_id`, unless it is still another file's latest.
+    Does not commit.
+    """
+    if db.execute(_latest_elsewhere_sql, {"hash": blob_hash, "chat_file_id": chat_file_id}).first():
+        return
+    db.query(ContentDiff).filter(ContentDiff.to_hash == blob_hash).delete(synchronize_session=False)
+
+
+def create_version(db: Session, chat_file_id: str, content: str, versions: list = None,
+                   plan: dict = None) -> ChatFileVersion:
+    """
+    Adds a new latest version of a chat file. Content already stored under the
+    same hash (a revert, a no-op regeneration) only costs a new pointer row.
+    The previous latest blob becomes a reverse delta unless it is a keyframe.
+    Diffs are not computed here; get_content_diffs caches them when read, and
+    the cached diffs to the previous latest blob are dropped.
+    `versions` may be passed when the caller already loaded the existing
+    history, and `plan` when prepare_version precomputed the hashing and
+    diffing; a plan made before another version was added is ignored.
+    Does not commit.
+    """
+    if versions is None:
+        versions = get_file_versions(db, chat_file_id)
+    if plan is not None and plan["previous_id"] != (versions[-1].id if versions else None):
+        plan = None
+    previous_hash = versions[-1].content_hash if versions else None
+    previous_content = None
+    if plan is not None and plan["previous_content"] is not None:
+        previous_content = plan["previous_content"]
+    elif previous_hash:
+        previous_content = get_blob_content(db, previous_hash)
+
+    blob = store_version_content(db, content, len(versions), previous_hash, previous_content, plan)
+    new_version = ChatFileVersion(
+        id=str(uuid.uuid4()),
+        chat_file_id=chat_file_id,
+        timestamp=datetime.now(timezone.utc).isoformat(),
+        seq=versions[-1].seq + 1 if versions else 0,
+        content_hash=blob.hash
+    )
+    db.add(new_version)
+    if previous_hash is not None and previous_hash != blob.hash:
+        drop_diffs_to(db, previous_hash, chat_file_id)
+    return new_version
+
+
+def version_diff_pair(db: Session, chat_file_id: str, version_id: str, to_version_id: str = None):
+    """
+    Returns the (from_hash, to_hash) blob pair for the diff from one version
+    to another (the latest one by default), or None if either version does
+    not belong to the chat file.
+    """
+    ids = [version_id] + ([to_version_id] if to_version_id else [])
+    by_id = {
+        ver.id: ver for ver in
+        db.query(ChatFileVersion)
+        .filter(ChatFileVersion.chat_file_id == chat_file_id, ChatFileVersion.id.in_(ids))
+        .all()
+    }
+    if any(ver_id not in by_id for ver_id in ids):
+        return None
+    target = by_id[to_version_id] if to_version_id else get_latest_version(db, chat_file_id)
+    return by_id[version_id].content_hash, target.content_hash
+
+
+def get_version_diff(db: Session, chat_file_id: str, version_id: str, to_version_id: str = None):
+    """
+    Returns the diff from one version to another (the latest one by default),
+    or None if either version does not belong to the chat file.
+    Diffs are cached by content hash pair, so any two versions with the same
+    contents share one cached diff. Does not commit.
+    """
+    pair = version_diff_pair(db, chat_file_id, version_id, to_version_id)
+    return get_content_diff(db, *pair) if pair is not None else None
+
+
+def history_page(db: Session, chat_file_id: str, cursor=None, limit: int = VERSION_HISTORY_PAGE_SIZE):
+    """
+    Returns (entries, pairs, next_cursor) for a page of at most `limit`
+    versions of a chat file, oldest first: a ChatFileBasedVersion per
+    version, without its diff, and the (from_hash, to_hash) pair to diff it
+    against the version before it (None for the file's first version).
+    The cursor is the seq of the last version of the previous page, as handed
+    back in next_cursor; next_cursor is None on the last page.
+    Raises ValueError on a malformed cursor or limit.
+    """
+    limit = int(limit)
+    if limit <= 0:
+        raise ValueError("limit must be > 0")
+    query = db.query(ChatFileVersion).filter(ChatFileVersion.chat_file_id == chat_file_id)
+
+    base = None
+    if cursor is not None:
+        after = int(cursor)
+        # The last version of the previous page may have been pruned since,
+        # so diff against whatever version now precedes this page
+        base = query.filter(ChatFileVersion.seq <= after).order_by(ChatFileVersion.seq.desc()).first()
+        query = query.filter(ChatFileVersion.seq > after)
+    page = query.order_by(ChatFileVersion.seq).limit(limit + 1).all()
+    next_cursor = str(page[limit - 1].seq) if len(page) > limit else None
+    page = page[:limit]
+
+    window = ([base] if base is not None else []) + page
+    pairs = [None] + [(older.content_hash, newer.content_hash) for older, newer in zip(window, window[1:])]
+    skip = len(window) - len(page)
+    return version_metadata(db, window)[skip:], pairs[skip:], next_cursor
+
+
+def with_diffs(entries: list, pairs: list, diffs: dict) -> list:
+    """
+    Fills in the diff of each history_page entry from {pair: diff}.
+    """
+    for entry, pair in zip(entries, pairs):
+        if pair is not None:
+            entry.diff = diffs[pair]
+    return entries
+
+
+def get_history_diffs(db: Session, chat_file_id: str, cursor=None, limit: int = VERSION_HISTORY_PAGE_SIZE):
+    """
+    Returns (entries, next_cursor) for a page of history_page entries with
+    their diffs, through the content_diffs cache. Does not commit.
+    Raises ValueError on a malformed cursor or limit.
+    """
+    entries, pairs, next_cursor = history_page(db, chat_file_id, cursor, limit)
+    diffs = get_content_diffs(db, [pair for pair in pairs if pair is not None])
+    return with_diffs(entries, pairs, diffs), next_cursor
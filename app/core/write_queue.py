@@ -0,0 +1,145 @@
+# app/core/write_queue.py
+"""
+Write-behind queue: writes from all WebSocket connections are applied
+together in one transaction (one commit, so one fsync on SQLite) every
+WRITE_BEHIND_INTERVAL_MS, or as soon as WRITE_BEHIND_MAX_OPS are pending.
+
+A write is a plain function taking a sync Session, e.g.
+
+    plan = await prepare_version(db, file_id, content)
+    version = await write_queue.write(lambda db: create_version(db, file_id, content, plan=plan))
+
+Ops run on the event loop inside the shared transaction, so CPU-heavy work
+(hashing, diffing) belongs before `write`, as prepare_version does.
+`write` returns the function's result once its transaction is committed, so
+the caller can read its own writes afterwards. `submit` queues it without
+waiting (fire-and-forget; errors are logged).
+"""
+import asyncio
+
+from app.core.config import WRITE_BEHIND_INTERVAL_MS, WRITE_BEHIND_MAX_OPS
+from app.core.database import AsyncSessionLocal
+
+
+def _apply(db, ops: list) -> list:
+    results = []
+    for op in ops:
+        results.append(op(db))
+        # Later writes in the batch see this one (the sessions don't autoflush)
+        db.flush()
+    return results
+
+
+class WriteBehindQueue:
+    def __init__(self, session_factory=AsyncSessionLocal,
+                 interval_ms: int = WRITE_BEHIND_INTERVAL_MS, max_ops: int = WRITE_BEHIND_MAX_OPS):
+        self.session_factory = session_factory
+        self.interval = interval_ms / 1000
+        self.max_ops = max_ops
+        self.batches = 0  # committed transactions, for logging/benchmarks
+        self._loop = None
+        self._task = None
+        self._pending = []  # [(op, future)]
+        self._wakeup = None
+        self._full = None
+        self._stopping = False
+
+    def _start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Bound to one event loop (the test client runs each connection in its own)
+            self._loop = loop
+            self._pending = []
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._stopping = False
+            self._task = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+
+    def submit(self, op) -> asyncio.Future:
+        """
+        Queues `op(db)` for the next batch. Returns a future with its result,
+        set once the batch is committed.
+        """
+        self._start()
+        future = self._loop.create_future()
+        self._pending.append((op, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_ops:
+            self._full.set()
+        return future
+
+    async def write(self, op):
+        """
+        Queues `op(db)` and waits until it is committed. Returns its result,
+        or raises its exception.
+        """
+        return await self.submit(op)
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            await self._wakeup.wait()
+            # Give other connections a few milliseconds to add to the batch
+            try:
+                await asyncio.wait_for(self._full.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            await self._flush()
+
+    async def _flush(self) -> None:
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_ops], self._pending[self.max_ops:]
+            if not self._pending:
+                self._wakeup.clear()
+                self._full.clear()
+            await self._commit(batch)
+
+    async def _commit(self, batch: list) -> None:
+        async with self.session_factory() as db:
+            try:
+                results = await db.run_sync(_apply, [op for op, _ in batch])
+                await db.commit()
+                self.batches += 1
+            except Exception:
+                await db.rollback()
+                results = None
+        if results is not None:
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+            return
+
+        # One write failed the batch: redo them one transaction each so only
+        # that write's caller gets the error
+        for op, future in batch:
+            async with self.session_factory() as db:
+                try:
+                    result = await db.run_sync(_apply, [op])
+                    await db.commit()
+                    self.batches += 1
+                except Exception as e:
+                    await db.rollback()
+                    print(f"=== Write-behind: write failed: {str(e)} ===")
+                    if not future.done():
+                        future.set_exception(e)
+                    continue
+            if not future.done():
+                future.set_result(result[0])
+
+    async def close(self) -> None:
+        """
+        Commits what is still pending and stops the background task.
+        """
+        if self._task is None or self._loop is not asyncio.get_running_loop():
+            return
+        self._stopping = True
+        self._wakeup.set()
+        self._full.set()
+        await self._task
+        self._task = None
+        self._stopping = False
+
+
+# The per-process queue
+write_queue = WriteBehindQueue()
@@ -2,20 +2,21 @@
 
 import os
 from fastapi import WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.ws import ChatMessage
+from app.schemas.ws import ChatMessage, ChatState
 from app.models.chat_file import ChatFile
 from app.models.file import File as FileModel
-from app.models.chat import Chat
+from app.core.write_queue import write_queue
 import json
 
 async def handle_delete_file(
-    db: Session,
+    db: AsyncSession,
     websocket: WebSocket,
     message_data: dict,
     conversation_objs: list,
-    chat: Chat
+    chat: ChatState
 ):
     """
     Handle 'delete_file' action.
@@ -38,7 +39,7 @@ async def handle_delete_file(
         return
 
     # 1) Look up the ChatFile for this chat.
-    chat_file = db.query(ChatFile).filter(ChatFile.id == file_id, ChatFile.chat_id == chat.id).first()
+    chat_file = await db.scalar(select(ChatFile).where(ChatFile.id == file_id, ChatFile.chat_id == chat.id))
     if not chat_file:
         await websocket.send_json({"error": f"No file found for file_id={file_id} in this chat."})
         return
@@ -52,16 +53,20 @@ async def handle_delete_file(
         # Optionally handle/log the error; for now, we continue
         pass
 
-    # 3) Remove the record from ChatFile (this file is no longer attached to the chat).
-    db.delete(chat_file)
+    def delete_files(write_db):
+        # 3) Remove the record from ChatFile (this file is no longer attached to the chat).
+        #    Loaded rather than deleted by id so its versions are deleted with it.
+        attached_file = write_db.get(ChatFile, file_id)
+        if attached_file:
+            write_db.delete(attached_file)
 
-    # 4) Also remove the file from the workspace's File table, if it exists there.
-    workspace_file = db.query(FileModel).filter(FileModel.id == file_id).first()
-    if workspace_file:
-        db.delete(workspace_file)
+        # 4) Also remove the file from the workspace's File table, if it exists there.
+        workspace_file = write_db.get(FileModel, file_id)
+        if workspace_file:
+            write_db.delete(workspace_file)
 
     # 5) Commit the changes.
-    db.commit()
+    await write_queue.write(delete_files)
 
     # 6) Add a "system" message to the in-memory conversation to note the deletion.
     deletion_message = ChatMessage(
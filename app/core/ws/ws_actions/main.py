@@ -1,10 +1,10 @@
 # app/core/ws/ws_actions/main.py
 import json
 from fastapi import WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.ws import ChatMessage
-from app.models.chat import Chat
+from app.schemas.ws import ChatMessage, ChatState
+from app.core.basedagent import ConversationContext
 
 # Import our sub-handlers from within the same package
 from .plain_text import handle_plain_text
@@ -12,16 +12,18 @@ from .upload_file import handle_upload_file
 from .new_message_action import handle_new_message_action
 from .revert_version import handle_revert_version
 from .delete_file import handle_delete_file
+from .version_history import handle_get_version_diff, handle_get_version_content, handle_get_version_history
 
 
 async def handle_action(
-    db: Session,
+    db: AsyncSession,
     websocket: WebSocket,
     raw_data: str,
     conversation_objs: list,
-    chat: Chat,
+    chat: ChatState,
     chat_files_based_objs: list,
-    chat_files_text_objs: list
+    chat_files_text_objs: list,
+    conversation_context: ConversationContext = None
 ):
     """
     Reads raw_data, parses JSON, checks 'action' key, and calls the appropriate sub-function.
@@ -49,11 +51,18 @@ async def handle_action(
             conversation_objs,
             chat,
             chat_files_based_objs,
-            chat_files_text_objs
+            chat_files_text_objs,
+            conversation_context
         )
     elif action == "revert_version":
         await handle_revert_version(db, websocket, message_data, conversation_objs, chat)
     elif action == "delete_file":
         await handle_delete_file(db, websocket, message_data, conversation_objs, chat)
+    elif action == "get_version_diff":
+        await handle_get_version_diff(db, websocket, message_data, conversation_objs, chat)
+    elif action == "get_version_content":
+        await handle_get_version_content(db, websocket, message_data, conversation_objs, chat)
+    elif action == "get_version_history":
+        await handle_get_version_history(db, websocket, message_data, conversation_objs, chat)
     else:
         await websocket.send_json({"error": f"Unknown action: {action}"})
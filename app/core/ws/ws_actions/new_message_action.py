@@ -1,28 +1,30 @@
 import json
 import uuid
-from datetime import datetime, timezone
 
 from fastapi import WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.ws import ChatMessage
-from app.models.model import Model as ModelModel
-from app.models.chat import Chat
+from app.schemas.ws import ChatMessage, ChatState
 from app.models.chat_file import ChatFile
 from app.models.chat_file_version import ChatFileVersion
 import app.core.unifieddiff as unifieddiff
 
-from app.core.basedagent import handle_new_message
+from app.core.versions import create_version, prepare_version, get_latest_version, get_version_content
+from app.core.conversations import touch_chat
+from app.core.model_cache import get_model_credentials
+from app.core.write_queue import write_queue
+from app.core.basedagent import handle_new_message, ConversationContext
 
 
 async def handle_new_message_action(
-    db: Session,
+    db: AsyncSession,
     websocket: WebSocket,
     message_data: dict,
     conversation_objs: list,
-    chat: Chat,
+    chat: ChatState,
     chat_files_based_objs: list,
-    chat_files_text_objs: list
+    chat_files_text_objs: list,
+    conversation_context: ConversationContext = None
 ):
     print("=== Entering handle_new_message_action ===")
     print("Incoming message_data:", message_data)
@@ -32,6 +34,7 @@ async def handle_new_message_action(
     is_first_prompt = message_data.get("is_first_prompt", False)
     is_chat_or_composer = message_data.get("is_chat_or_composer", False)
     selected_filename = message_data.get("selected_filename", None)
+    edit_format = message_data.get("edit_format", "diff")  # "diff" or "ops"
     
     print("Parsed message_data:")
     print(" - model_name:", model_name)
@@ -49,18 +52,18 @@ async def handle_new_message_action(
     conversation_objs.append(user_message)
     print("Appended user message to conversation_objs:", user_message)
 
-    # Find the model
-    print("Querying model in DB with name:", model_name)
-    model_obj = db.query(ModelModel).filter(ModelModel.name == model_name).first()
-    print("Found model_obj:", model_obj)
-    if not model_obj:
+    # Find the model among the chat owner's models (cached per user)
+    print("Looking up model with name:", model_name)
+    credentials = await db.run_sync(get_model_credentials, chat.user_id, model_name)
+    if not credentials:
         error_msg = {"error": "Model not found."}
         print("Error:", error_msg)
         await websocket.send_json(error_msg)
         return
 
-    model_ak = model_obj.ak
-    model_base_url = model_obj.base_url
+    model_ak, model_base_url = credentials
+    # Return the DB connection to the pool while the agent runs
+    await db.commit()
     print("Model credentials:")
     print(" - model_ak:", model_ak)
     print(" - model_base_url:", model_base_url)
@@ -120,7 +123,9 @@ async def handle_new_message_action(
         is_chat_or_composer,
         [cm.dict() if hasattr(cm, "dict") else cm for cm in conversation_objs],
         [cft.dict() if hasattr(cft, "dict") else cft for cft in chat_files_text_objs],
-        other_based_files_dict
+        other_based_files_dict,
+        conversation_context=conversation_context,
+        edit_format=edit_format
     )
     print("Result from handle_new_message:", result)
 
@@ -137,11 +142,10 @@ async def handle_new_message_action(
         conversation_objs.append(agent_response)
         print("Appended agent response to conversation_objs.")
 
-        # Update chat.last_updated
-        chat.last_updated = datetime.now(timezone.utc).isoformat()
-        print("Updated chat.last_updated to:", chat.last_updated)
-        db.commit()
-        print("DB commit successful.")
+        # Update chat.last_updated (write-behind; nothing reads it back in this action)
+        chat_id = chat.id
+        write_queue.submit(lambda write_db: touch_chat(write_db, chat_id))
+        print("Queued chat.last_updated update.")
 
         # Return text to client
         print("Sending text response to websocket:", agent_response.content)
@@ -166,30 +170,23 @@ async def handle_new_message_action(
 
         new_based_file_id = str(uuid.uuid4())
         print("Generated new_based_file_id:", new_based_file_id)
-        new_chat_file = ChatFile(
-            id=new_based_file_id,
-            filename=based_filename,
-            path="(in-memory)",
-            chat_id=chat.id
-        )
-        db.add(new_chat_file)
-        print("Added new_chat_file to DB:", new_chat_file)
-
-        new_version_id = str(uuid.uuid4())
-        print("Generated new_version_id:", new_version_id)
-        new_chat_file_version = ChatFileVersion(
-            id=new_version_id,
-            chat_file_id=new_based_file_id,
-            timestamp=datetime.now(timezone.utc).isoformat(),
-            content=file_content
-        )
-        db.add(new_chat_file_version)
-        print("Added new_chat_file_version to DB:", new_chat_file_version)
-
-        chat.last_updated = datetime.now(timezone.utc).isoformat()
-        print("Updated chat.last_updated to:", chat.last_updated)
-        db.commit()
-        print("DB commit successful.")
+        chat_id = chat.id
+        plan = await prepare_version(db, new_based_file_id, file_content)
+
+        def add_based_file(write_db):
+            write_db.add(ChatFile(
+                id=new_based_file_id,
+                filename=based_filename,
+                path="(in-memory)",
+                chat_id=chat_id
+            ))
+            version = create_version(write_db, new_based_file_id, file_content, [], plan=plan)
+            touch_chat(write_db, chat_id)
+            return version
+
+        # Wait for the commit: the next action reads this file's versions
+        new_chat_file_version = await write_queue.write(add_based_file)
+        print("Committed new chat file and version:", new_chat_file_version)
 
         file_content_response = {
             "based_filename": based_filename,
@@ -204,10 +201,11 @@ async def handle_new_message_action(
         print("Constructed agent_response for 'based' type:", agent_response)
 
         # Create a conversation block and convert it to dict before sending
+        # The stored block names the version it produced, so compaction keeps it
         new_convo_block = ChatMessage(
             role="assistant",
             type="file",
-            content=json.dumps(file_content_response)
+            content=json.dumps(dict(file_content_response, version_id=new_chat_file_version.id))
         )
         conversation_objs.append(new_convo_block)
         print("Appended new conversation block for based file:", new_convo_block)
@@ -226,8 +224,9 @@ async def handle_new_message_action(
         print("Sent JSON response for 'based' type over websocket.")
 
 
-    elif result["type"] == "diff":
-        print("Processing 'diff' type result")
+    elif result["type"] in ("diff", "ops"):
+        # Edit ops come back already converted to a diff with make_patch
+        print(f"Processing '{result['type']}' type result")
         # We have a diff for an existing .based file
         if not selected_based_file_obj:
             error_msg = {"error": "No selected .based file to apply diff."}
@@ -240,7 +239,7 @@ async def handle_new_message_action(
         # Access file_id from the dict
         chat_file_id = selected_based_file_obj.get("file_id")
         print("Using chat_file_id:", chat_file_id)
-        existing_chat_file = db.query(ChatFile).filter(ChatFile.id == chat_file_id).first()
+        existing_chat_file = await db.get(ChatFile, chat_file_id)
         print("Existing chat file:", existing_chat_file)
         if not existing_chat_file:
             error_msg = {"error": f"ChatFile not found for id={chat_file_id}"}
@@ -248,12 +247,7 @@ async def handle_new_message_action(
             await websocket.send_json(error_msg)
             return
 
-        latest_version_db = (
-            db.query(ChatFileVersion)
-            .filter(ChatFileVersion.chat_file_id == chat_file_id)
-            .order_by(ChatFileVersion.timestamp.desc())
-            .first()
-        )
+        latest_version_db = await db.run_sync(get_latest_version, chat_file_id)
         print("Latest version from DB:", latest_version_db)
         if not latest_version_db:
             error_msg = {"error": "No existing version found for this .based file."}
@@ -261,7 +255,7 @@ async def handle_new_message_action(
             await websocket.send_json(error_msg)
             return
 
-        old_content = latest_version_db.content
+        old_content = await db.run_sync(get_version_content, latest_version_db)
         print("Old content from latest version:", old_content)
 
         # Apply the diff
@@ -274,41 +268,18 @@ async def handle_new_message_action(
             await websocket.send_json(error_msg)
             return
 
-        # Create a new version
-        new_version_id = str(uuid.uuid4())
-        print("Generated new_version_id for diff:", new_version_id)
-        new_version = ChatFileVersion(
-            id=new_version_id,
-            chat_file_id=chat_file_id,
-            timestamp=datetime.now(timezone.utc).isoformat(),
-            content=new_content
-        )
-        db.add(new_version)
-        print("Added new version to DB:", new_version)
-
-        # Optionally recompute older diffs
-        older_diffs = []
-        all_versions = (
-            db.query(ChatFileVersion)
-            .filter(ChatFileVersion.chat_file_id == chat_file_id)
-            .order_by(ChatFileVersion.timestamp)
-            .all()
-        )
-        print("All versions for recompute diffs:", all_versions)
-        for ver in all_versions:
-            if ver.id != new_version.id:
-                patch_diff = unifieddiff.make_patch(ver.content, new_version.content)
-                older_diffs.append({
-                    "version_id": ver.id,
-                    "diff": patch_diff
-                })
-                print("Computed diff for version", ver.id, ":", patch_diff)
-
-        # Update chat.last_updated
-        chat.last_updated = datetime.now(timezone.utc).isoformat()
-        print("Updated chat.last_updated to:", chat.last_updated)
-        db.commit()
-        print("DB commit successful after diff update.")
+        # Create a new version and update chat.last_updated; the reverse delta
+        # is computed here, off the event loop, so the queued write only inserts
+        chat_id = chat.id
+        plan = await prepare_version(db, chat_file_id, new_content)
+
+        def add_version(write_db):
+            version = create_version(write_db, chat_file_id, new_content, plan=plan)
+            touch_chat(write_db, chat_id)
+            return version
+
+        new_version = await write_queue.write(add_version)
+        print("Committed new version:", new_version)
 
         file_content_response = {
             # Access name using key indexing
@@ -328,7 +299,8 @@ async def handle_new_message_action(
             type="file",
             content=json.dumps({
                 "based_filename": selected_based_file_obj.get("name"),
-                "based_content": diff_text
+                "based_content": diff_text,
+                "version_id": new_version.id
             })
         )
         conversation_objs.append(diff_response)
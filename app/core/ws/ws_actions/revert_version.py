@@ -1,23 +1,23 @@
 import json
-import uuid
-from datetime import datetime, timezone
 
 from fastapi import WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.ws import ChatMessage
+from app.schemas.ws import ChatMessage, ChatState
 from app.models.chat_file_version import ChatFileVersion
 from app.models.chat_file import ChatFile
-from app.models.chat import Chat
-from app.models.chat_conversation import ChatConversation
+from app.core.versions import create_version, prepare_version, get_version_content
+from app.core.conversations import touch_chat
+from app.core.write_queue import write_queue
 
 
 async def handle_revert_version(
-    db: Session,
+    db: AsyncSession,
     websocket: WebSocket,
     message_data: dict,
     conversation_objs: list,
-    chat: Chat
+    chat: ChatState
 ):
     """
     Handles reverting a .based file to a previous version.
@@ -30,53 +30,41 @@ async def handle_revert_version(
         return
 
     # 1) Find older version
-    old_version = db.query(ChatFileVersion).filter(ChatFileVersion.id == version_id).first()
+    old_version = await db.get(ChatFileVersion, version_id)
     if not old_version:
         await websocket.send_json({"error": f"No version found for version_id={version_id}"})
         return
 
     # 2) Find corresponding ChatFile by filename
-    chat_file = db.query(ChatFile).filter(
+    chat_file = await db.scalar(select(ChatFile).where(
         ChatFile.chat_id == str(chat.id),  # Make sure it belongs to this chat
         ChatFile.filename == filename
-    ).first()
+    ))
     
     if not chat_file:
         await websocket.send_json({"error": f"No .based file found for filename={filename}"})
         return
 
-    # 3) Create new ChatFileVersion
-    new_version_id = str(uuid.uuid4())
-    current_time = datetime.now(timezone.utc)
-    revert_version = ChatFileVersion(
-        id=new_version_id,
-        chat_file_id=chat_file.id,
-        timestamp=current_time.isoformat(),
-        content=old_version.content
-    )
-    db.add(revert_version)
+    old_content = await db.run_sync(get_version_content, old_version)
 
-    # 4) Update chat.last_updated
-    chat.last_updated = current_time.isoformat()
-    
-    # 5) Add an entry to the chat conversation - Add UUID for the id field
+    # 3) Create new ChatFileVersion and 4) update chat.last_updated
+    chat_file_id, chat_id = chat_file.id, str(chat.id)
+    plan = await prepare_version(db, chat_file_id, old_content)
+
+    def add_version(write_db):
+        version = create_version(write_db, chat_file_id, old_content, plan=plan)
+        touch_chat(write_db, chat_id)
+        return version
+
+    new_version = await write_queue.write(add_version)
+
+    # 5) Add revert note to conversation history (stored with the action's other messages)
     revert_message = {
         "based_filename": chat_file.filename,
-        "based_content": old_version.content,
-        "revert_notice": f"Reverted from version {version_id}"
+        "based_content": old_content,
+        "revert_notice": f"Reverted from version {version_id}",
+        "version_id": new_version.id
     }
-    
-    conversation_entry = ChatConversation(
-        id=str(uuid.uuid4()),  # Generate a new UUID for the ID
-        chat_id=str(chat.id),
-        role="assistant",
-        type="file",
-        content=json.dumps(revert_message)
-    )
-    db.add(conversation_entry)
-    db.commit()
-
-    # 6) Add revert note to conversation history
     conversation_objs.append(
         ChatMessage(
             role="assistant",
@@ -85,13 +73,13 @@ async def handle_revert_version(
         )
     )
 
-    # 7) Send response to client
+    # 6) Send response to client
     agent_response = {
         "role": "assistant",
         "type": "file",
         "content": {
             "based_filename": chat_file.filename,
-            "based_content": old_version.content,
+            "based_content": old_content,
             "message": f"Reverted to version from {old_version.timestamp}."
         }
     }
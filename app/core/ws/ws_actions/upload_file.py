@@ -3,20 +3,20 @@ import base64
 import uuid
 
 from fastapi import WebSocket
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.schemas.ws import ChatMessage
+from app.schemas.ws import ChatMessage, ChatState
 from app.models.chat_file import ChatFile
 from app.models.file import File as FileModel
-from app.models.chat import Chat
+from app.core.write_queue import write_queue
 import json
 
 async def handle_upload_file(
-    db: Session,
+    db: AsyncSession,
     websocket: WebSocket,
     message_data: dict,
     conversation_objs: list,
-    chat: Chat
+    chat: ChatState
 ):
     """
     Handle 'upload_file' action. 
@@ -44,26 +44,27 @@ async def handle_upload_file(
     with open(file_path, "wb") as f:
         f.write(file_bytes)
 
-    # Create a record in ChatFile for this chat
-    new_chat_file = ChatFile(
-        id=file_id,
-        filename=filename,
-        path=file_path,
-        chat_id=chat.id
-    )
-    db.add(new_chat_file)
+    chat_id, workspace_id = chat.id, chat.workspace_id
 
-    # Also add the file to the workspace's File table if not already present
-    existing_file = db.query(FileModel).filter(FileModel.id == file_id).first()
-    if not existing_file:
-        new_file = FileModel(
+    def add_files(write_db):
+        # Create a record in ChatFile for this chat
+        write_db.add(ChatFile(
             id=file_id,
             filename=filename,
             path=file_path,
-            workspace_id=chat.workspace_id
-        )
-        db.add(new_file)
-    db.commit()
+            chat_id=chat_id
+        ))
+
+        # Also add the file to the workspace's File table if not already present
+        if not write_db.get(FileModel, file_id):
+            write_db.add(FileModel(
+                id=file_id,
+                filename=filename,
+                path=file_path,
+                workspace_id=workspace_id
+            ))
+
+    await write_queue.write(add_files)
 
     # Add a 'file' message to conversation
     file_message = ChatMessage(
@@ -0,0 +1,197 @@
+# version_history.py
+
+from fastapi import WebSocket
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.schemas.ws import ChatState
+from app.models.chat_file import ChatFile
+from app.models.chat_file_version import ChatFileVersion
+from app.core.versions import (
+    version_diff_pair, history_page, with_diffs, load_content_diffs, store_content_diffs,
+    get_version_content, paginate_lines, VERSION_PAGE_LINES, VERSION_HISTORY_PAGE_SIZE
+)
+from app.core.write_queue import write_queue
+
+
+async def _get_chat_file(db: AsyncSession, chat: ChatState, file_id: str):
+    return await db.scalar(select(ChatFile).where(
+        ChatFile.chat_id == str(chat.id),  # Make sure it belongs to this chat
+        ChatFile.id == file_id
+    ))
+
+
+async def _load_diffs(db: AsyncSession, pairs: list) -> dict:
+    # Diffs are computed off the event loop; the ones that were not cached
+    # yet are stored by the write queue, without waiting for the commit
+    diffs, computed = await load_content_diffs(db, pairs)
+    if computed:
+        write_queue.submit(lambda write_db: store_content_diffs(write_db, computed))
+    return diffs
+
+
+async def handle_get_version_diff(
+    db: AsyncSession,
+    websocket: WebSocket,
+    message_data: dict,
+    conversation_objs: list,
+    chat: ChatState
+):
+    """
+    Handle 'get_version_diff' action.
+
+    Expected client message structure:
+    {
+      "action": "get_version_diff",
+      "file_id": "<chat file id>",
+      "version_id": "<version to diff from>",
+      "to_version_id": "<optional, defaults to the latest version>",
+      "cursor": "<optional, next_cursor from the previous page>",
+      "limit": <optional, lines per page>
+    }
+
+    Replies with one page of the unified diff and the cursor for the next
+    page (null on the last page).
+    """
+    file_id = message_data.get("file_id")
+    version_id = message_data.get("version_id")
+    to_version_id = message_data.get("to_version_id")
+    if not file_id or not version_id:
+        await websocket.send_json({"error": "Missing file_id or version_id for get_version_diff."})
+        return
+
+    chat_file = await _get_chat_file(db, chat, file_id)
+    if not chat_file:
+        await websocket.send_json({"error": f"No .based file found for file_id={file_id}"})
+        return
+
+    pair = await db.run_sync(version_diff_pair, chat_file.id, version_id, to_version_id)
+    if pair is None:
+        await websocket.send_json({"error": f"No version found for version_id={version_id}"})
+        return
+    diff = (await _load_diffs(db, [pair]))[pair]
+
+    try:
+        page, next_cursor = paginate_lines(
+            diff, message_data.get("cursor"), message_data.get("limit") or VERSION_PAGE_LINES
+        )
+    except ValueError as e:
+        await websocket.send_json({"error": f"Invalid cursor or limit: {str(e)}"})
+        return
+
+    await websocket.send_json({
+        "action": "version_diff",
+        "file_id": chat_file.id,
+        "version_id": version_id,
+        "to_version_id": to_version_id,
+        "diff": page,
+        "next_cursor": next_cursor
+    })
+
+
+async def handle_get_version_content(
+    db: AsyncSession,
+    websocket: WebSocket,
+    message_data: dict,
+    conversation_objs: list,
+    chat: ChatState
+):
+    """
+    Handle 'get_version_content' action.
+
+    Expected client message structure:
+    {
+      "action": "get_version_content",
+      "file_id": "<chat file id>",
+      "version_id": "<version id>",
+      "cursor": "<optional, next_cursor from the previous page>",
+      "limit": <optional, lines per page>
+    }
+
+    Replies with one page of the full content of that version.
+    """
+    file_id = message_data.get("file_id")
+    version_id = message_data.get("version_id")
+    if not file_id or not version_id:
+        await websocket.send_json({"error": "Missing file_id or version_id for get_version_content."})
+        return
+
+    chat_file = await _get_chat_file(db, chat, file_id)
+    if not chat_file:
+        await websocket.send_json({"error": f"No .based file found for file_id={file_id}"})
+        return
+
+    version = await db.scalar(select(ChatFileVersion).where(
+        ChatFileVersion.id == version_id,
+        ChatFileVersion.chat_file_id == chat_file.id
+    ))
+    if not version:
+        await websocket.send_json({"error": f"No version found for version_id={version_id}"})
+        return
+
+    try:
+        content = await db.run_sync(get_version_content, version)
+        page, next_cursor = paginate_lines(
+            content, message_data.get("cursor"), message_data.get("limit") or VERSION_PAGE_LINES
+        )
+    except ValueError as e:
+        await websocket.send_json({"error": f"Invalid cursor or limit: {str(e)}"})
+        return
+
+    await websocket.send_json({
+        "action": "version_content",
+        "file_id": chat_file.id,
+        "version_id": version.id,
+        "timestamp": str(version.timestamp),
+        "content": page,
+        "next_cursor": next_cursor
+    })
+
+
+async def handle_get_version_history(
+    db: AsyncSession,
+    websocket: WebSocket,
+    message_data: dict,
+    conversation_objs: list,
+    chat: ChatState
+):
+    """
+    Handle 'get_version_history' action.
+
+    Expected client message structure:
+    {
+      "action": "get_version_history",
+      "file_id": "<chat file id>",
+      "cursor": "<optional, next_cursor from the previous page>",
+      "limit": <optional, versions per page>
+    }
+
+    Replies with a page of versions, oldest first, each with its diff against
+    the version before it, so the client can step through a file's history
+    without fetching every full version.
+    """
+    file_id = message_data.get("file_id")
+    if not file_id:
+        await websocket.send_json({"error": "Missing file_id for get_version_history."})
+        return
+
+    chat_file = await _get_chat_file(db, chat, file_id)
+    if not chat_file:
+        await websocket.send_json({"error": f"No .based file found for file_id={file_id}"})
+        return
+
+    try:
+        entries, pairs, next_cursor = await db.run_sync(
+            history_page, chat_file.id, message_data.get("cursor"), message_data.get("limit") or VERSION_HISTORY_PAGE_SIZE
+        )
+    except ValueError as e:
+        await websocket.send_json({"error": f"Invalid cursor or limit: {str(e)}"})
+        return
+    entries = with_diffs(entries, pairs, await _load_diffs(db, [pair for pair in pairs if pair is not None]))
+
+    await websocket.send_json({
+        "action": "version_history",
+        "file_id": chat_file.id,
+        "versions": [entry.model_dump() for entry in entries],
+        "next_cursor": next_cursor
+    })
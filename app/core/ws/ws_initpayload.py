@@ -1,13 +1,16 @@
 # app/routers/ws_initpayload.py
+import asyncio
 import os
 import uuid
 import json
 from datetime import datetime, timezone
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 import PyPDF2
 
 from app.schemas.ws import (
     WsInitialPayload,
+    ChatState,
     ChatMessage,
     ChatFileText,
     ChatFileBased,
@@ -20,8 +23,8 @@ from app.models.chat_file import ChatFile
 from app.models.chat_conversation import ChatConversation
 from app.models.chat_file_version import ChatFileVersion
 from app.models.file import File as FileModel
-from app.models.model import Model as ModelModel
-import app.core.unifieddiff as unifieddiff
+from app.core.versions import get_file_versions, get_version_content, version_metadata
+from app.core.model_cache import get_user_models
 from app.core.config import parse_file_content
 
 def detect_file_type(filename: str) -> str:
@@ -49,26 +52,29 @@ def detect_file_type(filename: str) -> str:
         return "other"
 
 
-def build_initial_payload(db: Session, chat_id: str) -> dict:
+async def build_initial_payload(db: AsyncSession, chat_id: str) -> dict:
     """
     Builds the initial data payload for a given chat_id:
       1. Loads the Chat record, conversation, files, etc.
       2. Returns a dict with:
-         - "chat": The Chat model instance
+         - "chat": ChatState of the chat (not tied to the session)
          - "conversation_objs": in-memory ChatMessage list
          - "payload_json": final JSON (via model_dump) to send to the client
 
     If there's an error, returns {"error": "..."}.
     """
     # 1) Load the chat record
-    chat = db.query(Chat).filter(Chat.id == chat_id).first()
+    chat = await db.get(Chat, chat_id)
     if not chat:
         return {"error": "Chat not found."}
 
     # 2) Convert DB conversation -> List[ChatMessage]
     conversation_objs = []
-    if chat.conversation:
-        for msg in chat.conversation:
+    conversation = (await db.scalars(
+        select(ChatConversation).where(ChatConversation.chat_id == chat.id).order_by(ChatConversation.seq)
+    )).all()
+    if conversation:
+        for msg in conversation:
             conversation_objs.append(
                 ChatMessage(
                     role=msg.role,
@@ -81,10 +87,12 @@ def build_initial_payload(db: Session, chat_id: str) -> dict:
     print(conversation_objs)
 
     # 3) Load and partition chat files
-    chat_files = db.query(ChatFile).filter(ChatFile.chat_id == chat.id).all()
+    chat_files = (await db.scalars(select(ChatFile).where(ChatFile.chat_id == chat.id))).all()
 
     # 4) Create a single list of ChatFileItem
     chat_files_list = []
+    # Version history per .based file, loaded once for both passes below
+    based_versions = {}
 
     for cfile in chat_files:
         # Step A: detect file type
@@ -93,17 +101,13 @@ def build_initial_payload(db: Session, chat_id: str) -> dict:
         # Step B: parse textual content if needed
         file_content = ""
         if file_type in ["code", "pdf", "csv", "markdown"]:
-            file_content = parse_file_content(cfile.path, file_type)
+            # PDF/text parsing is blocking file I/O, so keep it off the event loop
+            file_content = await asyncio.to_thread(parse_file_content, cfile.path, file_type)
         elif file_type == "based":
-            versions = (
-                    db.query(ChatFileVersion)
-                    .filter(ChatFileVersion.chat_file_id == cfile.id)
-                    .order_by(ChatFileVersion.timestamp)
-                    .all()
-                )
+            versions = based_versions[cfile.id] = await db.run_sync(get_file_versions, cfile.id)
             if versions:
                 latest_version = versions[-1]
-                file_content = latest_version.content
+                file_content = await db.run_sync(get_version_content, latest_version)
                 
 
         # Step C: Build the file URL – e.g.:
@@ -134,28 +138,15 @@ def build_initial_payload(db: Session, chat_id: str) -> dict:
     for cfile in chat_files:
         ext = cfile.filename.lower().rsplit(".", 1)[-1]
         if ext == "based":
-            # Load version history
-            versions = (
-                db.query(ChatFileVersion)
-                .filter(ChatFileVersion.chat_file_id == cfile.id)
-                .order_by(ChatFileVersion.timestamp)
-                .all()
-            )
+            # Only version metadata goes into the first frame; diffs and full
+            # contents are fetched on demand (get_version_diff / get_version_content)
+            versions = based_versions.get(cfile.id)
+            if versions is None:
+                versions = await db.run_sync(get_file_versions, cfile.id)
             if versions:
                 latest_version = versions[-1]
-                version_objs = []
-                for ver in versions:
-                    diff_patch = ""
-                    if ver.id != latest_version.id:
-                        diff_patch = unifieddiff.make_patch(ver.content, latest_version.content)
-                    version_objs.append(
-                        ChatFileBasedVersion(
-                            version_id=ver.id,
-                            timestamp=str(ver.timestamp),
-                            diff=diff_patch
-                        )
-                    )
-                latest_content = latest_version.content
+                version_objs = await db.run_sync(version_metadata, versions)
+                latest_content = await db.run_sync(get_version_content, latest_version)
             else:
                 version_objs = []
                 latest_content = ""
@@ -175,8 +166,7 @@ def build_initial_payload(db: Session, chat_id: str) -> dict:
     print("\n\n\n\n\n\n\n\n")
 
     # 5) Load model names
-    models_query = db.query(ModelModel).filter(ModelModel.user_id == chat.user_id).all()
-    model_names = [m.name for m in models_query]
+    model_names = list(await db.run_sync(get_user_models, chat.user_id))
 
     # 6) Build a WsInitialPayload object
     payload_obj = WsInitialPayload(
@@ -194,7 +184,12 @@ def build_initial_payload(db: Session, chat_id: str) -> dict:
     data_to_send = payload_obj.model_dump()
 
     return {
-        "chat": chat,  # So the router can keep a reference if needed
+        "chat": ChatState(
+            id=str(chat.id),
+            name=chat.name,
+            workspace_id=str(chat.workspace_id),
+            user_id=str(chat.user_id)
+        ),
         "conversation_objs": conversation_objs,
         "payload_json": data_to_send
     }
@@ -2,7 +2,12 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.routers import auth, workspace, chat, file, model, ws_router
-from app.core.database import init_db
+import asyncio
+from app.core.database import init_db, async_engine
+from app.core.config import COMPACTION_ENABLED
+from app.core.compaction import compaction_loop
+from app.core.write_queue import write_queue
+import app.core.unifieddiff as unifieddiff
 
 app = FastAPI()
 
@@ -26,6 +31,21 @@ app.include_router(ws_router.router, prefix="/ws", tags=["WebSocket"])
 # Initialize the database (create tables if needed)
 init_db()
 
+@app.on_event("startup")
+async def start_background_jobs():
+    # Version history retention / blob garbage collection
+    if COMPACTION_ENABLED:
+        app.state.compaction_task = asyncio.create_task(compaction_loop())
+
+@app.on_event("shutdown")
+async def close_database():
+    # Commit the writes still waiting in the write-behind queue
+    await write_queue.close()
+    # aiosqlite runs each connection in its own thread; close them so the process can exit
+    await async_engine.dispose()
+    # Stop the worker processes of the batch diff pool
+    unifieddiff.shutdown_pool()
+
 # Optionally, add a simple root endpoint
 @app.get("/")
 def read_root():
@@ -1,5 +1,6 @@
 # app/models/chat.py
-from sqlalchemy import Column, String, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
@@ -8,12 +9,18 @@ class Chat(Base):
     
     id = Column(String, primary_key=True, index=True)  # UUID as string
     name = Column(String, nullable=False)
-    last_updated = Column(String)  # You might switch to DateTime later
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    # Stored as naive UTC; set it from datetime.now(timezone.utc)
+    last_updated = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
     workspace_id = Column(String, ForeignKey("workspaces.id"), nullable=False)
     
     # Relationships
     user = relationship("User", back_populates="chats")
     workspace = relationship("Workspace", back_populates="chats")
-    conversation = relationship("ChatConversation", back_populates="chat", cascade="all, delete-orphan")
+    conversation = relationship("ChatConversation", back_populates="chat", cascade="all, delete-orphan", order_by="ChatConversation.seq")
     chat_files = relationship("ChatFile", back_populates="chat", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        # Serves workspace_id lookups and the keyset-paginated chat list
+        Index("ix_chats_workspace_id_last_updated", "workspace_id", "last_updated", "id"),
+    )
@@ -1,7 +1,8 @@
 # app/models/chat_conversation.py
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
+from app.core.compression import CompressedText
 
 class ChatConversation(Base):
     __tablename__ = "chat_conversations"
@@ -10,7 +11,12 @@ class ChatConversation(Base):
     chat_id = Column(String, ForeignKey("chats.id"), nullable=False)
     role = Column(String, nullable=False)
     type = Column(String, nullable=False)
-    content = Column(String, nullable=False)
+    content = Column(CompressedText, nullable=False)
+    seq = Column(Integer, nullable=False)  # 0-based position in the chat; orders messages
     
     # Relationship
     chat = relationship("Chat", back_populates="conversation")
+
+    __table_args__ = (
+        Index("ix_chat_conversations_chat_id_seq", "chat_id", "seq", unique=True),
+    )
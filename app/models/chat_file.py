@@ -9,9 +9,9 @@ class ChatFile(Base):
     id = Column(String, primary_key=True, index=True)  # UUID as string
     filename = Column(String, nullable=False)
     path = Column(String, nullable=False)  # Local filesystem path for the chat-specific file
-    chat_id = Column(String, ForeignKey("chats.id"), nullable=False)
+    chat_id = Column(String, ForeignKey("chats.id"), nullable=False, index=True)
     s3_url = Column(String, nullable=True)
     
     # Relationships
     chat = relationship("Chat", back_populates="chat_files")
-    versions = relationship("ChatFileVersion", back_populates="chat_file", cascade="all, delete-orphan")
+    versions = relationship("ChatFileVersion", back_populates="chat_file", cascade="all, delete-orphan", order_by="ChatFileVersion.seq")
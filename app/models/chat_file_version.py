@@ -1,5 +1,5 @@
 # app/models/chat_file_version.py
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, Integer, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
@@ -9,7 +9,15 @@ class ChatFileVersion(Base):
     id = Column(String, primary_key=True, index=True)  # UUID as string
     chat_file_id = Column(String, ForeignKey("chat_files.id"), nullable=False)
     timestamp = Column(String, nullable=False)  # You may switch to DateTime later
-    content = Column(String, nullable=False)  # Content of the .based file
+    seq = Column(Integer, nullable=False)  # 0-based position in the file's history; orders versions
+    # Content lives in version_blobs, keyed by its SHA-256; identical contents
+    # (reverts, no-op regenerations) share one blob
+    content_hash = Column(String, ForeignKey("version_blobs.hash"), nullable=False, index=True)
     
-    # Relationship
+    # Relationships
     chat_file = relationship("ChatFile", back_populates="versions")
+    blob = relationship("VersionBlob")
+
+    __table_args__ = (
+        Index("ix_chat_file_versions_chat_file_id_seq", "chat_file_id", "seq", unique=True),
+    )
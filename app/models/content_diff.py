@@ -0,0 +1,13 @@
+# app/models/content_diff.py
+from sqlalchemy import Column, String
+from app.models.base import Base
+
+class ContentDiff(Base):
+    __tablename__ = "content_diffs"
+    
+    # Cached unified diff between two version blobs, shared by every version
+    # with that content. Rows to a blob are dropped once it stops being a
+    # file's latest version (create_version, and the compaction sweep).
+    from_hash = Column(String, primary_key=True)
+    to_hash = Column(String, primary_key=True, index=True)
+    diff = Column(String, nullable=False)
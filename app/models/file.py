@@ -1,5 +1,6 @@
 # app/models/file.py
-from sqlalchemy import Column, String, ForeignKey
+from datetime import datetime, timezone
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
@@ -11,6 +12,13 @@ class File(Base):
     path = Column(String, nullable=False)  # Local filesystem path
     workspace_id = Column(String, ForeignKey("workspaces.id"), nullable=False)
     s3_url = Column(String, nullable=True)
+    # Stored as naive UTC; set it from datetime.now(timezone.utc)
+    last_updated = Column(DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
     
     # Relationship
     workspace = relationship("Workspace", back_populates="files")
+
+    __table_args__ = (
+        # Serves workspace_id lookups and the keyset-paginated file list
+        Index("ix_files_workspace_id_last_updated", "workspace_id", "last_updated", "id"),
+    )
@@ -1,5 +1,5 @@
 # app/models/model.py
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
@@ -14,3 +14,8 @@ class Model(Base):
     
     # Relationship
     user = relationship("User", back_populates="models")
+
+    __table_args__ = (
+        # Serves user_id lookups and the per-user model lookup by name
+        Index("ix_models_user_id_name", "user_id", "name"),
+    )
@@ -0,0 +1,18 @@
+# app/models/version_blob.py
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
+from app.models.base import Base
+from app.core.compression import CompressedText
+
+class VersionBlob(Base):
+    __tablename__ = "version_blobs"
+    
+    hash = Column(String, primary_key=True)  # SHA-256 hex digest of the full content
+    # Exactly one of content / delta is set. A delta blob stores the reverse
+    # patch from its own content to the base blob's content, undone with
+    # apply_patch(base_content, delta, revert=True).
+    # Use app.core.versions.get_blob_content to read a blob.
+    content = Column(CompressedText, nullable=True)
+    base_hash = Column(String, ForeignKey("version_blobs.hash"), nullable=True, index=True)
+    delta = Column(CompressedText, nullable=True)
+    line_count = Column(Integer, nullable=False)
+    keyframe = Column(Boolean, nullable=False, default=False)  # Never turned into a delta
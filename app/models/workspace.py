@@ -1,5 +1,5 @@
 # app/models/workspace.py
-from sqlalchemy import Column, String, ForeignKey
+from sqlalchemy import Column, String, Integer, Boolean, ForeignKey
 from sqlalchemy.orm import relationship
 from app.models.base import Base
 
@@ -8,7 +8,11 @@ class Workspace(Base):
     
     id = Column(String, primary_key=True, index=True)  # Use a UUID string
     name = Column(String, nullable=False)
-    owner_id = Column(String, ForeignKey("users.id"), nullable=False)
+    owner_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
+    # Version history retention: keep every version from the last retention_days
+    # days and, if retention_hourly, one per hour before that. None keeps everything.
+    retention_days = Column(Integer, nullable=True)
+    retention_hourly = Column(Boolean, nullable=False, default=True)
     
     # Relationships
     owner = relationship("User", back_populates="workspaces")
@@ -1,12 +1,16 @@
 # app/routers/auth.py
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from uuid import uuid4
 
 from app.core.database import get_db
 from app.models.user import User
 from app.models.workspace import Workspace
+from app.models.file import File
+from app.models.chat import Chat
 from app.models.model import Model  # Ensure this is imported
+from app.core.pagination import first_pages, check_limit, utc_isoformat
 from app.schemas.auth import AuthRequest, AuthResponse, WorkspaceResponse, WorkspaceChat, WorkspaceFile, ModelResponse
 
 router = APIRouter()
@@ -18,7 +22,18 @@ def auth(payload: AuthRequest, db: Session = Depends(get_db)):
     If not, creates the user (and a default workspace).
     Returns the user's info along with all their workspaces,
     including file and chat summaries for each workspace, and the user's models.
+
+    Files and chats are listed most recently updated first. If **page_size**
+    is given, each workspace only carries its first page_size files and chats,
+    with `files_next_cursor` / `chats_next_cursor` for fetching the rest from
+    GET /workspace/{id}/files and /workspace/{id}/chats.
     """
+    if payload.page_size is not None:
+        try:
+            check_limit(payload.page_size)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid page_size: {str(e)}")
+
     # 1. Check if the user exists
     user = db.query(User).filter(User.email == payload.email).first()
 
@@ -37,39 +52,64 @@ def auth(payload: AuthRequest, db: Session = Depends(get_db)):
         db.refresh(user)
         db.refresh(default_workspace)
 
-    # 3. Retrieve the user's workspaces
-    workspaces = db.query(Workspace).filter(Workspace.owner_id == user.id).all()
-    workspace_responses = []
-
-    for workspace in workspaces:
-        # Build list of files for this workspace
-        file_list = []
-        for file in workspace.files:
-            file_list.append(WorkspaceFile(
-                id=file.id,
-                filename=file.filename
-            ))
-
-        # Build list of chats for this workspace
-        chat_list = []
-        for chat in workspace.chats:
-            chat_list.append(WorkspaceChat(
-                id=chat.id,
-                name=chat.name,
-                last_updated=chat.last_updated
-            ))
-        
-        workspace_responses.append(
-            WorkspaceResponse(
-                id=workspace.id,
-                name=workspace.name,
-                files=file_list,
-                chats=chat_list
-            )
+    # 3. Retrieve the user's workspaces with their file and chat summaries.
+    # One column-only query per table (not one per workspace), grouped here,
+    # so the number of queries stays the same however many workspaces a user has.
+    workspaces = (
+        db.query(Workspace.id, Workspace.name)
+        .filter(Workspace.owner_id == user.id)
+        .all()
+    )
+    owned_workspace_ids = select(Workspace.id).where(Workspace.owner_id == user.id)
+    if payload.page_size is not None:
+        file_pages = first_pages(
+            db, [File.id, File.filename, File.last_updated], File, File.workspace_id,
+            File.workspace_id.in_(owned_workspace_ids), payload.page_size
+        )
+        chat_pages = first_pages(
+            db, [Chat.id, Chat.name, Chat.last_updated], Chat, Chat.workspace_id,
+            Chat.workspace_id.in_(owned_workspace_ids), payload.page_size
         )
+    else:
+        file_pages, chat_pages = {}, {}
+        for row in (
+            db.query(File.id, File.filename, File.last_updated, File.workspace_id)
+            .filter(File.workspace_id.in_(owned_workspace_ids))
+            .order_by(File.last_updated.desc(), File.id.desc())
+        ):
+            file_pages.setdefault(row.workspace_id, ([], None))[0].append(row)
+        for row in (
+            db.query(Chat.id, Chat.name, Chat.last_updated, Chat.workspace_id)
+            .filter(Chat.workspace_id.in_(owned_workspace_ids))
+            .order_by(Chat.last_updated.desc(), Chat.id.desc())
+        ):
+            chat_pages.setdefault(row.workspace_id, ([], None))[0].append(row)
+
+    workspace_responses = []
+    for workspace_id, workspace_name in workspaces:
+        files, files_next_cursor = file_pages.get(workspace_id, ([], None))
+        chats, chats_next_cursor = chat_pages.get(workspace_id, ([], None))
+        workspace_responses.append(WorkspaceResponse(
+            id=workspace_id,
+            name=workspace_name,
+            files=[
+                WorkspaceFile(id=f.id, filename=f.filename, last_updated=utc_isoformat(f.last_updated))
+                for f in files
+            ],
+            chats=[
+                WorkspaceChat(id=c.id, name=c.name, last_updated=utc_isoformat(c.last_updated))
+                for c in chats
+            ],
+            files_next_cursor=files_next_cursor,
+            chats_next_cursor=chats_next_cursor
+        ))
 
     # 4. Retrieve user's models and convert to ModelResponse list.
-    models_query = db.query(Model).filter(Model.user_id == user.id).all()
+    models_query = (
+        db.query(Model.id, Model.name, Model.base_url, Model.user_id)
+        .filter(Model.user_id == user.id)
+        .all()
+    )
     model_responses = [
         ModelResponse(
             id=model.id,
@@ -7,9 +7,14 @@ from typing import List, Optional
 
 from app.core.database import get_db
 from app.models.chat import Chat
-from app.models.file import File as FileModel  # Import file model
 from app.models.chat_file import ChatFile
-from app.schemas.chat import ChatNewResponse
+from app.core.pagination import utc_isoformat
+from app.core.bulk import bulk_insert, workspace_files_by_id
+from app.schemas.chat import ChatNewResponse, ChatFileVersionDiffResponse, ChatFileVersionHistoryResponse
+from app.core.versions import (
+    get_version_diff, get_latest_version, get_history_diffs, paginate_lines,
+    VERSION_PAGE_LINES, VERSION_HISTORY_PAGE_SIZE
+)
 
 
 import uuid
@@ -43,7 +48,7 @@ def create_chat(
       - **last_updated**: The current timestamp as an ISO 8601 string.
     """
     chat_id = str(uuid.uuid4())
-    current_timestamp = datetime.now(timezone.utc).isoformat()
+    current_timestamp = datetime.now(timezone.utc)
 
     new_chat = Chat(
         id=chat_id,
@@ -57,19 +62,18 @@ def create_chat(
     
     # If any file IDs are provided, associate each with the chat.
     if selected_file_ids:
+        # One IN (...) lookup for all of them
+        file_records = workspace_files_by_id(db, workspace_id, selected_file_ids)
         for file_id in selected_file_ids:
-            file_record = db.query(FileModel).filter(FileModel.id == file_id, FileModel.workspace_id == workspace_id).first()
-            if file_record:
-                # Create a ChatFile record using the same file id, filename, and path.
-                new_chat_file = ChatFile(
-                    id=file_id,
-                    filename=file_record.filename,
-                    path=file_record.path,
-                    chat_id=chat_id
-                )
-                db.add(new_chat_file)
-            else:
+            if file_id not in file_records:
                 raise HTTPException(status_code=404, detail=f"File {file_id} not found in the workspace.")
+
+        # Create ChatFile records using the same file id, filename, and path.
+        db.flush()
+        bulk_insert(db, ChatFile, [
+            {"id": record.id, "filename": record.filename, "path": record.path, "chat_id": chat_id, "s3_url": None}
+            for record in file_records.values()
+        ])
     
     db.commit()
     db.refresh(new_chat)
@@ -77,7 +81,7 @@ def create_chat(
     return ChatNewResponse(
         chat_id=new_chat.id,
         name=new_chat.name,
-        last_updated=new_chat.last_updated
+        last_updated=utc_isoformat(new_chat.last_updated)
     )
 
 @router.delete("/{chat_id}")
@@ -118,7 +122,7 @@ def rename_chat(
          raise HTTPException(status_code=404, detail="Chat not found.")
     
     chat.name = new_name
-    chat.last_updated = datetime.now(timezone.utc).isoformat()
+    chat.last_updated = datetime.now(timezone.utc)
     
     db.commit()
     db.refresh(chat)
@@ -126,5 +130,88 @@ def rename_chat(
     return ChatNewResponse(
         chat_id=chat.id,
         name=chat.name,
-        last_updated=chat.last_updated
-    )
\ No newline at end of file
+        last_updated=utc_isoformat(chat.last_updated)
+    )
+
+
+def _get_chat_file(db: Session, chat_id: str, file_id: str) -> ChatFile:
+    chat_file = db.query(ChatFile).filter(ChatFile.chat_id == chat_id, ChatFile.id == file_id).first()
+    if not chat_file:
+        raise HTTPException(status_code=404, detail="Chat file not found.")
+    return chat_file
+
+
+@router.get("/{chat_id}/files/{file_id}/diff", response_model=ChatFileVersionDiffResponse)
+def get_chat_file_diff(
+    chat_id: str,
+    file_id: str,
+    version_id: str,
+    to_version_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = VERSION_PAGE_LINES,
+    db: Session = Depends(get_db)
+):
+    """
+    Get the unified diff between any two versions of a chat file.
+
+    - **version_id**: The version to diff from.
+    - **to_version_id**: The version to diff to (defaults to the latest version).
+    - **cursor** / **limit**: Pagination over the lines of the diff.
+
+    Diffs are cached by the content hashes of the two versions.
+
+    Returns one page of the diff and the cursor for the next page (null on the last page).
+    """
+    chat_file = _get_chat_file(db, chat_id, file_id)
+    if not to_version_id:
+        latest = get_latest_version(db, chat_file.id)
+        to_version_id = latest.id if latest else None
+
+    diff = get_version_diff(db, chat_file.id, version_id, to_version_id) if to_version_id else None
+    # Keep the diff computed on a cache miss
+    db.commit()
+    if diff is None:
+        raise HTTPException(status_code=404, detail="Version not found.")
+
+    try:
+        page, next_cursor = paginate_lines(diff, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor or limit: {str(e)}")
+
+    return ChatFileVersionDiffResponse(
+        file_id=chat_file.id,
+        version_id=version_id,
+        to_version_id=to_version_id,
+        diff=page,
+        next_cursor=next_cursor
+    )
+
+
+@router.get("/{chat_id}/files/{file_id}/history", response_model=ChatFileVersionHistoryResponse)
+def get_chat_file_history(
+    chat_id: str,
+    file_id: str,
+    cursor: Optional[str] = None,
+    limit: int = VERSION_HISTORY_PAGE_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    Get a page of a chat file's versions, oldest first, each with its diff
+    against the previous version (null for the first version).
+
+    - **cursor**: The next_cursor from the previous page.
+    - **limit**: Number of versions per page.
+    """
+    chat_file = _get_chat_file(db, chat_id, file_id)
+    try:
+        entries, next_cursor = get_history_diffs(db, chat_file.id, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor or limit: {str(e)}")
+    # Keep the diffs computed on cache misses
+    db.commit()
+
+    return ChatFileVersionHistoryResponse(
+        file_id=chat_file.id,
+        versions=entries,
+        next_cursor=next_cursor
+    )
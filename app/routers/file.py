@@ -1,5 +1,6 @@
 # app/routers/file.py
 import os
+from datetime import datetime, timezone
 from uuid import uuid4
 from typing import List, Optional
 
@@ -11,6 +12,7 @@ from app.models.file import File as FileModel  # Workspace file model
 from app.models.chat import Chat
 from app.models.chat_file import ChatFile
 from app.schemas.file import FileUploadResponse, FileRenameResponse, UploadedFileInfo
+from app.core.bulk import bulk_insert
 import PyPDF2
 
 
@@ -90,6 +92,9 @@ async def upload_file(
         raise HTTPException(status_code=400, detail="No files uploaded.")
 
     uploaded_files_info = []
+    # Rows for the files and chat_files tables, inserted in bulk after the loop
+    file_rows = []
+    chat_file_rows = []
 
     # --------------------
     # 1) If we're uploading to a Chat
@@ -102,10 +107,11 @@ async def upload_file(
             raise HTTPException(status_code=404, detail="Chat not found.")
         workspace_id = chat.workspace_id
 
-        for upload in files:
+        for index, upload in enumerate(files):
             file_id = str(uuid4())
             unique_filename = f"{file_id}_{upload.filename}"
             file_path = os.path.join(UPLOAD_DIRECTORY, unique_filename)
+            s3_url = s3_urls[index] if s3_urls else None
 
             # Read the file contents (for small files; handle large files carefully)
             file_bytes = await upload.read()
@@ -115,23 +121,20 @@ async def upload_file(
                 buffer.write(file_bytes)
 
             # Create DB records
-            new_file = FileModel(
-                id=file_id,
-                filename=upload.filename,
-                path=file_path,
-                workspace_id=workspace_id,
-                s3_url=s3_urls[files.index(upload)]
-            )
-            db.add(new_file)
-
-            new_chat_file = ChatFile(
-                id=file_id,
-                filename=upload.filename,
-                path=file_path,
-                chat_id=chat.id,
-                s3_url=s3_urls[files.index(upload)]
-            )
-            db.add(new_chat_file)
+            file_rows.append({
+                "id": file_id,
+                "filename": upload.filename,
+                "path": file_path,
+                "workspace_id": workspace_id,
+                "s3_url": s3_url
+            })
+            chat_file_rows.append({
+                "id": file_id,
+                "filename": upload.filename,
+                "path": file_path,
+                "chat_id": chat.id,
+                "s3_url": s3_url
+            })
 
             # Infer type/language
             file_type, language = detect_file_type_and_language(upload.filename, file_bytes)
@@ -172,7 +175,7 @@ async def upload_file(
                 content=decoded_content,
                 language=language,
                 type=file_type,
-                url=s3_urls[files.index(upload)]
+                url=s3_url
             )
             uploaded_files_info.append(file_info)
 
@@ -185,7 +188,7 @@ async def upload_file(
         if not workspace:
             raise HTTPException(status_code=404, detail="Workspace not found.")
 
-        for upload in files:
+        for index, upload in enumerate(files):
             file_id = str(uuid4())
             unique_filename = f"{file_id}_{upload.filename}"
             file_path = os.path.join(UPLOAD_DIRECTORY, unique_filename)
@@ -198,14 +201,13 @@ async def upload_file(
                 buffer.write(file_bytes)
 
             # Create a FileModel record
-            new_file = FileModel(
-                id=file_id,
-                filename=upload.filename,
-                path=file_path,
-                workspace_id=workspace.id,
-                s3_url=s3_urls[files.index(upload)]
-            )
-            db.add(new_file)
+            file_rows.append({
+                "id": file_id,
+                "filename": upload.filename,
+                "path": file_path,
+                "workspace_id": workspace.id,
+                "s3_url": s3_urls[index] if s3_urls else None
+            })
 
             # Infer type/language
             file_type, language = detect_file_type_and_language(upload.filename, file_bytes)
@@ -249,7 +251,9 @@ async def upload_file(
             )
             uploaded_files_info.append(file_info)
 
-    # Commit DB changes
+    # Insert the DB records in bulk and commit
+    bulk_insert(db, FileModel, file_rows)
+    bulk_insert(db, ChatFile, chat_file_rows)
     db.commit()
 
     # Return all file objects in a single response
@@ -320,6 +324,7 @@ def rename_file(
     # Update FileModel record.
     file_record.filename = new_name
     file_record.path = new_path
+    file_record.last_updated = datetime.now(timezone.utc)
     db.add(file_record)
     
     # Update ChatFile record if exists.
@@ -6,6 +6,8 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.model import Model
 from app.schemas.model import ModelNewResponse
+from app.core.basedagent.metrics import get_diff_metrics
+from app.core.model_cache import invalidate_user_models
 
 router = APIRouter()
 
@@ -38,6 +40,7 @@ def create_model(
     db.add(new_model)
     db.commit()
     db.refresh(new_model)
+    invalidate_user_models(user_id)
     return ModelNewResponse(
         id=new_model.id,
         name=new_model.name,
@@ -56,6 +59,17 @@ def delete_model(model_id: str, db: Session = Depends(get_db)):
     if not model_obj:
         raise HTTPException(status_code=404, detail="Model not found.")
     
+    user_id = model_obj.user_id
     db.delete(model_obj)
     db.commit()
+    invalidate_user_models(user_id)
     return {"detail": "Model deleted successfully."}
+
+
+@router.get("/metrics")
+def model_metrics():
+    """
+    Per-model diff generation metrics for this process, including the
+    first-attempt apply success rate.
+    """
+    return get_diff_metrics()
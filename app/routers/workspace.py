@@ -9,7 +9,14 @@ from sqlalchemy.orm import Session
 from app.core.database import get_db
 from app.models.workspace import Workspace
 from app.models.file import File as FileModel  # Alias to avoid conflict with Python's built-in `file`
-from app.schemas.workspace import WorkspaceNewResponse, FileResponse, WorkspaceRenameResponse
+from app.models.chat import Chat
+from app.core.pagination import keyset_page, utc_isoformat, LIST_PAGE_SIZE
+from app.core.bulk import bulk_insert
+from app.schemas.auth import WorkspaceChat, WorkspaceFile
+from app.schemas.workspace import (
+    WorkspaceNewResponse, FileResponse, WorkspaceRenameResponse, WorkspaceRetentionResponse,
+    WorkspaceChatPage, WorkspaceFilePage
+)
 
 router = APIRouter()
 
@@ -43,6 +50,7 @@ async def create_workspace(
     db.add(new_workspace)
 
     file_responses = []
+    file_rows = []
     if files:
         for upload in files:
             file_id = str(uuid4())
@@ -52,16 +60,17 @@ async def create_workspace(
             # Save the file contents to disk
             with open(file_path, "wb") as buffer:
                 buffer.write(await upload.read())
-            # Create a database record for the file
-            new_file = FileModel(
-                id=file_id,
-                filename=upload.filename,
-                path=file_path,
-                workspace_id=workspace_id
-            )
-            db.add(new_file)
+            # Database record for the file (inserted in bulk below)
+            file_rows.append({
+                "id": file_id,
+                "filename": upload.filename,
+                "path": file_path,
+                "workspace_id": workspace_id
+            })
             file_responses.append(FileResponse(file_id=file_id, filename=upload.filename))
-    
+
+    db.flush()
+    bulk_insert(db, FileModel, file_rows)
     db.commit()
     
     return WorkspaceNewResponse(
@@ -97,6 +106,99 @@ def rename_workspace(
     
     return WorkspaceRenameResponse(workspace_id=workspace.id, new_name=workspace.name)
 
+@router.patch("/retention", response_model=WorkspaceRetentionResponse)
+def set_workspace_retention(
+    workspace_id: str = Form(...),
+    retention_days: Optional[int] = Form(None),
+    retention_hourly: bool = Form(True),
+    db: Session = Depends(get_db)
+):
+    """
+    Set the version history retention policy of a workspace, applied by the
+    background compactor to every .based file in the workspace's chats.
+    
+    - **workspace_id**: The ID of the workspace.
+    - **retention_days**: Keep every version from the last N days. Omit to keep all versions.
+    - **retention_hourly**: Before that, keep the last version of each hour (otherwise none).
+    
+    Versions referenced by conversation messages and each file's latest version are always kept.
+    """
+    workspace = db.query(Workspace).filter(Workspace.id == workspace_id).first()
+    if not workspace:
+         raise HTTPException(status_code=404, detail="Workspace not found.")
+    if retention_days is not None and retention_days < 0:
+         raise HTTPException(status_code=400, detail="retention_days must be >= 0.")
+    
+    workspace.retention_days = retention_days
+    workspace.retention_hourly = retention_hourly
+    db.commit()
+    
+    return WorkspaceRetentionResponse(
+        workspace_id=workspace.id,
+        retention_days=workspace.retention_days,
+        retention_hourly=workspace.retention_hourly
+    )
+
+def _check_workspace(db: Session, workspace_id: str) -> None:
+    if not db.query(Workspace.id).filter(Workspace.id == workspace_id).first():
+         raise HTTPException(status_code=404, detail="Workspace not found.")
+
+@router.get("/{workspace_id}/chats", response_model=WorkspaceChatPage)
+def list_workspace_chats(
+    workspace_id: str,
+    cursor: Optional[str] = None,
+    limit: int = LIST_PAGE_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    List the chats of a workspace, most recently updated first.
+    
+    - **cursor**: The next_cursor from the previous page (omit for the first page).
+    - **limit**: Number of chats per page.
+    
+    Returns the page and the cursor for the next one (null on the last page).
+    """
+    _check_workspace(db, workspace_id)
+    query = db.query(Chat.id, Chat.name, Chat.last_updated).filter(Chat.workspace_id == workspace_id)
+    try:
+        rows, next_cursor = keyset_page(query, Chat, cursor, limit)
+    except ValueError as e:
+         raise HTTPException(status_code=400, detail=f"Invalid cursor or limit: {str(e)}")
+    
+    return WorkspaceChatPage(
+        workspace_id=workspace_id,
+        chats=[WorkspaceChat(id=row.id, name=row.name, last_updated=utc_isoformat(row.last_updated)) for row in rows],
+        next_cursor=next_cursor
+    )
+
+@router.get("/{workspace_id}/files", response_model=WorkspaceFilePage)
+def list_workspace_files(
+    workspace_id: str,
+    cursor: Optional[str] = None,
+    limit: int = LIST_PAGE_SIZE,
+    db: Session = Depends(get_db)
+):
+    """
+    List the files of a workspace, most recently updated first.
+    
+    - **cursor**: The next_cursor from the previous page (omit for the first page).
+    - **limit**: Number of files per page.
+    
+    Returns the page and the cursor for the next one (null on the last page).
+    """
+    _check_workspace(db, workspace_id)
+    query = db.query(FileModel.id, FileModel.filename, FileModel.last_updated).filter(FileModel.workspace_id == workspace_id)
+    try:
+        rows, next_cursor = keyset_page(query, FileModel, cursor, limit)
+    except ValueError as e:
+         raise HTTPException(status_code=400, detail=f"Invalid cursor or limit: {str(e)}")
+    
+    return WorkspaceFilePage(
+        workspace_id=workspace_id,
+        files=[WorkspaceFile(id=row.id, filename=row.filename, last_updated=utc_isoformat(row.last_updated)) for row in rows],
+        next_cursor=next_cursor
+    )
+
 @router.delete("/delete/{workspace_id}")
 def delete_workspace(workspace_id: str, db: Session = Depends(get_db)):
     """
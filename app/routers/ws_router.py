@@ -1,14 +1,15 @@
 # app/routers/ws_router.py
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
 
-from app.core.database import get_db
+from app.core.database import AsyncSessionLocal
+from app.core.basedagent import ConversationContext
 
 # Our splitted modules
 from app.core.ws.ws_initpayload import build_initial_payload
 from app.core.ws.ws_actions import handle_action
 from app.core.ws.ws_disconnect import persist_on_disconnect
+from app.core.conversations import append_conversation
 
 router = APIRouter()
 
@@ -19,14 +20,17 @@ async def chat_ws(websocket: WebSocket, chat_id: str):
       1) Loads the chat + conversation in memory (via build_initial_payload).
       2) Sends the initial data to the client.
       3) Handles incoming actions in a loop.
-      4) On disconnect, persists any unsaved conversation to DB.
+      4) Appends the messages each action adds to the stored conversation.
+      5) On disconnect, persists any unsaved conversation to DB.
+
+    Each step gets its own short-lived DB session, so an idle connection
+    holds no DB connection and no loaded rows between actions.
     """
     await websocket.accept()
-    
-    db: Session = next(get_db())
 
     # 1) Build the initial payload (this loads the chat, conversation, chat files, etc. into memory)
-    initial_data = build_initial_payload(db, chat_id)
+    async with AsyncSessionLocal() as db:
+        initial_data = await build_initial_payload(db, chat_id)
     if isinstance(initial_data, dict) and "error" in initial_data:
         # If we got an error from build_initial_payload, let the client know and close
         await websocket.send_json(initial_data)
@@ -37,11 +41,16 @@ async def chat_ws(websocket: WebSocket, chat_id: str):
     await websocket.send_json(initial_data["payload_json"])
 
     # 3) Keep references in memory for the entire session
-    chat = initial_data["chat"]  # The Chat SQLAlchemy object
+    chat = initial_data["chat"]  # ChatState (id, name, workspace_id, user_id)
     conversation_objs = initial_data["conversation_objs"]  # In-memory list of ChatMessage
     # If build_initial_payload returns them, also store these:
     chat_files_based_objs = initial_data["payload_json"].get("chat_files_based", [])
     chat_files_text_objs = initial_data["payload_json"].get("chat_files_text", [])
+    # Numbered, token-counted view of the conversation shared by all agent stages;
+    # it is synced incrementally with conversation_objs on every new message.
+    conversation_context = ConversationContext().sync(conversation_objs)
+    # conversation_objs[:persisted] are stored; the rest is appended after each action
+    persisted = len(conversation_objs)
 
     # print("=== Chat files based obj in ws router ===")
     # print(chat_files_based_objs)
@@ -51,23 +60,34 @@ async def chat_ws(websocket: WebSocket, chat_id: str):
             # 4) Receive text from the WebSocket
             raw_data = await websocket.receive_text()
 
-            # 5) Delegate to the handle_action function
+            # 5) Delegate to the handle_action function, with a session for this action only
             #    We pass in the references, so handle_action can read/modify them
-            await handle_action(
-                db=db,
-                websocket=websocket,
-                raw_data=raw_data,
-                conversation_objs=conversation_objs,
-                chat=chat,
-                chat_files_based_objs=chat_files_based_objs,
-                chat_files_text_objs=chat_files_text_objs
-            )
+            async with AsyncSessionLocal() as db:
+                await handle_action(
+                    db=db,
+                    websocket=websocket,
+                    raw_data=raw_data,
+                    conversation_objs=conversation_objs,
+                    chat=chat,
+                    chat_files_based_objs=chat_files_based_objs,
+                    chat_files_text_objs=chat_files_text_objs,
+                    conversation_context=conversation_context
+                )
+                # Commits what the reads cached (e.g. diffs); other writes go through the write-behind queue
+                await db.commit()
+
+            # 6) Store the messages the action added (one batch per action)
+            try:
+                persisted = await append_conversation(chat_id, conversation_objs, persisted)
+            except Exception as e:
+                # Keep them in memory; they are retried after the next action or on disconnect
+                print(f"ERROR appending conversation: {str(e)}")
 
     except WebSocketDisconnect:
-        # 6) On disconnect, persist any conversation changes to the DB (and close the socket)
+        # 7) On disconnect, persist the unsaved tail of the conversation (and close the socket)
         await persist_on_disconnect(
-            db=db,
             chat_id=chat_id,
             conversation_objs=conversation_objs,
+            persisted=persisted,
             websocket=websocket
         )
@@ -5,6 +5,7 @@ from typing import List, Optional
 class WorkspaceFile(BaseModel):
     id: str
     filename: str
+    last_updated: Optional[str] = None
 
 class WorkspaceChat(BaseModel):
     id: str
@@ -16,6 +17,10 @@ class WorkspaceResponse(BaseModel):
     name: str
     files: List[WorkspaceFile] = []
     chats: List[WorkspaceChat] = []
+    # Set when the login asked for page_size and there are more to fetch
+    # from GET /workspace/{id}/files and /workspace/{id}/chats
+    files_next_cursor: Optional[str] = None
+    chats_next_cursor: Optional[str] = None
 
 class ModelResponse(BaseModel):
     id: str
@@ -25,6 +30,9 @@ class ModelResponse(BaseModel):
 
 class AuthRequest(BaseModel):
     email: EmailStr
+    # If set, each workspace carries only its page_size most recently updated
+    # files and chats (plus cursors for the rest) instead of all of them
+    page_size: Optional[int] = None
 
 class AuthResponse(BaseModel):
     user_id: str
@@ -1,10 +1,10 @@
 # /schemas/basedagent.py
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Literal, Tuple
 
 class BasedAgentOutput(BaseModel):
     output: str
-    type: str  # Expected values: "based", "diff", or "response"
+    type: str  # Expected values: "based", "diff", "ops", or "response"
     based_filename: Optional[str] = None
     message: Optional[str] = None
 
@@ -15,3 +15,15 @@ class TriageContextOutput(BaseModel):
     files_list: List[str]
     plain_response: Optional[bool] = False
     extracted_context: Optional[str] = None
+
+
+class EditOp(BaseModel):
+    op: Literal["insert_after", "replace", "delete"]
+    line: Optional[int] = None              # insert_after: insert after this line (0 = top of file)
+    range: Optional[Tuple[int, int]] = None  # replace/delete: 1-based inclusive [start, end]
+    text: Optional[str] = None              # insert_after/replace: the new lines
+
+class EditOpsOutput(BaseModel):
+    type: str = "ops"
+    filename: Optional[str] = None
+    ops: List[EditOp]
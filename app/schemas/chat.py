@@ -1,7 +1,22 @@
 # app/schemas/chat.py
 from pydantic import BaseModel
+from typing import List, Optional
+
+from app.schemas.ws import ChatFileBasedVersion
 
 class ChatNewResponse(BaseModel):
     chat_id: str
     name: str
-    last_updated: str
\ No newline at end of file
+    last_updated: str
+
+class ChatFileVersionDiffResponse(BaseModel):
+    file_id: str
+    version_id: str
+    to_version_id: str
+    diff: str  # One page of the unified diff
+    next_cursor: Optional[str] = None
+
+class ChatFileVersionHistoryResponse(BaseModel):
+    file_id: str
+    versions: List[ChatFileBasedVersion]  # Each with its diff against the previous version
+    next_cursor: Optional[str] = None
@@ -1,6 +1,8 @@
 # app/schemas/workspace.py
 from pydantic import BaseModel
-from typing import List
+from typing import List, Optional
+
+from app.schemas.auth import WorkspaceChat, WorkspaceFile
 
 class FileResponse(BaseModel):
     file_id: str
@@ -13,3 +15,18 @@ class WorkspaceNewResponse(BaseModel):
 class WorkspaceRenameResponse(BaseModel):
     workspace_id: str
     new_name: str
+
+class WorkspaceRetentionResponse(BaseModel):
+    workspace_id: str
+    retention_days: Optional[int]
+    retention_hourly: bool
+
+class WorkspaceChatPage(BaseModel):
+    workspace_id: str
+    chats: List[WorkspaceChat]  # Most recently updated first
+    next_cursor: Optional[str] = None
+
+class WorkspaceFilePage(BaseModel):
+    workspace_id: str
+    files: List[WorkspaceFile]  # Most recently updated first
+    next_cursor: Optional[str] = None
@@ -2,6 +2,15 @@
 from pydantic import BaseModel
 from typing import List, Optional
 
+class ChatState(BaseModel):
+    """
+    The chat a WebSocket is connected to, detached from any DB session.
+    """
+    id: str
+    name: str
+    workspace_id: str
+    user_id: str
+
 class ChatMessage(BaseModel):
     role: str
     type: str  # e.g., "text", "file"
@@ -16,7 +25,9 @@ class ChatFileText(BaseModel):
 class ChatFileBasedVersion(BaseModel):
     version_id: str
     timestamp: str
-    diff: str
+    line_count: int = 0
+    line_delta: int = 0  # Change in line count vs. the previous version
+    diff: Optional[str] = None  # Not sent in the initial payload; see get_version_diff
 
 class ChatFileBased(BaseModel):
     file_id: str
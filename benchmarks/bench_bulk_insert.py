@@ -0,0 +1,152 @@
+"""
+Bulk inserts (app/core/bulk.py) versus adding ORM objects one by one.
+
+Against a scratch SQLite database migrated to head, times:
+  - storing a 1,000-message conversation (insert_conversation vs one
+    ChatConversation object per message)
+  - registering 500 uploaded files, as /file/upload does for a chat (files
+    + chat_files rows)
+  - resolving 500 selected file ids, as /chat/new does (one IN (...) lookup
+    vs one SELECT per id)
+Each case runs in its own transaction and is rolled back, so every run
+starts from the same database.
+
+Usage (from the repository root):
+    python benchmarks/bench_bulk_insert.py [--quick]
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic import command
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import create_db_engine
+from app.core.migrations import alembic_config
+from app.core.bulk import bulk_insert, workspace_files_by_id
+from app.core.conversations import insert_conversation
+from app.models.user import User
+from app.models.workspace import Workspace
+from app.models.chat import Chat
+from app.models.chat_file import ChatFile
+from app.models.chat_conversation import ChatConversation
+from app.models.file import File as FileModel
+
+MESSAGES = 1000
+FILES = 500
+RUNS = 10
+
+
+def messages(n: int) -> list:
+    # Mixed sizes, so some contents go through compression
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "type": "text", "content": f"message {i} " * (i % 80 + 1)}
+        for i in range(n)
+    ]
+
+
+def orm_conversation(db, chat_id: str, msgs: list) -> None:
+    for seq, msg in enumerate(msgs):
+        db.add(ChatConversation(id=str(uuid.uuid4()), chat_id=chat_id, seq=seq, **msg))
+    db.flush()
+
+
+def file_rows(n: int, workspace_id: str, chat_id: str):
+    files, chat_files = [], []
+    for i in range(n):
+        file_id = str(uuid.uuid4())
+        common = {"id": file_id, "filename": f"doc{i}.pdf", "path": f"uploads/files/{file_id}_doc{i}.pdf", "s3_url": None}
+        files.append(dict(common, workspace_id=workspace_id))
+        chat_files.append(dict(common, chat_id=chat_id))
+    return files, chat_files
+
+
+def orm_files(db, files: list, chat_files: list) -> None:
+    for row in files:
+        db.add(FileModel(**row))
+    for row in chat_files:
+        db.add(ChatFile(**row))
+    db.flush()
+
+
+def bulk_files(db, files: list, chat_files: list) -> None:
+    bulk_insert(db, FileModel, files)
+    bulk_insert(db, ChatFile, chat_files)
+
+
+def per_id_lookup(db, workspace_id: str, file_ids: list) -> dict:
+    found = {}
+    for file_id in file_ids:
+        record = db.query(FileModel).filter(FileModel.id == file_id, FileModel.workspace_id == workspace_id).first()
+        found[file_id] = record
+    return found
+
+
+def timed(make_session, fn, runs: int) -> float:
+    best = float("inf")
+    for _ in range(runs):
+        db = make_session()
+        t0 = time.perf_counter()
+        fn(db)
+        best = min(best, time.perf_counter() - t0)
+        db.rollback()
+        db.close()
+    return best
+
+
+def main():
+    quick = "--quick" in sys.argv
+    runs = 3 if quick else RUNS
+    n_messages = MESSAGES // 4 if quick else MESSAGES
+    n_files = FILES // 4 if quick else FILES
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with engine.begin() as conn:
+            command.upgrade(alembic_config(conn), "head")
+        make_session = sessionmaker(bind=engine, autoflush=False)
+
+        db = make_session()
+        db.add(User(id="u", email="u@example.com"))
+        db.add(Workspace(id="w", name="ws", owner_id="u"))
+        db.add(Chat(id="c", name="chat", last_updated=datetime.now(timezone.utc), user_id="u", workspace_id="w"))
+        db.commit()
+        db.close()
+
+        msgs = messages(n_messages)
+        files, chat_files = file_rows(n_files, "w", "c")
+        # Stored once for the lookup case
+        db = make_session()
+        bulk_insert(db, FileModel, files)
+        db.commit()
+        db.close()
+        file_ids = [row["id"] for row in files]
+        chat_file_rows = [dict(row, id=str(uuid.uuid4())) for row in chat_files]
+
+        cases = [
+            (f"{n_messages} messages",
+             lambda db: orm_conversation(db, "c", msgs),
+             lambda db: insert_conversation(db, "c", msgs)),
+            (f"{n_files} uploaded files",
+             lambda db: orm_files(db, [dict(row, id=str(uuid.uuid4())) for row in files], chat_file_rows),
+             lambda db: bulk_files(db, [dict(row, id=str(uuid.uuid4())) for row in files], chat_file_rows)),
+            (f"{n_files} selected ids",
+             lambda db: per_id_lookup(db, "w", file_ids),
+             lambda db: workspace_files_by_id(db, "w", file_ids)),
+        ]
+
+        print(f"{'case':<20} | {'one by one':>10} | {'bulk':>9} | {'speedup':>7}")
+        for label, slow_fn, fast_fn in cases:
+            slow = timed(make_session, slow_fn, runs)
+            fast = timed(make_session, fast_fn, runs)
+            print(f"{label:<20} | {slow * 1000:>8.1f}ms | {fast * 1000:>7.1f}ms | {slow / fast:>6.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmarks the foreign-key indexes added by alembic revision 0002 on a
+database with 100,000 chats.
+
+A scratch SQLite database is migrated to the baseline revision (0001, no
+foreign-key indexes) and filled with users, workspaces, models, chats, chat
+files and conversation messages. The lookups done on login and on WebSocket
+connect are timed, then the database is upgraded to head and the same lookups
+are timed again. The query plan of each lookup is printed as well, so a full
+table scan ("SCAN") is easy to tell from an index search ("SEARCH ... USING
+INDEX").
+
+Usage (from the repository root):
+    python benchmarks/bench_fk_indexes.py [--quick]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic import command
+from sqlalchemy import text
+
+from app.core.database import create_db_engine
+from app.core.migrations import alembic_config
+
+CHATS = 100_000
+CHATS_PER_USER = 50
+FILES_PER_WORKSPACE = 5
+MODELS_PER_USER = 2
+MESSAGES_PER_CHAT = 3
+LOOKUPS = 200
+
+# (label, SQL, key kind) for the lookups done on login and connect
+QUERIES = [
+    ("workspaces by owner", "SELECT * FROM workspaces WHERE owner_id = :key", "user"),
+    ("chats by user", "SELECT * FROM chats WHERE user_id = :key", "user"),
+    ("models by user", "SELECT * FROM models WHERE user_id = :key", "user"),
+    ("chats by workspace", "SELECT * FROM chats WHERE workspace_id = :key", "workspace"),
+    ("files by workspace", "SELECT * FROM files WHERE workspace_id = :key", "workspace"),
+    ("chat files by chat", "SELECT * FROM chat_files WHERE chat_id = :key", "chat"),
+    ("messages by chat", "SELECT * FROM chat_conversations WHERE chat_id = :key ORDER BY seq", "chat"),
+]
+
+
+def populate(conn, chats: int, rng: random.Random) -> dict:
+    users = [str(uuid.uuid4()) for _ in range(max(chats // CHATS_PER_USER, 1))]
+    workspaces = {user: str(uuid.uuid4()) for user in users}
+    conn.execute(text("INSERT INTO users (id, email) VALUES (:id, :email)"),
+                 [{"id": user, "email": f"{user}@example.com"} for user in users])
+    conn.execute(text("INSERT INTO workspaces (id, name, owner_id, retention_hourly) VALUES (:id, 'ws', :owner, 1)"),
+                 [{"id": ws, "owner": user} for user, ws in workspaces.items()])
+    conn.execute(text("INSERT INTO models (id, name, ak, base_url, user_id) VALUES (:id, :name, 'ak', 'url', :user)"),
+                 [{"id": str(uuid.uuid4()), "name": f"model-{i}", "user": user}
+                  for user in users for i in range(MODELS_PER_USER)])
+    conn.execute(text("INSERT INTO files (id, filename, path, workspace_id) VALUES (:id, 'doc.pdf', 'x', :ws)"),
+                 [{"id": str(uuid.uuid4()), "ws": ws} for ws in workspaces.values() for _ in range(FILES_PER_WORKSPACE)])
+
+    chat_rows = []
+    for _ in range(chats):
+        user = rng.choice(users)
+        chat_rows.append({"id": str(uuid.uuid4()), "user": user, "ws": workspaces[user]})
+    conn.execute(text("INSERT INTO chats (id, name, last_updated, user_id, workspace_id) "
+                      "VALUES (:id, 'chat', '2025-01-01T00:00:00', :user, :ws)"), chat_rows)
+    conn.execute(text("INSERT INTO chat_files (id, filename, path, chat_id) VALUES (:id, 'agent.based', 'x', :chat)"),
+                 [{"id": str(uuid.uuid4()), "chat": row["id"]} for row in chat_rows])
+    conn.execute(text("INSERT INTO chat_conversations (id, chat_id, role, type, content, seq) "
+                      "VALUES (:id, :chat, 'user', 'text', 'hello', :seq)"),
+                 [{"id": str(uuid.uuid4()), "chat": row["id"], "seq": seq}
+                  for row in chat_rows for seq in range(MESSAGES_PER_CHAT)])
+    return {
+        "user": users,
+        "workspace": list(workspaces.values()),
+        "chat": [row["id"] for row in chat_rows],
+    }
+
+
+def time_queries(engine, keys: dict, rng: random.Random) -> dict:
+    results = {}
+    with engine.connect() as conn:
+        for label, sql, kind in QUERIES:
+            sample = [rng.choice(keys[kind]) for _ in range(LOOKUPS)]
+            plan = conn.execute(text("EXPLAIN QUERY PLAN " + sql), {"key": sample[0]}).all()
+            t0 = time.perf_counter()
+            for key in sample:
+                conn.execute(text(sql), {"key": key}).all()
+            elapsed = (time.perf_counter() - t0) / LOOKUPS
+            results[label] = (elapsed, " / ".join(row[-1] for row in plan))
+    return results
+
+
+def main():
+    quick = "--quick" in sys.argv
+    chats = CHATS // 10 if quick else CHATS
+    rng = random.Random(0)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        with engine.begin() as conn:
+            command.upgrade(alembic_config(conn), "0001")
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            keys = populate(conn, chats, rng)
+        print(f"Populated {chats:,} chats in {time.perf_counter() - t0:.1f}s")
+
+        before = time_queries(engine, keys, random.Random(1))
+        t0 = time.perf_counter()
+        with engine.begin() as conn:
+            command.upgrade(alembic_config(conn), "head")
+        print(f"Upgraded to head (created the indexes) in {time.perf_counter() - t0:.2f}s\n")
+        after = time_queries(engine, keys, random.Random(1))
+        engine.dispose()
+
+    print(f"{'lookup':<20} | {'0001':>10} | {'head':>10} | {'speedup':>8} | plan at head")
+    for label, _, _ in QUERIES:
+        (slow, _), (fast, plan) = before[label], after[label]
+        print(f"{label:<20} | {slow * 1000:>8.3f}ms | {fast * 1000:>8.3f}ms | {slow / fast:>7.0f}x | {plan}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Query count and latency of /auth/login (app/routers/auth.py::auth) as a user
+accumulates workspaces.
+
+For users with 1 to 200 workspaces (each with a few files and chats) the
+endpoint function is called directly against a scratch SQLite database. Every
+statement it sends is counted. The script exits non-zero if the count grows
+with the number of workspaces, so it can be used as a regression check:
+
+    python benchmarks/bench_login.py [--quick]
+
+For comparison, the old way of building the payload (lazy-loading
+workspace.files and workspace.chats per workspace, 2N+2 queries) is timed as
+well.
+"""
+import os
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import create_db_engine
+from app.models.base import Base
+from app.models import user, workspace, chat, chat_file, chat_file_version, chat_conversation, file, model  # noqa: F401
+from app.models import version_blob, content_diff  # noqa: F401
+from app.models.user import User
+from app.models.workspace import Workspace
+from app.models.chat import Chat
+from app.models.file import File
+from app.models.model import Model
+from app.routers.auth import auth
+from app.schemas.auth import AuthRequest
+
+WORKSPACE_COUNTS = [1, 10, 50, 200]
+FILES_PER_WORKSPACE = 3
+CHATS_PER_WORKSPACE = 5
+RUNS = 20
+
+
+def add_user(db, n_workspaces: int) -> str:
+    user_id = str(uuid.uuid4())
+    email = f"user{n_workspaces}@example.com"
+    db.add(User(id=user_id, email=email))
+    db.add(Model(id=str(uuid.uuid4()), name=f"model-{n_workspaces}", ak="ak", base_url="url", user_id=user_id))
+    for w in range(n_workspaces):
+        ws_id = str(uuid.uuid4())
+        db.add(Workspace(id=ws_id, name=f"ws {w}", owner_id=user_id))
+        for f in range(FILES_PER_WORKSPACE):
+            db.add(File(id=str(uuid.uuid4()), filename=f"doc{f}.pdf", path="x", workspace_id=ws_id))
+        for c in range(CHATS_PER_WORKSPACE):
+            db.add(Chat(id=str(uuid.uuid4()), name=f"chat {c}", last_updated=datetime(2025, 1, 1, tzinfo=timezone.utc),
+                        user_id=user_id, workspace_id=ws_id))
+    db.commit()
+    return email
+
+
+def lazy_login(db, email: str) -> int:
+    """
+    The pre-projection payload: ORM objects and per-workspace lazy loads.
+    """
+    found = db.query(User).filter(User.email == email).first()
+    total = 0
+    for ws in db.query(Workspace).filter(Workspace.owner_id == found.id).all():
+        total += len([(f.id, f.filename) for f in ws.files])
+        total += len([(c.id, c.name, c.last_updated) for c in ws.chats])
+    db.query(Model).filter(Model.user_id == found.id).all()
+    return total
+
+
+def timed(fn, make_session, *args) -> float:
+    best = float("inf")
+    for _ in range(RUNS):
+        db = make_session()
+        t0 = time.perf_counter()
+        fn(*args, db)
+        best = min(best, time.perf_counter() - t0)
+        db.close()
+    return best
+
+
+def main():
+    counts = WORKSPACE_COUNTS[:3] if "--quick" in sys.argv else WORKSPACE_COUNTS
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        make_session = sessionmaker(bind=engine)
+
+        statements = []
+        event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+        print(f"{'workspaces':>10} | {'queries':>7} | {'login':>9} | {'lazy (old)':>10}")
+        query_counts = set()
+        for n in counts:
+            db = make_session()
+            email = add_user(db, n)
+            db.close()
+
+            db = make_session()
+            statements.clear()
+            response = auth(AuthRequest(email=email), db)
+            queries = len(statements)
+            db.close()
+            assert len(response.workspaces) == n
+            assert sum(len(ws.chats) for ws in response.workspaces) == n * CHATS_PER_WORKSPACE
+            query_counts.add(queries)
+
+            fast = timed(lambda db: auth(AuthRequest(email=email), db), make_session)
+            slow = timed(lambda db: lazy_login(db, email), make_session)
+            print(f"{n:>10} | {queries:>7} | {fast * 1000:>7.2f}ms | {slow * 1000:>8.2f}ms")
+        engine.dispose()
+
+    if len(query_counts) != 1:
+        print(f"FAIL: /auth/login query count depends on the number of workspaces: {sorted(query_counts)}")
+        sys.exit(1)
+    print(f"Query count is constant ({query_counts.pop()}) ✓")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmarks for app/core/unifieddiff.py across file sizes and edit densities.
+
+Every generated pair is first checked with unifieddiff.test_diff (the
+apply/revert round-trip property) for each algorithm, then timed.
+
+Usage (from the repository root):
+    python benchmarks/bench_unifieddiff.py [--quick]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app.core.unifieddiff as unifieddiff
+
+SIZES = [100, 1000, 5000, 20000]
+DENSITIES = [0.001, 0.01, 0.1, 0.5]
+
+
+def based_like_file(nlines: int, rng: random.Random) -> list:
+    """
+    Repetitive Based-looking source: many near-identical loop/until blocks.
+    """
+    lines = []
+    k = 0
+    while len(lines) < nlines:
+        lines.extend([
+            "loop:\n",
+            f'    res = talk("Ask the user about topic {k % 7}", True, {{"step": {k % 3}}})\n',
+            f'until "user answers topic {k % 7}":\n',
+            '    info = res.ask(question="Extract the answer", example={"answer": "yes"})\n',
+            "    return info\n",
+            "\n",
+        ])
+        k += 1
+    return lines[:nlines]
+
+
+def edit(lines: list, density: float, rng: random.Random) -> list:
+    out = list(lines)
+    for _ in range(max(1, int(len(lines) * density))):
+        i = rng.randrange(len(out) + 1)
+        kind = rng.random()
+        if kind < 0.4 and i < len(out):
+            out[i] = f"    # edited {rng.randrange(10**6)}\n"
+        elif kind < 0.7:
+            out.insert(i, '    return "inserted"\n')
+        elif i < len(out):
+            del out[i]
+    return out
+
+
+def _legacy_apply_patch(s, patch, revert=False):
+    """ The previous string-concatenation implementation, for comparison """
+    s = s.splitlines(True)
+    p = patch.splitlines(True)
+    t = ''
+    i = sl = 0
+    (midx, sign) = (1, '+') if not revert else (3, '-')
+    while i < len(p) and p[i].startswith(("---", "+++")): i += 1
+    while i < len(p):
+        m = unifieddiff._hdr_pat.match(p[i])
+        l = int(m.group(midx)) - 1 + (m.group(midx + 1) == '0')
+        t += ''.join(s[sl:l])
+        sl = l
+        i += 1
+        while i < len(p) and p[i][0] != '@':
+            if i + 1 < len(p) and p[i + 1][0] == '\\': line = p[i][:-1]; i += 2
+            else: line = p[i]; i += 1
+            if len(line) > 0:
+                if line[0] == sign or line[0] == ' ': t += line[1:]
+                sl += (line[0] != sign)
+    t += ''.join(s[sl:])
+    return t
+
+
+def timed(fn, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    quick = "--quick" in sys.argv
+    sizes = SIZES[:2] if quick else SIZES
+    rng = random.Random(42)
+
+    print(f"{'lines':>6} {'density':>8} | " + " | ".join(f"{a:>10}" for a in unifieddiff.ALGORITHMS)
+          + f" | {'apply':>8} {'legacy':>8} | {'hunk lines (myers/difflib)':>26}")
+    for nlines in sizes:
+        base = based_like_file(nlines, rng)
+        for density in DENSITIES:
+            a = "".join(base)
+            b = "".join(edit(base, density, rng))
+
+            timings = []
+            patches = {}
+            for algorithm in unifieddiff.ALGORITHMS:
+                if algorithm == "difflib" and nlines > 5000 and density >= 0.1:
+                    timings.append(float("nan"))
+                    continue
+                unifieddiff.test_diff(a, b, algorithm)
+                seconds, patches[algorithm] = timed(unifieddiff.make_patch, a, b, algorithm)
+                timings.append(seconds)
+
+            patch = patches["myers"]
+            apply_s, _ = timed(unifieddiff.apply_patch, a, patch)
+            legacy_s, legacy = timed(_legacy_apply_patch, a, patch)
+            assert legacy == b
+
+            changed = lambda p: sum(1 for l in p.splitlines() if l[:1] in "+-")
+            sizes_txt = f"{changed(patch)}/{changed(patches['difflib']) if 'difflib' in patches else '-'}"
+            print(f"{nlines:>6} {density:>8} | " + " | ".join(f"{t * 1000:>8.1f}ms" for t in timings)
+                  + f" | {apply_s * 1000:>6.1f}ms {legacy_s * 1000:>6.1f}ms | {sizes_txt:>26}")
+
+    print("All round-trips passed ✓")
+
+    print()
+    print(f"{'versions':>8} {'lines':>6} | {'make_patch loop':>16} | {'make_patches':>12} | {'pooled':>10}")
+    for nversions, nlines in [(50, 1000), (200, 1000), (200, 5000)]:
+        if quick and nlines > 1000:
+            continue
+        history = [based_like_file(nlines, rng)]
+        for _ in range(nversions - 1):
+            history.append(edit(history[-1], 0.001, rng))
+        texts = ["".join(lines) for lines in history]
+        latest = texts[-1]
+        loop_s, expected = timed(lambda: [unifieddiff.make_patch(t, latest) for t in texts[:-1]], repeat=1)
+        batch_s, batch = timed(lambda: unifieddiff.make_patches(texts[:-1], latest, processes=0), repeat=1)
+        pooled_s, pooled = timed(lambda: unifieddiff.make_patches(texts[:-1], latest), repeat=1)
+        assert batch == expected and pooled == expected
+        print(f"{nversions:>8} {nlines:>6} | {loop_s * 1000:>14.1f}ms | {batch_s * 1000:>10.1f}ms | {pooled_s * 1000:>8.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
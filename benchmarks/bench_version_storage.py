@@ -0,0 +1,130 @@
+"""
+Benchmarks the keyframe + reverse-delta layout of version_blobs
+(app/core/versions.py) against history depth.
+
+For each depth a ~1,000-line .based file is edited repeatedly and every edit
+is written to a scratch SQLite database through create_version, as the app
+does, for several keyframe intervals (1 = every version stored in full, the
+old layout). The history is then read back page by page with
+get_history_diffs, which fills the content_diffs cache. Reports the mean
+latency of an edit, the bytes stored in version_blobs and content_diffs and
+the database size after VACUUM, and the latency of reconstructing a version
+with a cold and a warm cache. Version 1 is the worst case: it sits right
+after a keyframe, so the longest delta chain is undone.
+
+Usage (from the repository root):
+    python benchmarks/bench_version_storage.py [--quick]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.models.base import Base
+from app.models import user, workspace, chat, chat_conversation, file, model  # noqa: F401 - register tables
+from app.models.chat_file import ChatFile
+import app.models.content_diff  # noqa: F401
+import app.core.versions as versions
+
+from bench_unifieddiff import based_like_file, edit
+
+DEPTHS = [10, 100, 300, 1000]
+INTERVALS = [1, 20, 50]
+
+
+def build_history(depth: int, rng: random.Random) -> list:
+    lines = based_like_file(1000, rng)
+    history = ["".join(lines)]
+    for _ in range(depth - 1):
+        lines = edit(lines, 0.005, rng)
+        history.append("".join(lines))
+    return history
+
+
+def write_db(path: str, history: list, interval: int):
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    db.add(ChatFile(id="f", filename="bench.based", path="(in-memory)", chat_id="c"))
+    db.commit()
+    versions.VERSION_KEYFRAME_INTERVAL = interval
+    t0 = time.perf_counter()
+    for content in history:
+        versions.create_version(db, "f", content)
+        db.commit()
+    per_edit = (time.perf_counter() - t0) / len(history)
+
+    cursor = ""
+    while cursor is not None:
+        _, cursor = versions.get_history_diffs(db, "f", cursor or None)
+        db.commit()
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+    return engine, db, per_edit
+
+
+def stored_bytes(db) -> tuple:
+    blobs = db.execute(text(
+        "SELECT COALESCE(SUM(COALESCE(length(CAST(content AS BLOB)), 0) "
+        "+ COALESCE(length(CAST(delta AS BLOB)), 0)), 0) FROM version_blobs"
+    )).scalar()
+    diffs, diff_rows = db.execute(text(
+        "SELECT COALESCE(SUM(length(CAST(diff AS BLOB))), 0), COUNT(*) FROM content_diffs"
+    )).one()
+    return blobs, diffs, diff_rows
+
+
+def timed_reconstruct(db, position: int) -> float:
+    history = versions.get_file_versions(db, "f")
+    target = history[position]
+    t0 = time.perf_counter()
+    versions.get_version_content(db, target)
+    return time.perf_counter() - t0
+
+
+def main():
+    quick = "--quick" in sys.argv
+    depths = DEPTHS[:2] if quick else DEPTHS
+    rng = random.Random(0)
+
+    print(
+        f"{'depth':>6} {'interval':>8} | {'edit':>8} | {'blobs':>10} | {'diffs (rows)':>17} | {'db size':>10} | "
+        f"{'v1 cold':>11} | {'middle cold':>11} | {'warm':>8}"
+    )
+    for depth in depths:
+        history = build_history(depth, rng)
+        for interval in INTERVALS:
+            with tempfile.TemporaryDirectory() as tmp:
+                path = os.path.join(tmp, "bench.db")
+                engine, db, per_edit = write_db(path, history, interval)
+                blob_bytes, diff_bytes, diff_rows = stored_bytes(db)
+
+                # Check every version round-trips before timing anything
+                versions._content_cache.clear()
+                assert versions.get_version_contents(db, versions.get_file_versions(db, "f")) == history
+
+                versions._content_cache.clear()
+                first = timed_reconstruct(db, 1)
+                versions._content_cache.clear()
+                middle = timed_reconstruct(db, depth // 2 + 1)
+                warm = timed_reconstruct(db, depth // 2 + 1)
+                size = os.path.getsize(path)
+                db.close()
+                engine.dispose()
+
+            print(
+                f"{depth:>6} {interval:>8} | {per_edit * 1000:>6.2f}ms | {blob_bytes / 1024:>8.0f}KB | "
+                f"{diff_bytes / 1024:>8.0f}KB ({diff_rows:>5}) | {size / 1024:>8.0f}KB | "
+                f"{first * 1000:>9.2f}ms | {middle * 1000:>9.2f}ms | {warm * 1000:>6.3f}ms"
+            )
+    print("All versions round-tripped ✓")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""
+Throughput of WebSocket-style writes with one commit per write versus the
+write-behind queue (app/core/write_queue.py), which commits the writes of all
+connections together.
+
+CONNECTIONS concurrent "connections" each do ACTIONS actions against a
+scratch SQLite database; an action appends two conversation messages and
+touches chat.last_updated, and waits until that is committed. Both modes use
+the same AsyncSession engine and PRAGMAs as the app.
+
+Usage (from the repository root):
+    python benchmarks/bench_write_queue.py [--quick] [--synchronous FULL]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from alembic import command
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.core.database import create_db_engine, create_async_db_engine, sqlite_pragmas
+from app.core.migrations import alembic_config
+from app.core.conversations import insert_conversation, touch_chat
+from app.core.write_queue import WriteBehindQueue
+from app.models.user import User
+from app.models.workspace import Workspace
+from app.models.chat import Chat
+from app.models.chat_conversation import ChatConversation
+
+CONNECTIONS = 50
+ACTIONS = 40
+
+
+def action_op(chat_id: str, n: int):
+    messages = [
+        {"role": "user", "type": "text", "content": f"prompt {n}"},
+        {"role": "assistant", "type": "text", "content": f"answer {n}"},
+    ]
+
+    def op(db):
+        insert_conversation(db, chat_id, messages)
+        touch_chat(db, chat_id)
+    return op
+
+
+async def run_direct(make_session, chat_ids: list, actions: int) -> int:
+    async def connection(chat_id):
+        for n in range(actions):
+            async with make_session() as db:
+                await db.run_sync(action_op(chat_id, n))
+                await db.commit()
+
+    await asyncio.gather(*(connection(chat_id) for chat_id in chat_ids))
+    return len(chat_ids) * actions
+
+
+async def run_queued(queue: WriteBehindQueue, chat_ids: list, actions: int) -> int:
+    async def connection(chat_id):
+        for n in range(actions):
+            await queue.write(action_op(chat_id, n))
+
+    await asyncio.gather(*(connection(chat_id) for chat_id in chat_ids))
+    await queue.close()
+    return queue.batches
+
+
+async def bench(url: str, pragmas: dict, prefix: str, actions: int, queued: bool):
+    engine = create_async_db_engine(url, pragmas)
+    make_session = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
+    chat_ids = [f"{prefix}-{i}" for i in range(CONNECTIONS)]
+    async with make_session() as db:
+        db.add(User(id=prefix, email=f"{prefix}@example.com"))
+        db.add(Workspace(id=prefix, name="ws", owner_id=prefix))
+        for chat_id in chat_ids:
+            db.add(Chat(id=chat_id, name="chat", last_updated=datetime.now(timezone.utc),
+                        user_id=prefix, workspace_id=prefix))
+        await db.commit()
+
+    t0 = time.perf_counter()
+    if queued:
+        commits = await run_queued(WriteBehindQueue(session_factory=make_session), chat_ids, actions)
+    else:
+        commits = await run_direct(make_session, chat_ids, actions)
+    elapsed = time.perf_counter() - t0
+
+    async with make_session() as db:
+        stored = await db.scalar(
+            select(func.count()).select_from(ChatConversation).where(ChatConversation.chat_id.in_(chat_ids))
+        )
+    await engine.dispose()
+    assert stored == 2 * CONNECTIONS * actions, stored
+    return elapsed, commits
+
+
+def main():
+    actions = ACTIONS // 4 if "--quick" in sys.argv else ACTIONS
+    pragmas = sqlite_pragmas()
+    if "--synchronous" in sys.argv:
+        pragmas["synchronous"] = sys.argv[sys.argv.index("--synchronous") + 1]
+    total = CONNECTIONS * actions
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.db")
+        engine = create_db_engine(f"sqlite:///{path}")
+        with engine.begin() as conn:
+            command.upgrade(alembic_config(conn), "head")
+        engine.dispose()
+
+        url = f"sqlite+aiosqlite:///{path}"
+        print(f"{CONNECTIONS} connections x {actions} actions, synchronous={pragmas['synchronous']}")
+        print(f"{'mode':<12} | {'commits':>7} | {'elapsed':>8} | {'actions/s':>9}")
+        for label, queued in (("direct", False), ("write-behind", True)):
+            elapsed, commits = asyncio.run(bench(url, pragmas, label, actions, queued))
+            print(f"{label:<12} | {commits:>7} | {elapsed:>7.2f}s | {total / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
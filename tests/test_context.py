@@ -0,0 +1,23 @@
+"""
+Token budgeting of the conversation sent to the agent prompts
+(app/core/basedagent/context.py).
+"""
+from app.core.basedagent.context import ConversationContext
+
+
+def conversation(n: int) -> ConversationContext:
+    return ConversationContext().sync([{"role": "user", "content": f"message {i} " * 50} for i in range(n)])
+
+
+def test_formatted_keeps_the_most_recent_messages_within_budget():
+    context = conversation(10)
+    budget = context.token_count(8, 10)
+    lines = context.formatted(budget).split("\n")
+    assert lines[0] == "(7 earlier messages omitted)"
+    assert lines[1:] == context.line_range(8, 10)
+
+
+def test_formatted_is_untrimmed_when_the_conversation_fits():
+    context = conversation(10)
+    assert context.formatted(context.token_count()) == context.formatted()
+    assert context.formatted() == "\n".join(context.line_range(1, 10))
@@ -0,0 +1,132 @@
+"""
+Upgrading databases created before Alembic (app/core/migrations.py
+run_migrations, legacy path) to the latest revision.
+"""
+import os
+
+from alembic.script import ScriptDirectory
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+
+from app.core.database import create_db_engine
+from alembic import command
+from app.core.migrations import run_migrations, upgrade_legacy_database, alembic_config, BASELINE_REVISION
+from app.core.versions import get_file_versions, get_version_contents
+from app.models import (  # noqa: F401 - register tables
+    user, workspace, chat, chat_file, chat_file_version, chat_conversation,
+    file, model, version_blob, content_diff
+)
+
+# Schema created by the app before version history moved to blobs and
+# migrations moved to Alembic (Base.metadata.create_all of the original models)
+BASELINE_SCHEMA = """
+CREATE TABLE users (
+    id VARCHAR NOT NULL, email VARCHAR NOT NULL, PRIMARY KEY (id), UNIQUE (email)
+);
+CREATE INDEX ix_users_id ON users (id);
+CREATE TABLE models (
+    id VARCHAR NOT NULL, name VARCHAR NOT NULL, ak VARCHAR NOT NULL, base_url VARCHAR NOT NULL,
+    user_id VARCHAR NOT NULL, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id)
+);
+CREATE INDEX ix_models_id ON models (id);
+CREATE TABLE workspaces (
+    id VARCHAR NOT NULL, name VARCHAR NOT NULL, owner_id VARCHAR NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(owner_id) REFERENCES users (id)
+);
+CREATE INDEX ix_workspaces_id ON workspaces (id);
+CREATE TABLE chats (
+    id VARCHAR NOT NULL, name VARCHAR NOT NULL, last_updated VARCHAR, user_id VARCHAR NOT NULL,
+    workspace_id VARCHAR NOT NULL, PRIMARY KEY (id), FOREIGN KEY(user_id) REFERENCES users (id),
+    FOREIGN KEY(workspace_id) REFERENCES workspaces (id)
+);
+CREATE INDEX ix_chats_id ON chats (id);
+CREATE TABLE files (
+    id VARCHAR NOT NULL, filename VARCHAR NOT NULL, path VARCHAR NOT NULL, workspace_id VARCHAR NOT NULL,
+    s3_url VARCHAR, PRIMARY KEY (id), FOREIGN KEY(workspace_id) REFERENCES workspaces (id)
+);
+CREATE INDEX ix_files_id ON files (id);
+CREATE TABLE chat_conversations (
+    id VARCHAR NOT NULL, chat_id VARCHAR NOT NULL, role VARCHAR NOT NULL, type VARCHAR NOT NULL,
+    content VARCHAR NOT NULL, PRIMARY KEY (id), FOREIGN KEY(chat_id) REFERENCES chats (id)
+);
+CREATE INDEX ix_chat_conversations_id ON chat_conversations (id);
+CREATE TABLE chat_files (
+    id VARCHAR NOT NULL, filename VARCHAR NOT NULL, path VARCHAR NOT NULL, chat_id VARCHAR NOT NULL,
+    s3_url VARCHAR, PRIMARY KEY (id), FOREIGN KEY(chat_id) REFERENCES chats (id)
+);
+CREATE INDEX ix_chat_files_id ON chat_files (id);
+CREATE TABLE chat_file_versions (
+    id VARCHAR NOT NULL, chat_file_id VARCHAR NOT NULL, timestamp VARCHAR NOT NULL, content VARCHAR NOT NULL,
+    PRIMARY KEY (id), FOREIGN KEY(chat_file_id) REFERENCES chat_files (id)
+);
+CREATE INDEX ix_chat_file_versions_id ON chat_file_versions (id);
+"""
+
+CONTENTS = ["loop:\n", "loop:\n    talk()\n", "loop:\n    talk()\n    until done\n", "loop:\n"]
+
+
+def baseline_database(path: str):
+    engine = create_db_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA.split(";"):
+            if statement.strip():
+                conn.execute(text(statement))
+        conn.execute(text("INSERT INTO users VALUES ('u', 'u@example.com')"))
+        conn.execute(text("INSERT INTO workspaces VALUES ('w', 'ws', 'u')"))
+        conn.execute(text("INSERT INTO chats VALUES ('c', 'chat', '2025-01-01T00:00:00', 'u', 'w')"))
+        conn.execute(text("INSERT INTO chat_files VALUES ('f', 'a.based', '(in-memory)', 'c', NULL)"))
+        for i, content in enumerate(CONTENTS):
+            conn.execute(
+                text("INSERT INTO chat_file_versions VALUES (:id, 'f', :ts, :content)"),
+                {"id": f"v{i}", "ts": f"2025-01-01T00:00:0{i}", "content": content}
+            )
+        conn.execute(text("INSERT INTO chat_conversations VALUES ('m', 'c', 'user', 'text', 'hi')"))
+    return engine
+
+
+def test_baseline_database_upgrades_to_head(tmp_path):
+    engine = baseline_database(os.path.join(tmp_path, "baseline.db"))
+    run_migrations(engine)
+    # Running again on the migrated database is a no-op
+    run_migrations(engine)
+
+    head = ScriptDirectory.from_config(alembic_config()).get_current_head()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT version_num FROM alembic_version")).scalar() == head
+        indexes = {index["name"] for index in inspect(conn).get_indexes("content_diffs")}
+        assert "ix_content_diffs_to_hash" in indexes
+
+    with Session(engine) as db:
+        versions = get_file_versions(db, "f")
+        assert [ver.id for ver in versions] == ["v0", "v1", "v2", "v3"]
+        assert get_version_contents(db, versions) == CONTENTS
+    engine.dispose()
+
+
+def schema(engine) -> dict:
+    """
+    {table: (columns, indexes)} by name, nullability and indexed columns;
+    column types are left out (the legacy tables declare VARCHAR where
+    revision 0001 declares TEXT, which SQLite treats alike).
+    """
+    inspector = inspect(engine)
+    return {
+        table: (
+            {(col["name"], col["nullable"]) for col in inspector.get_columns(table)},
+            {(ix["name"], tuple(ix["column_names"]), bool(ix["unique"])) for ix in inspector.get_indexes(table)},
+        )
+        for table in inspector.get_table_names() if table != "alembic_version"
+    }
+
+
+def test_legacy_steps_produce_the_baseline_revision(tmp_path):
+    legacy = baseline_database(os.path.join(tmp_path, "baseline.db"))
+    upgrade_legacy_database(legacy)
+
+    fresh = create_db_engine(f"sqlite:///{os.path.join(tmp_path, 'fresh.db')}")
+    with fresh.begin() as conn:
+        command.upgrade(alembic_config(conn), BASELINE_REVISION)
+
+    assert schema(legacy) == schema(fresh)
+    legacy.dispose()
+    fresh.dispose()
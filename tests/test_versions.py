@@ -0,0 +1,91 @@
+"""
+The content_diffs cache (app/core/versions.py).
+"""
+import asyncio
+import os
+from datetime import datetime, timezone
+
+from alembic import command
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import create_db_engine, create_async_db_engine
+from app.core.migrations import alembic_config
+from app.core.versions import (
+    create_version, get_file_versions, get_version_diff, plan_content_diffs, compute_content_diffs,
+    store_content_diffs, load_content_diffs
+)
+from app.models import (  # noqa: F401 - register tables
+    user, workspace, chat, chat_file, chat_file_version, chat_conversation,
+    file, model, version_blob, content_diff
+)
+from app.models.user import User
+from app.models.workspace import Workspace
+from app.models.chat import Chat
+from app.models.chat_file import ChatFile
+from app.models.content_diff import ContentDiff
+
+
+def history_database(path: str):
+    engine = create_db_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        command.upgrade(alembic_config(conn), "head")
+    make_session = sessionmaker(bind=engine, autoflush=False)
+    with make_session() as db:
+        db.add(User(id="u", email="u@example.com"))
+        db.add(Workspace(id="w", name="ws", owner_id="u"))
+        db.add(Chat(id="c", name="chat", last_updated=datetime.now(timezone.utc), user_id="u", workspace_id="w"))
+        db.add(ChatFile(id="f", filename="a.based", path="(in-memory)", chat_id="c"))
+        for i in range(5):
+            create_version(db, "f", "".join(f"line {n}\n" for n in range(i + 1)))
+            db.commit()
+    return engine, make_session
+
+
+def test_concurrent_cache_fills_do_not_conflict(tmp_path):
+    engine, make_session = history_database(os.path.join(tmp_path, "history.db"))
+    with make_session() as first, make_session() as second:
+        versions = get_file_versions(first, "f")
+        pairs = [(versions[0].content_hash, versions[-1].content_hash)]
+        # Both miss the cache, then both store the same diff
+        computed = [compute_content_diffs(plan_content_diffs(db, pairs)) for db in (first, second)]
+        for db, diffs in zip((first, second), computed):
+            store_content_diffs(db, diffs)
+            db.commit()
+    with make_session() as db:
+        assert db.query(ContentDiff).count() == 1
+    engine.dispose()
+
+
+def test_get_version_diff_leaves_committing_to_the_caller(tmp_path):
+    engine, make_session = history_database(os.path.join(tmp_path, "history.db"))
+    with make_session() as db:
+        versions = get_file_versions(db, "f")
+        assert get_version_diff(db, "f", versions[0].id) == "@@ -1,0 +2,4 @@\n+line 1\n+line 2\n+line 3\n+line 4\n"
+        db.rollback()
+        assert db.query(ContentDiff).count() == 0
+    engine.dispose()
+
+
+def test_load_content_diffs_returns_only_new_diffs_to_store(tmp_path):
+    path = os.path.join(tmp_path, "history.db")
+    engine, make_session = history_database(path)
+    with make_session() as db:
+        versions = get_file_versions(db, "f")
+    pairs = [(older.content_hash, newer.content_hash) for older, newer in zip(versions, versions[1:])]
+
+    async def load():
+        async_engine = create_async_db_engine(f"sqlite+aiosqlite:///{path}")
+        async with async_sessionmaker(async_engine)() as db:
+            result = await load_content_diffs(db, pairs)
+        await async_engine.dispose()
+        return result
+
+    diffs, computed = asyncio.run(load())
+    assert set(diffs) == set(pairs) and computed == diffs
+    with make_session() as db:
+        store_content_diffs(db, computed)
+        db.commit()
+    diffs, computed = asyncio.run(load())
+    assert set(diffs) == set(pairs) and computed == {}
+    engine.dispose()